@@ -7,14 +7,30 @@
     "license": "OPL-1",
     "depends": ["mail_bot"],
     "data": [
+        "security/ir.model.access.csv",
+        "data/mail_oopo_binding_data.xml",
+        "data/mail_oopo_circuit_data.xml",
+        "data/mail_oopo_attachment_data.xml",
+        "data/mail_oopo_summary_data.xml",
+        "views/mail_oopo_binding_views.xml",
+        "views/mail_oopo_circuit_views.xml",
+        "views/mail_oopo_skill_views.xml",
+        "views/mail_oopo_profile_views.xml",
         "views/res_config_settings.xml",
         "views/res_users_views.xml",
+        "wizard/mail_oopo_summary_wizard_views.xml",
     ],
     "assets": {
         "web.assets_backend": [
             "mail_oopo/static/src/*.js",
             "mail_oopo/static/src/*.xml",
         ],
+        "web.tests_assets": [
+            "mail_oopo/static/tests/helpers/**/*",
+        ],
+        "web.qunit_suite_tests": [
+            "mail_oopo/static/tests/qunit_suite_tests/**/*.js",
+        ],
     },
     "author": "Odoo Inc",
     "website": "www.odoo.com",
@@ -2,4 +2,11 @@ from . import res_config_settings
 from . import res_users
 from . import mail_bot
 from . import mail_message
-from . import mail_channel
\ No newline at end of file
+from . import mail_channel
+from . import mail_oopo_summary
+from . import mail_oopo_binding
+from . import mail_oopo_circuit
+from . import mail_oopo_result_cursor
+from . import mail_oopo_attachment_text
+from . import mail_oopo_skill
+from . import mail_oopo_profile
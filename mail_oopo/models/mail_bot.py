@@ -1,141 +1,173 @@
-import openai
-import tiktoken
+import cProfile
+import functools
 import json
+import logging
+import os
 import re
+import threading
+import time
 
-from odoo import models, fields, api
-
-# Function definitions
-functions = [
-    {
-        "name": "read_record",
-        "description": "Read a record or records based on the given fields and search domains",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "model": {
-                    "type": "string",
-                    "description": "The name of the model to be read"
-                },
-                "field": {
-                    "type": "array",
-                    "items": {
-                        "type": "string"
-                    },
-                    "description": "Array of field names to be read from the model, "
-                },
-                "search_domains": {
-                    "type": "array",
-                    "items": {
-                        "type": "array",
-                        "items": {
-                            "type": "string",
-                            "description": """Each item is a  must be formatted as a tuple, e.g. ("name", "=", "Mark Cheng")"""
-                        }
-                    },
-                    "description": """Odoo search domains to filter the data. Each domain should be an tuple of strings. \
-                        e.g. [("name", "=", "Mark Cheng"), ("phone", "=", "123")] denotes a domain containing two conditions.""",
-                    "default": []
-                },
-                "limit": {
-                    "type": "integer",
-                    "description": "Limit the number of records to be read",
-                },
-                "order": {
-                    "type": "string",
-                    "description": "Order the records by the given field - example name asc",
-                }
-            },
-            "required": ["model", "field"]
-        }
-    },
-    {
-        "name": "create_record",
-        "description": "Create a new record in a model based on the given fields.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "model": {
-                    "type": "string",
-                    "description": "The name of the model to be read"
-                },
-                "values": {
-                    "type": "array",
-                    "items": {
-                        "type": "string",
-                        "description": """A key-value mapping, both key and value must be strings, \
-                            e.g. {"name": "Hello"}, {"partner_ids": "1", "name": "Hello"}"""
-                    },
-                    "description": """Array of field names to be created as a new record. \
-                        Each field must be a mapping, e.g. [{"name": "Mark Cheng", "phone": 9993336666}]"""
-                },
-            },
-            "required": ["model", "values"]
-        }
-    },
-    {
-        "name": "update_record",
-        "description": """Update an existing record in a model. \
-            The record to update is identified based on the fields and search domain. \
-            The field to update is extracted from the user message.""",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "model": {
-                    "type": "string",
-                    "description": "The name of the model to be read"
-                },
-                "field": {
-                    "type": "array",
-                    "items": {
-                        "type": "string"
-                    },
-                    "description": "Array of field names in order for searching for the record to update."
-                },
-                "field_to_update": {
-                    "type": "array",
-                    "items": {
-                        "type": "string"
-                    },
-                    "description": """Array of field names to be updated. \
-                        Each field must be a key-value pair, e.g. [{"phone": "9993336666"}]"""
-                },
-                "search_domains": {
-                    "type": "array",
-                    "items": {
-                        "type": "array",
-                        "items": {
-                            "type": "string"
-                        }
-                    },
-                    "description": "Odoo search domains to filter the data. Each domain should be an array of strings",
-                    "default": []
-                },
-                "limit": {
-                    "type": "integer",
-                    "description": "Limit the number of records to be read",
-                }
-            },
-            "required": ["model", "field", "field_to_update"]
-        }
-    },
-]
-
-# For the summary command in the chatter this array serves to provide 
-# the 'important' information about a related field so we aren't prompting every field of every relational field
-# TODO make .name ^ .display_name default for all relational fields then add addons here
-# TODO add support for depth2 relational fields when specified e.g res.partner.user_id.name
-relational_bindings = {
-    "res.partner": ["name"],
-    "res.users": ["name"],
-    "sale.order.line": ["name", "qty_to_deliver", "price_unit"],
-    "account.move.line": ["name", "quantity", "price_unit", "price_subtotal"],
-    "stock.move": ["display_name","product_id","product_uom_qty", "forecast_availability", "quantity_done"],
-    "product.product": ["name", "lst_price", "standard_price", "detailed_type"],
-    "mrp.bom.line": ["display_name", "product_qty"],
-    "account.payment.term": ["name", "note"]
+import psycopg2
+
+from contextlib import contextmanager
+from difflib import SequenceMatcher
+
+from odoo import models, fields, api, sql_db, _
+from odoo.exceptions import UserError
+from odoo.tools import config, file_open, html2plaintext
+from odoo.tools.sql import create_index
+
+_logger = logging.getLogger(__name__)
+
+# ``openai`` and ``tiktoken`` are imported on first bot use only, so that workers which never serve
+# the bot do not pay for them at boot. Tokenizers are loaded once per process and shared by all threads.
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+# Function definitions, shared with the external runner of misc/xml_ORM.py.
+with file_open("mail_oopo/data/oopo_functions.json") as functions_file:
+    functions = json.load(functions_file)
+
+# Functions without side effects, whose results can be reused within a question.
+read_only_functions = ("read_record", "read_more", "resolve_names")
+
+# Context window of each routable model, used by the "auto" model router to pick
+# the cheapest model that fits the estimated prompt size.
+model_context_sizes = {
+    "gpt-3.5-turbo-0613": 4096,
+    "gpt-3.5-turbo-16k": 16384,
+    "gpt-4": 8192,
+}
+# Labels of the default models in the model selection.
+model_labels = {
+    "gpt-3.5-turbo-0613": "4k Context Model",
+    "gpt-3.5-turbo-16k": "16k Context Model",
+    "gpt-4": "GPT4 8k",
+}
+# Models tried in order by the router for plain questions and for multi-step create/update plans.
+auto_model_routes = {
+    "read": ["gpt-3.5-turbo-0613", "gpt-3.5-turbo-16k"],
+    "write": ["gpt-4", "gpt-3.5-turbo-16k"],
+}
+# Tokens kept free in the context window for the completion itself.
+completion_token_reserve = 512
+# Tokens of chat history sent along with each request, the oldest messages beyond it are left out.
+history_token_budget = 12000
+# Tokens of attachment excerpts added to a chatter summary prompt.
+attachment_token_budget = 3000
+
+system_prompt_modules = {
+    "base_system_message": """You are Oopo a friendly AI Assistant, users might ask questions, or ask to perform any actions. \ You have full access to the current Odoo environment""",
+    "inline_link_instruction": """You can add links into the text too by adding an <a> tag in this format:
+                <a href='#' data-oe-model='model name' data-oe-id='id number'>test</a>
+
+                e.g., <a href='#' data-oe-model='sale.order' data-oe-id='7'>My sale order</a>
+
+                You should always use links to reference records in the system, as it will make it easier for me to understand what you are referring to.
+
+                Anything that is returned from the `read_record` function should be linked to:
+                <a href='#' data-oe-model='model name' data-oe-id='id number'>Link text</a>
+
+                For instance, if the `read_record` function returns a sale order with ID 7, create the link like this:
+                <a href='#' data-oe-model='sale.order' data-oe-id='7'>Sale Order 7</a>
+
+                By consistently including links in the responses, we can maintain a more structured and interactive conversation.
+                
+                Please avoid using the square bracket format like this [Product 45](#&data-oe-model=product.product&data-oe-id=45) for links, as it is not the correct format. Always use the "<a>" tag as shown in the examples above to create links.""",
+    "read_fields_prompt": """provides several functions to interact with the database, including querying records, creating new records, and updating existing records.
+
+                To query records, you can use the `read_record` function, which retrieves specific fields from the given model. For example, to get the most recent three sale orders, you can use the `read_record` function with the appropriate arguments (`model`, `field`, `order`, and `limit`) as shown below:
+
+                ```
+                ODOOGPT FUNCTION CALL: read_record
+                ODOOGPT FUNCTION ARGUMENTS: {'model': 'sale.order', 'field': ['name', 'date_order'], 'order': 'date_order desc', 'limit': 3}
+                ```
+
+                When you are unsure about the ID of a record, you can perform a search using the `read_record` function with appropriate search filters. For instance, if you want to find the ID of a product with a name containing "cabinet," you can use the `read_record` function with the search domain `[['name', '=ilike', '%cabinet%']]` as shown below:
+
+                ```
+                ODOOGPT FUNCTION CALL: read_record
+                ODOOGPT FUNCTION ARGUMENTS: {'model': 'product.product', 'field': ['id'], 'search_domains': [['name', '=ilike', '%cabinet%']], 'limit': 1}
+                ```
+
+                Remember, the IDs returned from previous function calls can be used as arguments in subsequent function calls to establish relationships between records.""",
+    "write_fields_prompt": """
+                To create a new record, you can use the `create_record` function. For instance, to create a new customer named "Diego," you can use the `create_record` function with the desired `model` and `values` as shown below:
+
+                ```
+                ODOOGPT FUNCTION CALL: create_record
+                ODOOGPT FUNCTION ARGUMENTS: {'model': 'res.partner', 'values': [{'name': 'Diego'}]}
+                ```
+
+                To update an existing record, you can use the `update_record` function. For example, if you want to update the phone number and email of the customer named "Diego" to "99999999" and "jot@odooooo.com" respectively, you can use the `update_record` function with the appropriate arguments (`model`, `field`, `field_to_update`, `search_domains`, and `limit`) as shown below:
+
+                ```
+                ODOOGPT FUNCTION CALL: update_record
+                ODOOGPT FUNCTION ARGUMENTS: {'model': 'res.partner', 'field': ['name'], 'field_to_update': [{'phone': '99999999', 'email': 'jot@odooooo.com'}], 'search_domains': [['name', '=', 'Diego']], 'limit': 1}
+                ```
+
+                One important concept to understand is the usage of relational fields. In some cases, you might need to reference the ID of a record when creating or updating another record with a relationship. For example, to create a sale order for a customer, you need to pass the customer's ID as the value for the `partner_id` field in the `sale.order` model, which you can find with `read_record` first.""",
+    "search_domains": """Domain criteria can be combined using 3 logical operators than can be added between tuples:
+
+                '&' (logical AND, default)
+                '|' (logical OR)
+                '!' (logical NOT)
+                These are prefix operators and the arity of the '&' and '|' operator is 2, while the arity of the '!' is just 1. Be very careful about this when you combine them the first time.
+
+                Here is an example of searching for Partners named ABC from Belgium and Germany whose language is not english ::
+
+                [('name','=','ABC'),'!',('language.code','=','en_US'),'|',
+                ('country_id.code','=','be'),('country_id.code','=','de')]
+                The '&' is omitted as it is the default, and of course we could have used '!=' for the language, but what this domain really represents is::
+
+                [(name is 'ABC' AND (language is NOT english) AND (country is Belgium OR Germany))]
+
+                For example if I ask, are you familiar with product x,y,z 
+
+                And you need to get the product ids of x,y,z
+
+                You can use the search domain like this:
+
+                search_domains: ["|", "|", ['name', 'ilike', '%x%'], ['name', 'ilike', '%y%'], ['name', 'ilike', '%z%']]
+
+                or if you just wanted X or Y, you could do:
+
+                search_domains: ["|", ['name', 'ilike', '%x%'], ['name', 'ilike', '%y%']]
+                
+                """
 }
 
+# Intents triggering each prompt module, None for the modules sent with every request.
+# Reading is always assumed, so only the create/update tutorial can be left out.
+prompt_module_intents = {
+    "base_system_message": None,
+    "inline_link_instruction": ("read", "write"),
+    "read_fields_prompt": ("read", "write"),
+    "write_fields_prompt": ("write",),
+    "search_domains": ("read", "write"),
+}
+# Imperative verbs revealing an intent beyond reading, at the start of the message or of one of its sentences,
+# possibly after a mention or a polite phrase, e.g. "please set the phone of ...", but not "which orders are set to done".
+_intent_prefix = r"(?:^|[.!?;:\n]\s*)(?:<[^>]+>\s*)*(?:@\S+\s+)?(?:(?:please|kindly|can you|could you|would you|will you|i want to|i need to|i'd like to|i would like to|let's|go ahead and)\s+)*"
+intent_patterns = {
+    "write": re.compile(_intent_prefix + r"(?:create|add|make|update|change|set|modify|edit|rename|assign|confirm|cancel)\b"),
+}
+# Functions of a plan which create or update records.
+write_functions = ("create_record", "update_record")
+# Last line of the CoT plan, listing the CRUD operations it needs.
+_plan_operations_re = re.compile(r"^\s*OPERATIONS:(.*)$", re.MULTILINE | re.IGNORECASE)
+# Assembled system messages per tuple of prompt modules, with their token count, and token cost of each module.
+_system_message_variants = {}
+# Chat histories formatted when the OdooBot chat was opened, keyed by (database, channel id, user id).
+# They live in the worker that served the pre-warm request, like the tokenizer it loads.
+_prewarmed_histories = {}
+_prewarmed_histories_lock = threading.Lock()
+# Seconds a pre-warmed history is kept for the next question.
+prewarm_ttl = 300
+_prompt_module_tokens = {}
+# Token count of each function definition, keyed by its JSON, so that routing every round does not re-encode them.
+_function_token_counts = {}
+
 summary_prompt = """
         You are a friendly AI Odoo Assistant.
 
@@ -143,7 +175,8 @@ summary_prompt = """
         Your response must be professional and concise.
 
         The record information starts with a record description and model_name(record_id),
-        and is followed by the fields information, i.e. field description [field_name] = field_value.
+        and is followed by the fields information, i.e. field description [field_name] = field_value,
+        and by excerpts of the documents attached to the record, i.e. 'file name' [attachment] = excerpts.
 
         <Record information starts>
         {prompt}
@@ -156,6 +189,57 @@ summary_prompt = """
         Don't just list the fields, rather summarize the record in a business context as a whole
             """
 
+summary_delta_prompt = """
+        You are a friendly AI Odoo Assistant.
+
+        Below is a summary you previously wrote about a record, followed by the fields of the record
+        that changed since then, i.e. field description [field_name] = field_value.
+
+        <Previous summary starts>
+        {summary}
+        <Previous summary ends>
+
+        <Changed record information starts>
+        {prompt}
+        <Changed record information ends>
+
+        Selection fields return tuples with (technical_name, display_name)
+
+        Rewrite the summary so that it reflects the changed information. Keep everything that did not change.
+        Please keep the summary concise and professional, in a business context - not a technical one.
+            """
+
+# Base URL of the OpenAI API, used for moderation whatever the completion provider.
+openai_api_base = "https://api.openai.com/v1"
+
+class PromptMessage(dict):
+    """A message of a ChatCompletion request that remembers its token count, e.g. the stored count of a history
+    message, so that it is only encoded once per question. It is sent to the API like any dict."""
+    token_count = None
+
+def is_token_limit_error(error):
+    error_message = str(error)
+    return "reduce" in error_message or "maximum context length" in error_message
+
+def send_chat_completion(candidate_params, create=None):
+    """Send the request with the params of each candidate model in turn, falling back to the next one on token
+    limit errors. ``create`` sends one request, by default a plain HTTP call to the OpenAI API which involves
+    no environment, so that it can run in a worker thread."""
+    import openai
+
+    if create is None:
+        create = lambda params: openai.ChatCompletion.create(**params)
+    for index, params in enumerate(candidate_params):
+        try:
+            response = create(params)
+        except openai.error.InvalidRequestError as e:
+            if index + 1 < len(candidate_params) and is_token_limit_error(e):
+                print(f"\033[93m Token limit reached on {params['model']}, falling back to {candidate_params[index + 1]['model']} \033[0m")
+                continue
+            raise
+        print(f"\033[92m Routed Model: {params['model']} \033[0m")
+        return response
+
 class MailBot(models.AbstractModel):
     _inherit = "mail.bot"
 
@@ -168,19 +252,75 @@ class MailBot(models.AbstractModel):
             return
         
         if self._is_bot_pinged(values) or self._is_bot_in_private_channel(record):
-            body = values.get("body", "").replace(u"\xa0", u" ").strip().lower().strip(".!")
-            answer, message_type = self._get_answer(record, body, values, command)
-            if answer:
-                subtype_id = self.env["ir.model.data"]._xmlid_to_res_id("mail.mt_comment")
-                record.with_context(mail_create_nosubscribe=True).sudo().message_post(body=answer, author_id=odoobot_id, message_type=message_type, subtype_id=subtype_id)
+            if self.env.user._oopo_consume_profiling():
+                self._reply_profiled(record, values, command)
+            else:
+                self._reply(record, values, command)
+
+    def _reply(self, record, values, command=None):
+        odoobot_id = self.env["ir.model.data"]._xmlid_to_res_id("base.partner_root")
+        body = values.get("body", "").replace(u"\xa0", u" ").strip().lower().strip(".!")
+        answer, message_type = self._get_answer(record, body, values, command)
+        if answer:
+            subtype_id = self.env["ir.model.data"]._xmlid_to_res_id("mail.mt_comment")
+            with self._profile_span("post", record._name):
+                return record.with_context(mail_create_nosubscribe=True).sudo().message_post(body=answer, author_id=odoobot_id, message_type=message_type, subtype_id=subtype_id)
+        return None
+
+    def _reply_profiled(self, record, values, command=None):
+        """Answer under the Python profiler, timing the steps of the answer, and store the report."""
+        question = self.env["mail.message"].search([
+            ("model", "=", record._name),
+            ("res_id", "=", record.id),
+            ("author_id", "=", values.get("author_id")),
+        ], order="id desc", limit=1)
+        profile = {"spans": [], "question": html2plaintext(values.get("body") or "")}
+        thread = threading.current_thread()
+        if not hasattr(thread, "query_count"):
+            # Only set for HTTP requests, the cursors count the queries of the thread once they exist.
+            thread.query_count, thread.query_time = 0, 0
+        start_time, query_count, query_time = time.monotonic(), thread.query_count, thread.query_time
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            reply = self.with_context(oopo_profile=profile)._reply(record, values, command)
+        finally:
+            profiler.disable()
+        profile_record = self.env["mail.oopo.profile"].sudo()._store(
+            profile, profiler, question, reply, time.monotonic() - start_time,
+            thread.query_count - query_count, thread.query_time - query_time,
+        )
+        print(f"\033[93m Question profiled in {profile_record.report_filename} \033[0m")
+
+    @contextmanager
+    def _profile_span(self, kind, name):
+        """Time a step of the answer when it is profiled, along with the SQL queries it made.
+        Yields the span to add details to, or None when the question is not profiled."""
+        profile = self.env.context.get("oopo_profile")
+        if profile is None:
+            yield None
+            return
+        thread = threading.current_thread()
+        start_time, query_count, query_time = time.monotonic(), getattr(thread, "query_count", 0), getattr(thread, "query_time", 0)
+        span = {"kind": kind, "name": name}
+        try:
+            yield span
+        finally:
+            span.update(
+                duration=time.monotonic() - start_time,
+                queries=getattr(thread, "query_count", 0) - query_count,
+                query_time=getattr(thread, "query_time", 0) - query_time,
+            )
+            profile["spans"].append(span)
 
     def _get_answer(self, channel, body, values, command):
         odoobot_id = self.env["ir.model.data"]._xmlid_to_res_id("base.partner_root")
         api_key = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.openapi_api_key")
 
-        if not api_key:
+        # On-premise OpenAI-compatible servers usually do not check the key.
+        if not api_key and self._get_llm_provider() == "openai":
             return "Please set the OpenAI API key in the settings under integrations", "comment"
-        openai.api_key = api_key
 
         fail_moderation_check = self._get_chat_completion(messages=body)
         if isinstance(fail_moderation_check, str):
@@ -192,55 +332,92 @@ class MailBot(models.AbstractModel):
             response = self._process_query_in_chatter(channel, body)
             return response
 
-        msgs = self._get_relevant_chat_history(channel)
-        gpt_arr = self._build_chatgpt_request(msgs)
+        self = self.with_context(oopo_channel_id=channel.id)
+        with self._profile_span("history", channel.display_name):
+            msgs = self._get_relevant_chat_history(channel)
+        intents = self._detect_intents(body)
+        gpt_arr = self._build_chatgpt_request(msgs, intents)
 
         response = self._pre_prompt(gpt_arr)
 
         if isinstance(response, str):
             return response, "comment"
+        if self._is_write_plan(response):
+            self = self.with_context(oopo_task="write")
+            if "write" not in intents:
+                intents.add("write")
+                gpt_arr[0] = self._get_system_prompt_message(intents)
         
+        callable_functions = self._get_callable_functions()
         is_function_call, function_call_fail, response = True, False, None
         loop_count, timeout = 0, 20
+        # Wall-clock budget in seconds, and how many times an identical failing call may be repeated before giving up.
+        start_time, time_budget = time.monotonic(), 180
+        max_failure_repeats = 2
         functional_msg_saved = []
+        function_memo, failure_counts = {}, {}
+        loop_error = None
 
-        while is_function_call:
-            if loop_count >= timeout:
-                break
-
-            response = self._get_chat_completion(messages=gpt_arr, callable_functions=functions, temperature=0.5)
-            if isinstance(response, str):
-                return response, "comment"
-            gpt_arr.append(dict(response["choices"][0]["message"]))
+        # Read-only function calls of this question share one cursor, opened by the first of them.
+        read_only_cursor = {}
+        self = self.with_context(oopo_read_only_cursor=read_only_cursor)
+        try:
+            while is_function_call:
+                if loop_count >= timeout:
+                    break
+                if time.monotonic() - start_time > time_budget:
+                    print("\033[91m" + "ODOOGPT TIME BUDGET EXCEEDED" + "\033[0m")
+                    break
+
+                response = self._get_chat_completion(messages=gpt_arr, callable_functions=callable_functions, temperature=0.5)
+                if isinstance(response, str):
+                    return response, "comment"
+                gpt_arr.append(PromptMessage(response["choices"][0]["message"]))
     
-            is_function_call = response["choices"][0]["message"].get("function_call") is not None
-            if not is_function_call:
-                break
-
-            print("\033[96m" + "CALL #: " + str(loop_count+1) + "\033[0m")
-
-            function_response, function_call_fail, error_message, model_name = self._execute_function_call(response["choices"][0]["message"])
-            gpt_arr.append(function_response)
-            if function_call_fail:
-                user_prompt = self._tailor_user_prompt(body, error_message, model_name)
-                gpt_arr.append({"role": "user", "content": user_prompt})
-            if not function_call_fail:
-                functional_msg_saved.append((dict(response["choices"][0]["message"]), "bot_function_request"))
-                functional_msg_saved.append((function_response, "bot_function"))
-            loop_count +=1
+                is_function_call = response["choices"][0]["message"].get("function_call") is not None
+                if not is_function_call:
+                    break
+
+                print("\033[96m" + "CALL #: " + str(loop_count+1) + "\033[0m")
+
+                function_response, function_call_fail, error_message, model_name = self._execute_function_call(response["choices"][0]["message"], function_memo)
+                gpt_arr.append(PromptMessage(function_response))
+                if function_call_fail:
+                    memo_key = self._get_function_memo_key(response["choices"][0]["message"])
+                    failure_counts[memo_key] = failure_counts.get(memo_key, 0) + 1
+                    if failure_counts[memo_key] > max_failure_repeats:
+                        loop_error = (memo_key[0], error_message)
+                        break
+                    if failure_counts[memo_key] > 1:
+                        user_prompt = self._get_repeated_failure_hint(body, memo_key[0], error_message)
+                    else:
+                        user_prompt = self._tailor_user_prompt(body, error_message, model_name)
+                    gpt_arr.append(PromptMessage({"role": "user", "content": user_prompt}))
+                if not function_call_fail and response["choices"][0]["message"]["function_call"]["name"] not in read_only_functions:
+                    self = self.with_context(oopo_has_written=True)
+                if not function_call_fail:
+                    functional_msg_saved.append((dict(response["choices"][0]["message"]), "bot_function_request"))
+                    functional_msg_saved.append((function_response, "bot_function"))
+                loop_count +=1
+        finally:
+            self._close_read_only_cursor()
 
         final_response = response["choices"][0]["message"]["content"]
         if not function_call_fail and final_response:
             for message, message_type in functional_msg_saved:
                 self._create_functional_message(channel, message, message_type)
         
+        if loop_error:
+            function_name, error_message = loop_error
+            final_response = f"""I am sorry that I failed to process your query, the function {function_name} kept failing with: {error_message}. \
+                Please provide more details/instructions and retry!"""
         if not final_response:
             final_response = "I am sorry that I failed to process your query, please provide more details/instructions and retry!"
         final_response = self._def_transform_links(final_response)
 
         return final_response, "comment"
     
-    def _get_field_info(self, field, target_field, field_val, relational_bindings):
+    def _get_field_info(self, field, target_field, field_val, relational_bindings, binding_values=None):
         field_string = target_field['string']
 
         field_info = None
@@ -255,74 +432,239 @@ class MailBot(models.AbstractModel):
             elif target_field["type"] == "selection":
                 selected_item = next(item for item in target_field['selection'] if item[0] == field_val)
                 field_info = f"'{field_string}' [{field}] = {selected_item}\n"
-            elif target_field["type"] == "many2one" and target_field["relation"] in relational_bindings:
-                deep_field_metadata = field_val.fields_get()
-                relevant_field_names = relational_bindings[target_field["relation"]]
-                related_values = [f"{deep_field_metadata[rel_field]['string']} = {field_val[rel_field]}" for rel_field in relevant_field_names]
-                field_info = f"'{field_string}' [{field}] = {field_string} with the following values: {', '.join(related_values)}\n"
+            elif target_field["type"] == "many2one":
+                related_values = self._format_binding_values(field_val, relational_bindings, binding_values)
+                field_info = f"'{field_string}' [{field}] = {field_string} with the following values: {related_values[0]}\n"
             elif target_field["type"] == "one2many" and target_field["relation"] in relational_bindings:
                 field_info = f"'{field_string}' [{field}] = {field_string} with the following values:\n"
-                for record in field_val:
-                    deep_field_metadata = record.fields_get()
-                    relevant_field_names = relational_bindings[target_field["relation"]]
-                    related_values = [f"{deep_field_metadata[rel_field]['string']} = {record[rel_field]}" for rel_field in relevant_field_names]
-                    field_info += ", ".join(related_values) + "\n"
+                for related_values in self._format_binding_values(field_val, relational_bindings, binding_values):
+                    field_info += related_values + "\n"
             else:
                 field_info = f"'{field_string}' [{field}] = {field_val}\n"
         
         return field_info
-    
-    def _construct_summary_prompt(self, channel, fields_metadata, relational_bindings):
-        prompt = f"Record Information: {channel._description} {getattr(channel, 'name', channel.display_name)} [{str(channel)}]\n"
-        prompt_list = [prompt]
 
+    def _format_binding_values(self, records, relational_bindings, binding_values=None):
+        """Format the bound field paths of each related record, e.g. ``Name = Desk, Unit Price = 10.0``.
+        Values are taken from ``binding_values`` when they were read upfront, otherwise read in one batch."""
+        binding = self.env["mail.oopo.binding"]
+        field_paths = relational_bindings.get(records._name, ("display_name",))
+        model_values = (binding_values or {}).get(records._name, {})
+        if not all(record_id in model_values for record_id in records.ids):
+            model_values = binding._read_paths(records, field_paths)
+        labels = {field_path: binding._get_path_label(records._name, field_path) for field_path in field_paths}
+        return [
+            ", ".join(f"{labels[field_path]} = {model_values[record_id].get(field_path)}" for field_path in field_paths)
+            for record_id in records.ids
+        ]
+
+    def _read_summary_bindings(self, records, fields_metadata, relational_bindings):
+        """Read the bound field paths of every record related to ``records`` with one batch per related model,
+        so that formatting the summary prompts of many records does not query row by row.
+        Returns ``{model: {record_id: {field_path: value}}}``."""
+        related_records = {}
+        for field, target_field in fields_metadata.items():
+            if target_field["type"] == "many2one" or (target_field["type"] == "one2many" and target_field["relation"] in relational_bindings):
+                relation = target_field["relation"]
+                related_records[relation] = related_records.get(relation, self.env[relation]) | records.mapped(field)
+
+        binding = self.env["mail.oopo.binding"]
+        return {
+            model: binding._read_paths(related, relational_bindings.get(model, ("display_name",)))
+            for model, related in related_records.items()
+        }
+    
+    def _get_summary_field_infos(self, channel, fields_metadata, relational_bindings, binding_values=None):
+        """Format every relevant field of the record, keyed by field name."""
         ignored_fields = ("Followers", "Followers (Partners)", "Messages", "Website Messages")
+        field_infos = {}
 
         for field, target_field in fields_metadata.items():
             if target_field["string"] in ignored_fields:
                 continue
             
             field_val = channel[field]
-            field_info = self._get_field_info(field, target_field, field_val, relational_bindings)
+            field_info = self._get_field_info(field, target_field, field_val, relational_bindings, binding_values)
 
             if field_info:
-                prompt_list.append(field_info)
+                field_infos[field] = field_info
+        return field_infos
+
+    def _select_summary_attachment_chunks(self, channel, query=None):
+        """Select the chunks of the record attachments most relevant to ``query``, from their stored terms and
+        token counts only. Only already extracted attachments are included, the others are queued for extraction.
+        Returns ``[(attachment, text, [chunk_index, ...])]``."""
+        attachments = self.env["ir.attachment"].search([("res_model", "=", channel._name), ("res_id", "=", channel.id), ("type", "=", "binary")], order="id")
+        if not attachments:
+            return []
+        attachment_text = self.env["mail.oopo.attachment.text"].sudo()
+        texts = attachment_text._get_texts(attachments)
+        selected = attachment_text._select_chunks(attachments, texts, query or "", attachment_token_budget, lambda chunk: len(self._get_encoding().encode(chunk)))
+        return [(attachment, texts[attachment.checksum], indexes) for attachment, indexes in selected]
+
+    def _get_summary_attachment_infos(self, selected_chunks):
+        """Format the selected excerpts of the record attachments, keyed like field infos."""
+        return {
+            f"attachment_{attachment.id}": f"'{attachment.name}' [attachment] = " + "\n...\n".join(text.chunks[index] for index in indexes) + "\n"
+            for attachment, text, indexes in selected_chunks
+        }
+
+    def _get_summary_record_header(self, channel):
+        return f"Record Information: {channel._description} {getattr(channel, 'name', channel.display_name)} [{str(channel)}]\n"
+
+    def _construct_summary_prompt(self, channel, fields_metadata, relational_bindings, field_infos=None):
+        if field_infos is None:
+            field_infos = self._get_summary_field_infos(channel, fields_metadata, relational_bindings)
+        prompt_list = [self._get_summary_record_header(channel)]
+        prompt_list += field_infos.values()
         
         prompt = "".join(prompt_list)
         constructed_prompt = summary_prompt.format(prompt=prompt)
         return constructed_prompt
+
+    def _construct_summary_delta_prompt(self, channel, previous_summary, changed_field_infos):
+        prompt = "".join([self._get_summary_record_header(channel)] + list(changed_field_infos.values()))
+        return summary_delta_prompt.format(summary=previous_summary, prompt=prompt)
         
     def _process_query_in_chatter(self, channel, body):
-        fields_metadata = channel.fields_get()
-        constructed_prompt = self._construct_summary_prompt(channel, fields_metadata, relational_bindings)
+        summary, msgs, cache_values = self._prepare_summary_request(channel, query=html2plaintext(body))
+        if summary is not None:
+            return summary, "notification"
+
+        response = self._get_chat_completion(messages=msgs, model="auto")
+        if isinstance(response, str):
+            return response, "notification"
+
+        summary = response["choices"][0]["message"]["content"]
+        self.env["mail.oopo.summary"].sudo()._store(channel, *cache_values, summary)
+        return summary, "notification"
+
+    def _prepare_summary_request(self, channel, fields_metadata=None, binding_values=None, query=None):
+        """Return ``(cached_summary, messages, cache_values)`` for summarizing a record. When the cached summary
+        is still valid, ``messages`` is None, otherwise ``cache_values`` has to be stored along with the new summary.
+        ``query`` selects the attachment excerpts included in the prompt, they are part of the fingerprint so that
+        a summary built from the excerpts of another query is not served as is."""
+        relational_bindings = self.env["mail.oopo.binding"]._get_relational_bindings()
+        summary_cache = self.env["mail.oopo.summary"].sudo()
+        cache = summary_cache._get_cache(channel)
+        selected_chunks = self._select_summary_attachment_chunks(channel, query)
+        fingerprint = summary_cache._compute_fingerprint(channel, relational_bindings, selected_chunks)
+        if cache and cache.fingerprint == fingerprint:
+            print("\033[92m Summary Cache Hit \033[0m")
+            return cache.summary, None, None
+
+        if fields_metadata is None:
+            with self._profile_span("fields_get", channel._name):
+                fields_metadata = channel.fields_get()
+        if binding_values is None:
+            binding_values = self._read_summary_bindings(channel, fields_metadata, relational_bindings)
+        field_infos = self._get_summary_field_infos(channel, fields_metadata, relational_bindings, binding_values)
+        field_infos.update(self._get_summary_attachment_infos(selected_chunks))
+        if cache and cache.summary:
+            changed_field_infos = cache._get_changed_field_infos(field_infos)
+            if not changed_field_infos:
+                cache.fingerprint = fingerprint
+                return cache.summary, None, None
+            constructed_prompt = self._construct_summary_delta_prompt(channel, cache.summary, changed_field_infos)
+        else:
+            constructed_prompt = self._construct_summary_prompt(channel, fields_metadata, relational_bindings, field_infos)
 
         msgs = [{'role': 'system', 'content': constructed_prompt}]
-        response = self._get_chat_completion(messages=msgs, model="gpt-3.5-turbo-0613")
-        return response["choices"][0]["message"]["content"], "notification"
+        return None, msgs, (fingerprint, field_infos)
 
     
-    def _build_chatgpt_request(self, msgs):
+    def _build_chatgpt_request(self, msgs, intents=None):
         odoobot_id = self.env["ir.model.data"]._xmlid_to_res_id("base.partner_root")
-        chatgpt_msgs_arr = [{"role":"system", "content": self._select_system_message()}, {"role": "assistant", "content": self.first_msg}]
-        
+        chatgpt_msgs_arr = [self._get_system_prompt_message(intents), PromptMessage({"role": "assistant", "content": self.first_msg})]
+        # Token counts stored on the messages, reused by the model router instead of encoding the history every round.
+        token_counts = {
+            message["id"]: message["oopo_token_count"]
+            for message in self.env["mail.message"].sudo().browse([message["id"] for message in msgs[1:]]).read(["oopo_token_count"])
+        }
+
+        def prompt_message(values, message_id):
+            prompt_message = PromptMessage(values)
+            prompt_message.token_count = token_counts.get(message_id) or None
+            return prompt_message
+
         for message in msgs[1:]:
             body = str(message["body"]).replace("<p>", "").replace("</p>", "")
             if message["author"]["id"] == odoobot_id:
                 if body != self.first_msg and message["message_type"] == "comment":
-                    chatgpt_msgs_arr.append({"role": "assistant", "content": body})
+                    chatgpt_msgs_arr.append(prompt_message({"role": "assistant", "content": body}, message["id"]))
                 elif message["message_type"] == "bot_function":
-                    chatgpt_msgs_arr.append(message["function_content"])
+                    chatgpt_msgs_arr.append(prompt_message(message["function_content"], message["id"]))
                 elif message["message_type"] == "bot_function_request":
-                    chatgpt_msgs_arr.append(message["function_content"])
+                    chatgpt_msgs_arr.append(prompt_message(message["function_content"], message["id"]))
             else:
-                chatgpt_msgs_arr.append({"role": "user", "content": body})
+                chatgpt_msgs_arr.append(prompt_message({"role": "user", "content": body}, message["id"]))
         return chatgpt_msgs_arr
 
-    def _get_relevant_chat_history(self, channel):
-        msgs = channel._channel_fetch_message(limit=None)
-        msgs = [msg for msg in msgs if msg["body"] != "" or msg.get("message_type") == "bot_function" or msg.get("message_type") == "bot_function_request"]
-        msgs.reverse()
+    def _get_relevant_chat_history(self, channel, use_prewarmed=True):
+        prewarmed = use_prewarmed and self._pop_prewarmed_history(channel)
+        if prewarmed:
+            # Only the messages posted since the pre-warm, i.e. the question, are left to format.
+            last_message_id, msgs = prewarmed
+            new_message_ids = self.env["mail.message"].search([("model", "=", "mail.channel"), ("res_id", "=", channel.id), ("id", ">", last_message_id)], order="id asc").ids
+            print("\033[92m Prewarmed History Hit \033[0m")
+            return msgs + self._format_chat_history(new_message_ids)
+
+        message_ids = channel._oopo_get_message_ids_within_budget(history_token_budget)
+        # The first message is the greeting, which ``_build_chatgpt_request`` expects and skips.
+        first_message = self.env["mail.message"].search([("model", "=", "mail.channel"), ("res_id", "=", channel.id)], order="id asc", limit=1)
+        if first_message and first_message.id not in message_ids:
+            message_ids.insert(0, first_message.id)
+        msgs = self._format_chat_history(message_ids)
+        # A function response cut from its request by the budget is rejected by the API.
+        while len(msgs) > 1 and msgs[1].get("message_type") == "bot_function":
+            msgs.pop(1)
         return msgs
+
+    def _format_chat_history(self, message_ids):
+        msgs = self.env["mail.message"].browse(message_ids).with_context(oopo_function_trace=True).message_format()
+        return [msg for msg in msgs if msg["body"] != "" or msg.get("message_type") == "bot_function" or msg.get("message_type") == "bot_function_request"]
+
+    def _prewarm(self, channel):
+        """Load what the first answer in ``channel`` needs before the question is sent: the LLM client, tokenizer,
+        model metadata, system prompt variants, relational bindings and the formatted chat history."""
+        key = (self.env.cr.dbname, channel.id, self.env.uid)
+        last_message_id = self.env["mail.message"].search([("model", "=", "mail.channel"), ("res_id", "=", channel.id)], order="id desc", limit=1).id
+        prewarmed = _prewarmed_histories.get(key)
+        if prewarmed and prewarmed[0] > time.monotonic() and prewarmed[1] == last_message_id:
+            return
+
+        start_time = time.monotonic()
+        import openai  # noqa: F401
+        self._get_encoding()
+        self._get_model_context_sizes()
+        self._get_prompt_module_tokens()
+        self._select_system_message({"read"})
+        self.env["mail.oopo.binding"]._get_relational_bindings()
+        msgs = self._get_relevant_chat_history(channel, use_prewarmed=False)
+
+        with _prewarmed_histories_lock:
+            now = time.monotonic()
+            for expired_key in [item_key for item_key, item in _prewarmed_histories.items() if item[0] <= now]:
+                del _prewarmed_histories[expired_key]
+            _prewarmed_histories[key] = (now + prewarm_ttl, last_message_id, msgs)
+        print(f"\033[92m Prewarmed OdooBot chat {channel.id} in {time.monotonic() - start_time:.2f}s \033[0m")
+
+    def _pop_prewarmed_history(self, channel):
+        """Return ``(last_message_id, msgs)`` pre-warmed for ``channel`` and the current user, if not expired and
+        all its messages still exist. A pre-warmed history serves one question only."""
+        with _prewarmed_histories_lock:
+            prewarmed = _prewarmed_histories.pop((self.env.cr.dbname, channel.id, self.env.uid), None)
+        if not prewarmed or prewarmed[0] <= time.monotonic():
+            return None
+        # Messages deleted since the pre-warm, or a history reset, make the formatted history stale.
+        message_ids = {msg["id"] for msg in prewarmed[2]} | {prewarmed[1]}
+        if self.env["mail.message"].sudo().search_count([("id", "in", list(message_ids))]) != len(message_ids):
+            return None
+        return prewarmed[1:]
+
+    def _drop_prewarmed_history(self, channel):
+        with _prewarmed_histories_lock:
+            _prewarmed_histories.pop((self.env.cr.dbname, channel.id, self.env.uid), None)
     
     def _create_functional_message(self, channel, content, message_type):
         odoobot_id = self.env["ir.model.data"]._xmlid_to_res_id("base.partner_root")
@@ -353,12 +695,48 @@ class MailBot(models.AbstractModel):
         return True
     
     def get_model(self):
-        return self.env.user.openai_model
+        """Model selected by the current user, or "auto" when it is no longer among the configured models."""
+        model = self.env.user.openai_model
+        if model not in self._get_model_context_sizes():
+            return "auto"
+        return model
     
-    def _execute_function_call(self, message):
+    def _get_function_memo_key(self, message):
+        """Identify a function call by its name and canonicalized arguments, so that identical calls compare equal
+        whatever the key order or spacing of the generated JSON."""
+        function_name = message["function_call"]["name"]
+        arguments = message["function_call"]["arguments"]
+        try:
+            arguments = json.dumps(json.loads(arguments), sort_keys=True)
+        except ValueError:
+            pass
+        return function_name, arguments
+
+    def _execute_function_call(self, message, function_memo=None):
+        """Execute the function call requested by GPT. When ``function_memo`` is given, results of read-only calls
+        and failures are memoized in it, and any successful mutating call invalidates it."""
         function_name = message["function_call"]["name"]
         print("\033[95m" + "ODOOGPT FUNCTION CALL: " + function_name + "\033[0m")
 
+        memo_key = self._get_function_memo_key(message)
+        if function_memo is not None and memo_key in function_memo:
+            print("\033[95m" + "ODOOGPT FUNCTION MEMO HIT" + "\033[0m")
+            return function_memo[memo_key]
+        with self._profile_span("function", function_name) as span:
+            function_result = self._run_function_call(message)
+            if span is not None:
+                span["failed"] = function_result[1]
+        if function_memo is not None:
+            function_call_fail = function_result[1]
+            if not function_call_fail and function_name not in read_only_functions:
+                function_memo.clear()
+            else:
+                function_memo[memo_key] = function_result
+        return function_result
+
+    def _run_function_call(self, message):
+        function_name = message["function_call"]["name"]
+
         kwargs = None
         function_call_fail, model_name, error_message = False, None, None
         try:
@@ -375,21 +753,83 @@ class MailBot(models.AbstractModel):
 
         print("\033[95m" + "ODOOGPT FUNCTION ARGUMENTS: " + str(kwargs) + "\033[0m")
         
-        chat_result = None
-        model_name = kwargs["model"]
+        model_name = kwargs.get("model")
+        if function_name == "resolve_names" and isinstance(kwargs.get("names"), list):
+            # Point the error hint to the first unknown model, if any.
+            names_models = [item.get("model") for item in kwargs["names"] if isinstance(item, dict)]
+            model_name = next((model for model in names_models if model and model not in self.env), None)
+        if function_name in read_only_functions and not self.env.context.get("oopo_has_written"):
+            # Reads need no flushing savepoint on the primary transaction, run them on a separate read-only cursor.
+            # Once something was written in this question, reads must see it and stay on the current cursor.
+            with self._read_only_cursor() as cr:
+                bot = self.with_env(self.env(cr=cr))
+                savepoint = cr.savepoint(flush=True)
+                function_result = bot._call_function(function_name, kwargs, model_name)
+                if function_result[1]:
+                    savepoint.rollback()
+                return function_result
+
+        # Later reads stay on the current cursor, see above.
+        self._close_read_only_cursor()
         savepoint = self.env.cr.savepoint(flush=True) 
+        function_result = self._call_function(function_name, kwargs, model_name)
+        if function_result[1]:
+            savepoint.rollback()
+        return function_result
+
+    def _call_function(self, function_name, kwargs, model_name):
+        chat_result = None
+        function_call_fail, error_message = False, None
         try:
             function_to_call = self._get_avalaible_function_dict()[function_name]
             result = function_to_call(**kwargs)
             print("\033[95m" + "ODOOGPT FUNCTION RESULT: " + str(result) + "\033[0m")
-            chat_result = self._construct_function_response(function_name, str(result))
+            chat_result = self._construct_function_response(function_name, self._serialize_function_result(result))
         except Exception as e:
-            savepoint.rollback()
             function_call_fail, error_message = True, e
             print("\033[91m" + "ODOOGPT FUNCTION ERROR: " + str(e) + "\033[0m")
             chat_result = self._construct_function_response(function_name, str(e))
         return chat_result, function_call_fail, error_message, model_name
+
+    @contextmanager
+    def _read_only_cursor(self):
+        """Read-only cursor on the streaming replica configured in ``mail_oopo.replica_uri``, or on the primary database.
+        Within a question, the cursor is opened by the first read and kept for the next ones until
+        ``_close_read_only_cursor``, instead of connecting for every function call."""
+        shared = self.env.context.get("oopo_read_only_cursor")
+        if shared is not None:
+            if "cr" not in shared:
+                shared["cr"] = self._open_read_only_cursor()
+            yield shared["cr"]
+            return
+        cr = self._open_read_only_cursor()
+        try:
+            yield cr
+        finally:
+            cr.rollback()
+            cr.close()
+
+    def _open_read_only_cursor(self):
+        replica_uri = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.replica_uri")
+        if replica_uri:
+            cr = sql_db.db_connect(replica_uri, allow_uri=True).cursor()
+        else:
+            cr = self.env.registry.cursor()
+        cr.execute("SET TRANSACTION READ ONLY")
+        return cr
+
+    def _close_read_only_cursor(self):
+        shared = self.env.context.get("oopo_read_only_cursor")
+        cr = shared and shared.pop("cr", None)
+        if cr:
+            cr.rollback()
+            cr.close()
     
+    def _serialize_function_result(self, result):
+        """JSON of a function result, as sent to the LLM and recorded for skills. Dates, recordsets and other values
+        without a JSON type are given as their ``str``."""
+        return json.dumps(result, default=str, ensure_ascii=False)
+
     def _construct_function_response(self, function_name, result):
         return {"role": "function", "name": function_name, "content": result}
     
@@ -419,8 +859,9 @@ class MailBot(models.AbstractModel):
 
     ### START ORM METHODS ###
 
-    def _read_record(self, model, field, search_domains=None, limit=None, order=None):
-        """Search and read records in the model based on search domains."""
+    def _read_record(self, model, field, search_domains=None, limit=None, order=None, page_size=None):
+        """Search and read records in the model based on search domains.
+        With ``page_size``, only the first page is read and a cursor to the next ones is returned."""
 
         available_fields = self._get_fields_for_model(model)
 
@@ -430,7 +871,38 @@ class MailBot(models.AbstractModel):
 
         search_domains = self._fix_errorneous_domain(search_domains) if search_domains else []
         search_domains = [tuple(domain) if isinstance(domain, list) else domain for domain in search_domains] if search_domains else []
-        return self.env[model].search_read(domain=search_domains, fields=field, limit=limit, order=order)
+        if not page_size:
+            return self.env[model].search_read(domain=search_domains, fields=field, limit=limit, order=order)
+
+        # Sort on id last, so that records with equal sort values keep the same place from one page to the other.
+        Model = self.env[model]
+        order = order or Model._order
+        if not re.search(r"\bid\b", order):
+            order = f"{order}, id"
+        record_ids = Model.search(search_domains, limit=limit, order=order).ids
+        token = self.env["mail.oopo.result.cursor"]._open(model, field, record_ids, page_size)
+        return self._read_cursor_page(model, field, record_ids, token, 0, page_size)
+
+    def _read_more(self, cursor):
+        """Read the next page of a cursor returned by ``_read_record``. Cursors are ``token:position``, so that
+        reading the same cursor twice returns the same page."""
+        token, _sep, position = cursor.rpartition(":")
+        result_cursor = self.env["mail.oopo.result.cursor"]._fetch(token)
+        if not result_cursor or not position.isdigit():
+            raise ValueError("The cursor is invalid or expired, please call read_record again.")
+        return self._read_cursor_page(result_cursor["res_model"], result_cursor["field_names"], result_cursor["record_ids"], token, int(position), result_cursor["page_size"])
+
+    def _read_cursor_page(self, model, field, record_ids, token, position, page_size):
+        page_ids = record_ids[position:position + page_size]
+        # Access rights are checked again, records may have been deleted or become unreadable since the search.
+        records = self.env[model].search([("id", "in", page_ids)])
+        rows = {row["id"]: row for row in records.read(field)}
+        next_position = position + page_size
+        return {
+            "records": [rows[record_id] for record_id in page_ids if record_id in rows],
+            "total": len(record_ids),
+            "next_cursor": f"{token}:{next_position}" if next_position < len(record_ids) else None,
+        }
 
     def _create_record(self, model, values):
         """Create new records in the model with fields filled by given values."""
@@ -438,13 +910,112 @@ class MailBot(models.AbstractModel):
 
     def _update_record(self, model, field, field_to_update, search_domains=None, limit=None):
         """Update existing records in the model with new values for the fields."""
+        if not search_domains:
+            raise ValueError("update_record needs search_domains identifying the record to update")
         record_id = self._read_record(model, field, search_domains, limit)[0]["id"]
         record_to_update = self.env[model].browse([record_id])
         return record_to_update.write(vals=field_to_update[0])   
 
+    def _resolve_names(self, names, limit=3):
+        """Find the best matching records for many ``{"model", "name"}`` pairs in one call, with one query per model."""
+        names_by_model = {}
+        for item in names:
+            if not isinstance(item, dict) or not item.get("model") or not isinstance(item.get("name"), str):
+                raise ValueError(f"Every item of names must be an object with a model and a name, got {item}")
+            if item["model"] not in self.env:
+                raise ValueError(f"The model {item['model']} does not exist, use the technical name of an Odoo model, e.g. res.partner")
+            names_by_model.setdefault(item["model"], []).append(item["name"])
+
+        matches = {}
+        for model_name, model_names in names_by_model.items():
+            model_names = list(dict.fromkeys(model_names))
+            if self._get_trigram_expression(self.env[model_name]):
+                model_matches = self._resolve_names_trigram(model_name, model_names, limit)
+            else:
+                model_matches = self._resolve_names_orm(model_name, model_names, limit)
+            for name, name_matches in model_matches.items():
+                matches[(model_name, name)] = name_matches
+
+        return [
+            {"model": item["model"], "name": item["name"], "matches": matches[(item["model"], item["name"])]}
+            for item in names
+        ]
+
+    def _resolve_names_trigram(self, model_name, model_names, limit):
+        """Rank records by trigram similarity of their name, using the indexes created for configured models."""
+        Model = self.env[model_name]
+        expression = self._get_trigram_expression(Model)
+        Model.flush_model([Model._rec_name])
+        self.env.cr.execute(f"""
+            SELECT q.name, t.id, t.score
+              FROM unnest(%s::text[]) AS q(name)
+              CROSS JOIN LATERAL (
+                    SELECT "{Model._table}".id, similarity({expression}, q.name) AS score
+                      FROM "{Model._table}"
+                     WHERE {expression} %% q.name
+                  ORDER BY score DESC
+                     LIMIT %s
+              ) AS t
+        """, (model_names, limit))
+        rows = self.env.cr.fetchall()
+
+        # The query bypasses record rules, only keep the records the user is allowed to read.
+        accessible_records = Model.search([("id", "in", [row[1] for row in rows])])
+        display_names = {record["id"]: record["display_name"] for record in accessible_records.read(["display_name"])}
+        model_matches = {name: [] for name in model_names}
+        for name, record_id, score in rows:
+            if record_id in display_names:
+                model_matches[name].append({"id": record_id, "display_name": display_names[record_id], "score": round(score, 2)})
+        return model_matches
+
+    def _get_trigram_expression(self, Model, table_alias=True):
+        """SQL expression of the name of ``Model`` for trigram matching, or None when the model is not configured
+        in ``mail_oopo.trigram_models`` or its name is not a stored char column."""
+        trigram_models = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.trigram_models", "")
+        if Model._name not in [model.strip() for model in trigram_models.split(",")] or not self.env.registry.has_trigram:
+            return None
+        field = Model._fields.get(Model._rec_name)
+        if not field or not field.store or field.type != "char":
+            return None
+        column = f'"{Model._table}"."{field.name}"' if table_alias else f'"{field.name}"'
+        # Translated names are stored as jsonb, index and match the source term.
+        return f"({column}->>'en_US')" if field.translate else column
+
+    @api.model
+    def _create_trigram_indexes(self):
+        """Create the pg_trgm extension and a trigram index on the name of every model in ``mail_oopo.trigram_models``."""
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except psycopg2.Error as e:
+            raise UserError(_("The pg_trgm extension could not be created, please ask your database administrator to install it. See details: %s", e))
+        self.env.registry.has_trigram = True
+
+        trigram_models = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.trigram_models", "")
+        for model_name in trigram_models.split(","):
+            model_name = model_name.strip()
+            if model_name not in self.env:
+                continue
+            Model = self.env[model_name]
+            expression = self._get_trigram_expression(Model, table_alias=False)
+            if expression:
+                create_index(self.env.cr, f"{Model._table}_{Model._rec_name}_oopo_trgm_idx", Model._table, [f"{expression} gin_trgm_ops"], method="gin")
+        return True
+
+    def _resolve_names_orm(self, model_name, model_names, limit):
+        model_matches = {}
+        for name in model_names:
+            results = self.env[model_name].name_search(name, limit=limit)
+            model_matches[name] = [
+                {"id": record_id, "display_name": display_name, "score": round(SequenceMatcher(None, name.lower(), display_name.lower()).ratio(), 2)}
+                for record_id, display_name in results
+            ]
+        return model_matches
+
     def _get_fields_for_model(self, model_name):
         try:
-            available_fields = set(self.env[model_name].fields_get().keys())
+            with self._profile_span("fields_get", model_name):
+                available_fields = set(self.env[model_name].fields_get().keys())
             return available_fields
         except:
             return set()
@@ -455,32 +1026,70 @@ class MailBot(models.AbstractModel):
             "read_record": self._read_record,
             "create_record": self._create_record,
             "update_record": self._update_record,
+            "resolve_names": self._resolve_names,
+            "read_more": self._read_more,
         }
+        for skill in self.env["mail.oopo.skill"].search([]):
+            avalaible_function_dict[skill.function_name] = functools.partial(self._run_skill, skill)
         return avalaible_function_dict
 
+    def _get_callable_functions(self):
+        """Function definitions sent to the LLM: the database functions and the saved skills."""
+        return functions + self.env["mail.oopo.skill"]._get_function_definitions()
+
+    def _run_skill(self, skill, **kwargs):
+        """Run every step of ``skill`` in a row. Steps raise on failure, so that the savepoint of the skill call
+        rolls back the whole plan."""
+        slot_values = skill._get_slot_values(kwargs)
+        function_dict = self._get_avalaible_function_dict()
+        step_results = []
+        for step in json.loads(skill.steps):
+            arguments = skill._render_arguments(step.get("arguments") or {}, slot_values, step_results)
+            print("\033[95m" + f"ODOOGPT SKILL STEP {len(step_results) + 1}: {step['function']} {arguments}" + "\033[0m")
+            step_results.append(function_dict[step["function"]](**arguments))
+        return [{"function": step["function"], "result": result} for step, result in zip(json.loads(skill.steps), step_results)]
+
     def _get_chat_completion(self, messages, callable_functions=None, temperature=0.1, model=None):
         """Get completion for prompt via ChatCompletion model of OpenAI API.``messages`` should be a list of message.
         If ``messages`` is a string, i.e. single user prompt, perform moderation check."""
         if model is None:
             model = self.get_model()
-
+        candidate_models = [model]
+        if model == "auto" and not isinstance(messages, str):
+            candidate_models = self._route_model(messages, callable_functions)
+
+        circuit_message = self._acquire_circuit()
+        if circuit_message:
+            return circuit_message
+        if isinstance(messages, str):
+            return self._finish_chat_completion(lambda: self._llm_moderation(messages))
+        return self._finish_chat_completion(lambda: self._create_chat_completion(candidate_models, messages, callable_functions, temperature))
+
+    def _acquire_circuit(self):
+        """While the upstream is failing, fail fast instead of having every worker wait for the request timeout.
+        Returns the message to reply with when no request may be sent."""
+        return self.env["mail.oopo.circuit"]._acquire(self._get_llm_provider())
+
+    def _finish_chat_completion(self, send):
+        """Call ``send``, which performs the upstream request, record its outcome on the circuit breaker
+        and turn OpenAI errors into a message for the user. ``send`` may be the result of a request sent
+        from another thread, as long as the circuit has been acquired first."""
+        import openai
+
+        provider = self._get_llm_provider()
+        circuit = self.env["mail.oopo.circuit"]
+        upstream_errors = (openai.error.Timeout, openai.error.ServiceUnavailableError, openai.error.APIError, openai.error.APIConnectionError)
         try:
-            if isinstance(messages, str):
-                response = openai.Moderation.create(input=messages)
-                response = response["results"][0]["flagged"]
-            else:
-                params = {
-                    "model": model,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "request_timeout": 60, # This parameter helps raise Timeout error, but is not officially documented.
-                }
-
-                if callable_functions is not None:
-                    params["functions"] = callable_functions
-                    params["function_call"] = "auto"
-
-                response = openai.ChatCompletion.create(**params)
+            try:
+                response = send()
+            except upstream_errors as e:
+                circuit._record_failure(e, provider)
+                raise
+            except openai.error.OpenAIError:
+                # The upstream answered, even if the request itself was refused.
+                circuit._record_success(provider)
+                raise
+            circuit._record_success(provider)
         except openai.error.AuthenticationError as e:
             return f"""[OpenAI API Key Error] Your OpenAI API key is invalid, expired or revoked. \
                 Please provide a valid API key in Settings/General Settings/Integrations. See details: {e}"""
@@ -502,112 +1111,253 @@ class MailBot(models.AbstractModel):
         except openai.error.InvalidRequestError as e:
             # ``InvalidRequestError`` should not be displayed to the user and has to be handled only on developer side.
             error_message = str(e)
-            if "reduce" in error_message:
+            if is_token_limit_error(e):
                 return f"""[Token Limit Warning] {error_message} Or choose a GPT model with higher token limit to afford longer context. \
                     Please contact Odoo Inc for suggestions. (To release token usage, please enter "clear" to clear current message history.)"""
             return f"""[Query Fails] Your query can not be processed at current version of OdooBot, \
                 please contact Odoo Inc to upgrade OdooBot."""
         
-        if not isinstance(messages, str):
+        if not isinstance(response, bool):
             print(f"\033[92m Total Conversation Tokens: {str(response['usage']['total_tokens'])} \033[0m")
 
         return response
-    
-    def _select_system_message(self):
-        """System message sets up the tone of GPT, basic context of chat and requirements that GPT has to follow.
-        Note: It is not guaranteed that GPT would strictly follow the requirements."""
-        
-        prompts = {
-            "base_system_message": """You are Oopo a friendly AI Assistant, users might ask questions, or ask to perform any actions. \ You have full access to the current Odoo environment""",
-            "inline_link_instruction": """You can add links into the text too by adding an <a> tag in this format:
-                <a href='#' data-oe-model='model name' data-oe-id='id number'>test</a>
-
-                e.g., <a href='#' data-oe-model='sale.order' data-oe-id='7'>My sale order</a>
-
-                You should always use links to reference records in the system, as it will make it easier for me to understand what you are referring to.
-
-                Anything that is returned from the `read_record` function should be linked to:
-                <a href='#' data-oe-model='model name' data-oe-id='id number'>Link text</a>
-
-                For instance, if the `read_record` function returns a sale order with ID 7, create the link like this:
-                <a href='#' data-oe-model='sale.order' data-oe-id='7'>Sale Order 7</a>
-
-                By consistently including links in the responses, we can maintain a more structured and interactive conversation.
-                
-                Please avoid using the square bracket format like this [Product 45](#&data-oe-model=product.product&data-oe-id=45) for links, as it is not the correct format. Always use the "<a>" tag as shown in the examples above to create links.""",
-            "relation_fields_prompt": """provides several functions to interact with the database, including querying records, creating new records, and updating existing records.
-
-                To query records, you can use the `read_record` function, which retrieves specific fields from the given model. For example, to get the most recent three sale orders, you can use the `read_record` function with the appropriate arguments (`model`, `field`, `order`, and `limit`) as shown below:
 
-                ```
-                ODOOGPT FUNCTION CALL: read_record
-                ODOOGPT FUNCTION ARGUMENTS: {'model': 'sale.order', 'field': ['name', 'date_order'], 'order': 'date_order desc', 'limit': 3}
-                ```
-
-                To create a new record, you can use the `create_record` function. For instance, to create a new customer named "Diego," you can use the `create_record` function with the desired `model` and `values` as shown below:
-
-                ```
-                ODOOGPT FUNCTION CALL: create_record
-                ODOOGPT FUNCTION ARGUMENTS: {'model': 'res.partner', 'values': [{'name': 'Diego'}]}
-                ```
-
-                To update an existing record, you can use the `update_record` function. For example, if you want to update the phone number and email of the customer named "Diego" to "99999999" and "jot@odooooo.com" respectively, you can use the `update_record` function with the appropriate arguments (`model`, `field`, `field_to_update`, `search_domains`, and `limit`) as shown below:
-
-                ```
-                ODOOGPT FUNCTION CALL: update_record
-                ODOOGPT FUNCTION ARGUMENTS: {'model': 'res.partner', 'field': ['name'], 'field_to_update': [{'phone': '99999999', 'email': 'jot@odooooo.com'}], 'search_domains': [['name', '=', 'Diego']], 'limit': 1}
-                ```
-
-                One important concept to understand is the usage of relational fields. In some cases, you might need to reference the ID of a record when creating or updating another record with a relationship. For example, to create a sale order for a customer, you need to pass the customer's ID as the value for the `partner_id` field in the `sale.order` model.
-
-                When you are unsure about the ID of a record, you can perform a search using the `read_record` function with appropriate search filters. For instance, if you want to find the ID of a product with a name containing "cabinet," you can use the `read_record` function with the search domain `[['name', '=ilike', '%cabinet%']]` as shown below:
-
-                ```
-                ODOOGPT FUNCTION CALL: read_record
-                ODOOGPT FUNCTION ARGUMENTS: {'model': 'product.product', 'field': ['id'], 'search_domains': [['name', '=ilike', '%cabinet%']], 'limit': 1}
-                ```
-
-                Remember, the IDs returned from previous function calls can be used as arguments in subsequent function calls to establish relationships between records.""",
-            "search_domains": """Domain criteria can be combined using 3 logical operators than can be added between tuples:
-
-                '&' (logical AND, default)
-                '|' (logical OR)
-                '!' (logical NOT)
-                These are prefix operators and the arity of the '&' and '|' operator is 2, while the arity of the '!' is just 1. Be very careful about this when you combine them the first time.
-
-                Here is an example of searching for Partners named ABC from Belgium and Germany whose language is not english ::
-
-                [('name','=','ABC'),'!',('language.code','=','en_US'),'|',
-                ('country_id.code','=','be'),('country_id.code','=','de')]
-                The '&' is omitted as it is the default, and of course we could have used '!=' for the language, but what this domain really represents is::
-
-                [(name is 'ABC' AND (language is NOT english) AND (country is Belgium OR Germany))]
-
-                For example if I ask, are you familiar with product x,y,z 
+    def _get_chat_completion_params(self, model, messages, callable_functions=None, temperature=0.1):
+        params = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "request_timeout": 60, # This parameter helps raise Timeout error, but is not officially documented.
+            **self._get_llm_credentials(),
+        }
 
-                And you need to get the product ids of x,y,z
+        if callable_functions is not None:
+            params["functions"] = callable_functions
+            params["function_call"] = "auto"
+        return params
+
+    def _create_chat_completion(self, candidate_models, messages, callable_functions, temperature):
+        """Call ChatCompletion with the first of ``candidate_models``, falling back to the next one
+        when the request exceeds the context window of the current model."""
+        candidate_params = [self._get_chat_completion_params(model, messages, callable_functions, temperature) for model in candidate_models]
+        return send_chat_completion(candidate_params, self._llm_chat_completion)
+
+    def _get_llm_credentials(self):
+        """``api_key`` and ``api_base`` sent with each completion request. The module globals of ``openai`` are
+        shared by every thread and database of the process, so they are never set."""
+        config_parameters = self.env["ir.config_parameter"].sudo()
+        # Allows pointing the bot to another OpenAI-compatible endpoint, e.g. an on-premise server or the fake server of the load test.
+        api_base = config_parameters.get_param("mail_oopo.openai_api_base")
+        return {
+            # On-premise OpenAI-compatible servers usually do not check the key.
+            "api_key": config_parameters.get_param("mail_oopo.openapi_api_key") or "none",
+            "api_base": api_base if api_base and self._get_llm_provider() == "openai_compatible" else openai_api_base,
+        }
 
-                You can use the search domain like this:
+    def _get_llm_provider(self):
+        """Backend serving completions: ``openai``, ``openai_compatible`` (e.g. llama.cpp or vLLM on the LAN) or ``fake`` for tests."""
+        return self.env["ir.config_parameter"].sudo().get_param("mail_oopo.llm_provider", "openai")
 
-                search_domains: ["|", "|", ['name', 'ilike', '%x%'], ['name', 'ilike', '%y%'], ['name', 'ilike', '%z%']]
+    def _llm_chat_completion(self, params):
+        provider = self._get_llm_provider()
+        with self._profile_span("llm", params.get("model")) as span:
+            if provider == "fake":
+                response = self._fake_chat_completion(params)
+            else:
+                import openai
 
-                or if you just wanted X or Y, you could do:
+                response = openai.ChatCompletion.create(**params)
+            if span is not None:
+                usage = response.get("usage") or {}
+                span.update(prompt_tokens=usage.get("prompt_tokens", 0), completion_tokens=usage.get("completion_tokens", 0))
+        return response
 
-                search_domains: ["|", ['name', 'ilike', '%x%'], ['name', 'ilike', '%y%']]
-                
-                """
+    def _llm_moderation(self, text):
+        """Whether ``text`` is flagged, by OpenAI moderation, the local classifier or not at all (``mail_oopo.moderation``).
+        The default follows the provider, so that intranet inference does not depend on OpenAI."""
+        default_moderation = "openai" if self._get_llm_provider() == "openai" else "local"
+        moderation = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.moderation", default_moderation)
+        if moderation == "none":
+            return False
+        if moderation == "local":
+            return self._local_moderation(text)
+        import openai
+
+        api_key = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.openapi_api_key") or "none"
+        with self._profile_span("llm", "moderation"):
+            # Moderation.create of openai 0.27 takes no api_base, the request is built the same way with the OpenAI base URL,
+            # whatever server the completions are sent to.
+            moderation = openai.Moderation(api_key=api_key, api_base=openai_api_base)
+            response = moderation.request("post", openai.Moderation.get_url(), {"input": text})
+        return response["results"][0]["flagged"]
+
+    def _local_moderation(self, text):
+        """Lightweight local classifier: flag the text when it matches a term of ``mail_oopo.moderation_blocklist``."""
+        blocklist = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.moderation_blocklist", "")
+        terms = [term.strip() for term in blocklist.split(",") if term.strip()]
+        return any(re.search(rf"\b{re.escape(term)}\b", text, re.IGNORECASE) for term in terms)
+
+    def _fake_chat_completion(self, params):
+        """Offline backend for tests: replies with the next response of the ``oopo_fake_responses`` context key,
+        e.g. ``[{"function_call": {"name": "read_record", "arguments": "{...}"}}, {"content": "Done"}]``, then with a fixed answer."""
+        fake_responses = self.env.context.get("oopo_fake_responses") or []
+        message = dict(fake_responses.pop(0)) if fake_responses else {"content": "This is a fake reply."}
+        message.setdefault("role", "assistant")
+        message.setdefault("content", None)
+        prompt_tokens = self._estimate_tokens(params["messages"], params.get("functions"))
+        completion_tokens = self._estimate_tokens([message])
+        return {
+            "choices": [{"index": 0, "message": message, "finish_reason": "function_call" if message.get("function_call") else "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
         }
-        
-        encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-        master_prompt = ""
-        for prompt_module,prompt in prompts.items():
-            print(f"\033[92m Loaded Prompt Module: {prompt_module} - Tokens: {len(encoding.encode(prompt))}\033[0m")
-            master_prompt += prompt
-        
-        # print tokens of master
-        print(f"\033[92m Loaded Master Prompt - Tokens: {len(encoding.encode(master_prompt))}\033[0m")
 
-        return master_prompt
+    def _get_model_context_sizes(self):
+        """Models offered to users with their context size, from ``mail_oopo.llm_models``, e.g. ``llama3:8b:8192, mistral:32768``."""
+        models_param = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.llm_models")
+        if not models_param:
+            return model_context_sizes
+        context_sizes = {}
+        for item in models_param.split(","):
+            name, _sep, size = item.strip().rpartition(":")
+            if name and size.isdigit():
+                context_sizes[name] = int(size)
+        return context_sizes or model_context_sizes
+
+    @api.model
+    def _get_model_selection(self):
+        context_sizes = self._get_model_context_sizes()
+        return [("auto", "Auto (Routed per Request)")] + [
+            (model, model_labels.get(model) or f"{model} ({context_sizes[model] // 1024}k)")
+            for model in context_sizes
+        ]
+
+    def _get_encoding(self, model="gpt-3.5-turbo"):
+        """Tokenizer of ``model``, loaded once per process. The BPE files are cached in ``mail_oopo.tiktoken_cache_dir``
+        (defaults to the ``tiktoken`` folder of the data directory), which can be pre-seeded for offline workers."""
+        encoding = _encodings.get(model)
+        if encoding is not None:
+            return encoding
+
+        cache_dir = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.tiktoken_cache_dir") or os.path.join(config["data_dir"], "tiktoken")
+        with _encodings_lock:
+            if model not in _encodings:
+                # tiktoken reads its cache location from the environment when fetching a BPE file.
+                os.environ.setdefault("TIKTOKEN_CACHE_DIR", cache_dir)
+                start_time = time.monotonic()
+                import tiktoken
+
+                _encodings[model] = tiktoken.encoding_for_model(model)
+                _logger.info("Loaded tiktoken encoding for %s in %.2fs from %s", model, time.monotonic() - start_time, os.environ["TIKTOKEN_CACHE_DIR"])
+        return _encodings[model]
+
+    def _route_model(self, messages, callable_functions=None):
+        """Order the models to try for an "auto" request: multi-step create/update plans go to GPT-4,
+        everything else to the smallest context window that fits the estimated prompt size."""
+        task_type = self.env.context.get("oopo_task", "read")
+        context_sizes = self._get_model_context_sizes()
+        # Custom model lists have no task-specific routes, they are tried from the smallest context window up.
+        routes = [model for model in auto_model_routes[task_type] if model in context_sizes] or sorted(context_sizes, key=context_sizes.get)
+        required_tokens = self._estimate_tokens(messages, callable_functions) + completion_token_reserve
+
+        candidate_models = [model for model in routes if context_sizes[model] >= required_tokens]
+        # Keep the largest model last so that an underestimated prompt still gets a chance to fit.
+        largest_model = max(context_sizes, key=context_sizes.get)
+        if largest_model not in candidate_models:
+            candidate_models.append(largest_model)
+        return candidate_models
+
+    def _estimate_tokens(self, messages, callable_functions=None):
+        """Approximate the prompt size of a ChatCompletion request, including function definitions.
+        Messages are only encoded once per question: ``PromptMessage`` keeps its count, e.g. the one stored on
+        the history message, and function definitions are counted once per process."""
+        encoding = self._get_encoding()
+        num_tokens = 0
+        for message in messages:
+            token_count = getattr(message, "token_count", None)
+            if token_count is None:
+                # Every message carries a few tokens of role/separator overhead.
+                token_count = 4
+                for key in ("content", "name", "function_call"):
+                    value = message.get(key)
+                    if value:
+                        token_count += len(encoding.encode(value if isinstance(value, str) else json.dumps(value)))
+                if isinstance(message, PromptMessage):
+                    message.token_count = token_count
+            num_tokens += token_count
+        for function in callable_functions or []:
+            function_json = json.dumps(function)
+            if function_json not in _function_token_counts:
+                _function_token_counts[function_json] = len(encoding.encode(function_json))
+            num_tokens += _function_token_counts[function_json]
+        return num_tokens
+
+    def _is_write_plan(self, response):
+        """Whether the CoT plan returned by ``_pre_prompt`` involves creating or updating records, decided from
+        the function it calls or from its ``OPERATIONS:`` line, never from the wording of the plan."""
+        message = response["choices"][0]["message"]
+        function_name = (message.get("function_call") or {}).get("name") or ""
+        # Skills are recorded plans which usually create or update records.
+        if function_name in write_functions or function_name.startswith("skill_"):
+            return True
+        match = _plan_operations_re.search(message.get("content") or "")
+        return bool(match) and bool(set(re.findall(r"[a-z]+", match.group(1).lower())) & {"create", "update"})
+    
+    def _select_system_message(self, intents=None):
+        """System message sets up the tone of GPT, basic context of chat and requirements that GPT has to follow.
+        Only the prompt modules triggered by ``intents`` are assembled, all of them when ``intents`` is None.
+        Note: It is not guaranteed that GPT would strictly follow the requirements."""
+        return self._assemble_system_message(intents)[0]
+
+    def _get_system_prompt_message(self, intents=None):
+        master_prompt, master_tokens = self._assemble_system_message(intents)
+        message = PromptMessage({"role": "system", "content": master_prompt})
+        message.token_count = master_tokens + 4
+        return message
+
+    def _assemble_system_message(self, intents=None):
+        """Return the system message for ``intents`` with its token count, assembled once per process."""
+        module_names = tuple(
+            prompt_module for prompt_module, triggers in prompt_module_intents.items()
+            if intents is None or triggers is None or set(triggers) & set(intents)
+        )
+        if module_names not in _system_message_variants:
+            encoding = self._get_encoding()
+            master_prompt = "".join(system_prompt_modules[prompt_module] for prompt_module in module_names)
+            _system_message_variants[module_names] = (master_prompt, len(encoding.encode(master_prompt)))
+        master_prompt, master_tokens = _system_message_variants[module_names]
+
+        full_tokens = self._get_prompt_module_tokens()["all"]
+        print(f"\033[92m Loaded Prompt Modules: {', '.join(module_names)} - Tokens: {master_tokens} (saved {full_tokens - master_tokens})\033[0m")
+        return master_prompt, master_tokens
+
+    def _get_prompt_module_tokens(self):
+        """Token cost of every prompt module, and of all of them assembled under "all"."""
+        if not _prompt_module_tokens:
+            encoding = self._get_encoding()
+            for prompt_module, prompt in system_prompt_modules.items():
+                _prompt_module_tokens[prompt_module] = len(encoding.encode(prompt))
+            _prompt_module_tokens["all"] = len(encoding.encode("".join(system_prompt_modules.values())))
+        return _prompt_module_tokens
+
+    def _get_prompt_module_report(self):
+        """Plain text report of the token cost of each prompt module and of the tokens saved by each cached variant."""
+        module_tokens = self._get_prompt_module_tokens()
+        lines = ["Prompt module | Triggering intents | Tokens"]
+        for prompt_module, triggers in prompt_module_intents.items():
+            lines.append(f"{prompt_module} | {', '.join(triggers) if triggers else 'always'} | {module_tokens[prompt_module]}")
+        lines += ["", "Assembled variant | Tokens | Saved"]
+        for module_names, (_prompt, tokens) in _system_message_variants.items():
+            lines.append(f"{' + '.join(module_names)} | {tokens} | {module_tokens['all'] - tokens}")
+        return "\n".join(lines)
+
+    def _detect_intents(self, body):
+        """Guess from the user message which prompt modules are needed, e.g. no create/update tutorial for a question.
+        Reading is always assumed, as almost every question involves data."""
+        intents = {"read"}
+        for intent, pattern in intent_patterns.items():
+            if pattern.search(body):
+                intents.add(intent)
+        return intents
     
     def _get_delimiter(self):
         """Delimiter helps to prevent prompt injections from users, and tailor a use prompt with internal helper prompts."""
@@ -616,7 +1366,7 @@ class MailBot(models.AbstractModel):
     def _tailor_user_prompt(self, user_prompt, error_message=None, model_name=None):
         """Encapsulate a user prompt with internal helper prompts, for error handling or requirement enforcement."""
         if error_message:
-            if isinstance(error_message, KeyError):
+            if isinstance(error_message, KeyError) or (model_name and model_name not in self.env):
                 error_type = "model" 
             elif isinstance(error_message, ValueError) and model_name:
                 error_type = "field"
@@ -628,11 +1378,21 @@ class MailBot(models.AbstractModel):
             user_prompt = " ".join([helper_prompt, user_prompt])
         return user_prompt
     
+    def _get_repeated_failure_hint(self, user_prompt, function_name, error_message):
+        """Targeted hint for a function call that already failed with the very same arguments."""
+        helper_prompt = f"""You already called {function_name} with exactly the same arguments and it failed again with: {error_message}. \
+            Repeating it will not work. Change the arguments, use another function, or answer with the information you already have. \
+            Based on aforementioned information, please response the following user query again:"""
+        return " ".join([helper_prompt, user_prompt])
+
     def _get_user_prompt_helper(self, helper_type):
         """Inject error message into the user prompt to help GPT self-correct and retry the failed user prompt.
         Note: the data type of helper_type is discussable, e.g. a tuple (key_word, model_name)"""
         error_type, model_name = helper_type
-        if error_type == "model":
+        if error_type == "model" and not model_name:
+            helper_prompt = """A model or key you used is invalid, you are required to only use the models and fields defined in Odoo, \
+                with their technical names, e.g. res.partner."""
+        elif error_type == "model":
             model_prefix = model_name.split(".")[0]
             model_list = str([m["model"] for m in self.env["ir.model"].search_read([]) if model_prefix == m["model"].split(".")[0]])
             helper_prompt = f"""The model {model_name} is invalid, you are required to only use the model defined in Odoo, \
@@ -660,7 +1420,7 @@ class MailBot(models.AbstractModel):
     def _pre_prompt(self, gpt_arr):
         """Apply Chain of Thought (CoT) to help GPT decompose a user query into basic CRUD operations."""
         user_prompt = gpt_arr[-1:]
-        gpt_arr.append({"role":"user",
+        gpt_arr.append(PromptMessage({"role":"user",
                         "content":
                         """
                         Instructions while running a query: 
@@ -672,13 +1432,15 @@ class MailBot(models.AbstractModel):
                         followed by
                         {'model': 'res.partner', 'field': ['id'], 'search_domains': [['name', '=', 'Odoo Frame']], 'limit': 1}
                         Always try to read only a single record at once.
+                        To find the ids of several records by their names, e.g. a customer and products, call resolve_names() once with all of them instead.
 
                         If the user request doesn't require data operations - do not return anything - otherwise state what CRUD operations are required for the above(only give in read,create, update)? 
-                        Which models are required(only give technical odoo model names)? Summarize within 100 words. Perform these CRUD operations"""})
-        response = self._get_chat_completion(messages=gpt_arr, callable_functions=functions, temperature=0.5)
+                        Which models are required(only give technical odoo model names)? Summarize within 100 words.
+                        End the plan with a single line listing the operations it needs, e.g. "OPERATIONS: read, create" or "OPERATIONS: none". Perform these CRUD operations"""}))
+        response = self._get_chat_completion(messages=gpt_arr, callable_functions=self._get_callable_functions(), temperature=0.5)
 
         if not isinstance(response, str):
-            gpt_arr.append(dict(response["choices"][0]["message"]))
+            gpt_arr.append(PromptMessage(response["choices"][0]["message"]))
         gpt_arr += user_prompt
         
         return response
\ No newline at end of file
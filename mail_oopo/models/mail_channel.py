@@ -10,11 +10,45 @@ class MailChannel(models.Model):
 
         odoobot_id = self.env["ir.model.data"]._xmlid_to_res_id("base.partner_root")
 
-        msgs = self._channel_fetch_message(limit=None)
+        self.env["mail.bot"]._drop_prewarmed_history(self)
+        msgs = self.with_context(oopo_function_trace=True)._channel_fetch_message(limit=None)
         msg_ids = [msg["id"] for msg in msgs]
         self.env["mail.message"].browse(msg_ids[0]).write({"body": ""})
         self.env["mail.message"].browse(msg_ids[1:]).unlink()
 
         message = self.first_msg
         self.sudo().message_post(body=message, author_id=odoobot_id, message_type="comment", subtype_xmlid="mail.mt_comment")
-        return False
\ No newline at end of file
+        return False
+
+    def oopo_prewarm(self):
+        """Called by Discuss when the OdooBot chat is opened, when ``mail_oopo.prewarm`` is enabled."""
+        self.ensure_one()
+        bot = self.env["mail.bot"]
+        if not self.env["ir.config_parameter"].sudo().get_param("mail_oopo.prewarm") or not bot._is_bot_in_private_channel(self):
+            return False
+        bot._prewarm(self)
+        return True
+
+    def _oopo_get_message_ids_within_budget(self, token_budget):
+        """Ids of the newest messages of the channel whose stored token counts fit in ``token_budget``, oldest first.
+        Messages counted with another tokenizer family, or never counted, are counted first."""
+        self.ensure_one()
+        encoding_name = self.env["mail.bot"]._get_encoding().name
+        self.env["mail.message"].search([
+            ("model", "=", "mail.channel"),
+            ("res_id", "=", self.id),
+            "|", ("oopo_tokenizer", "=", False), ("oopo_tokenizer", "!=", encoding_name),
+        ])._oopo_compute_token_count()
+        self.env["mail.message"].flush_model(["model", "res_id", "oopo_token_count"])
+
+        self.env.cr.execute("""
+            SELECT id
+              FROM (
+                    SELECT id, SUM(oopo_token_count) OVER (ORDER BY id DESC) AS running_tokens
+                      FROM mail_message
+                     WHERE model = 'mail.channel' AND res_id = %s
+              ) AS history
+             WHERE running_tokens <= %s
+          ORDER BY id
+        """, (self.id, token_budget))
+        return [row[0] for row in self.env.cr.fetchall()]
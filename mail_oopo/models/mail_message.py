@@ -1,12 +1,97 @@
+import json
+
 from odoo import fields, models, api
+from odoo.osv import expression
+from odoo.tools import html2plaintext
 
 class Message(models.Model):
     _inherit = "mail.message"
 
     message_type = fields.Selection(selection_add=[("bot_function", "Function Call"), ("bot_function_request", "Function Request")], ondelete={"bot_function": "set default", "bot_function_request": "set default"})
     function_content = fields.Json(string="Function Content", help="Function Content")
+    oopo_token_count = fields.Integer(string="Token Count", readonly=True, copy=False, help="Number of tokens of the message sent to the LLM")
+    oopo_tokenizer = fields.Char(string="Tokenizer", readonly=True, copy=False, help="Tokenizer family the token count was computed with")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        messages = super(Message, self).create(vals_list)
+        odoobot_id = self.env["ir.model.data"]._xmlid_to_res_id("base.partner_root")
+        bot_messages = messages.filtered(
+            lambda message: message.model == "mail.channel"
+            and (message.author_id.id == odoobot_id or message.message_type in ("bot_function", "bot_function_request"))
+        )
+        if bot_messages:
+            # Only the OdooBot chats are sent to the LLM, other channels are counted lazily if they ever are.
+            odoobot_channel_ids = self.env["mail.channel"].sudo().search([
+                ("id", "in", list(set(bot_messages.mapped("res_id")))),
+                ("channel_type", "=", "chat"),
+                ("channel_member_ids.partner_id", "=", odoobot_id),
+            ]).ids
+            bot_messages.filtered(lambda message: message.res_id in odoobot_channel_ids)._oopo_compute_token_count()
+        return messages
+
+    def _oopo_compute_token_count(self):
+        """Count the tokens of each message once, the way ``_build_chatgpt_request`` sends it, and store all the counts
+        with a single query."""
+        if not self:
+            return
+        encoding = self.env["mail.bot"]._get_encoding()
+        token_counts = []
+        for message in self.sudo():
+            content = json.dumps(message.function_content) if message.function_content else html2plaintext(message.body or "")
+            # Every message carries a few tokens of role/separator overhead.
+            token_counts.append(len(encoding.encode(content)) + 4)
+        self.flush_recordset(["oopo_token_count", "oopo_tokenizer"])
+        self.env.cr.execute("""
+            UPDATE mail_message
+               SET oopo_token_count = counts.token_count, oopo_tokenizer = %s
+              FROM unnest(%s::int[], %s::int[]) AS counts(id, token_count)
+             WHERE mail_message.id = counts.id
+        """, (encoding.name, self.ids, token_counts))
+        self.invalidate_recordset(["oopo_token_count", "oopo_tokenizer"])
+
+    @api.model
+    def _message_fetch(self, domain, *args, **kwargs):
+        """Function call messages are hidden in Discuss, skip them so that each page loaded by the client, e.g. through
+        ``/mail/channel/messages``, is filled with visible messages. They are still fetched under the
+        ``oopo_function_trace`` context key."""
+        if not self.env.context.get("oopo_function_trace"):
+            domain = expression.AND([domain, [("message_type", "not in", ("bot_function", "bot_function_request"))]])
+        return super()._message_fetch(domain, *args, **kwargs)
 
     def _get_message_format_fields(self):
         res = super(Message, self)._get_message_format_fields()
-        res.append("function_content")
-        return res
\ No newline at end of file
+        # Function payloads can be large, only ship them when explicitly requested.
+        if self.env.context.get("oopo_function_trace"):
+            res.append("function_content")
+        return res
+
+    def oopo_get_function_trace(self):
+        """Return the function calls made by the bot before posting this reply, for the on-demand expander in Discuss."""
+        self.ensure_one()
+        previous_reply = self.search([
+            ("model", "=", self.model),
+            ("res_id", "=", self.res_id),
+            ("message_type", "=", "comment"),
+            ("id", "<", self.id),
+        ], order="id desc", limit=1)
+        function_messages = self.search([
+            ("model", "=", self.model),
+            ("res_id", "=", self.res_id),
+            ("message_type", "in", ("bot_function", "bot_function_request")),
+            ("id", ">", previous_reply.id or 0),
+            ("id", "<", self.id),
+        ], order="id asc")
+        return function_messages.read(["message_type", "function_content"])
+
+    def oopo_save_skill(self):
+        """Save the function calls made before this bot reply as a skill, and open it to review its slots."""
+        self.ensure_one()
+        skill = self.env["mail.oopo.skill"]._create_from_message(self)
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": "mail.oopo.skill",
+            "res_id": skill.id,
+            "views": [[False, "form"]],
+            "target": "current",
+        }
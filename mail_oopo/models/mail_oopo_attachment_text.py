@@ -0,0 +1,191 @@
+import email
+import io
+import logging
+import math
+import re
+
+from collections import Counter
+
+from odoo import models, fields, api
+from odoo.tools import html2plaintext
+
+_logger = logging.getLogger(__name__)
+
+# Words per chunk, about 400 tokens, so that a few chunks of several documents fit in one summary prompt.
+chunk_words = 300
+# Attachments extracted per cron run, the cron is triggered again while some are pending.
+extraction_batch_size = 20
+# BM25 parameters used to rank the chunks of a record against the question.
+bm25_k1 = 1.2
+bm25_b = 0.75
+
+_word_re = re.compile(r"\w{2,}", re.UNICODE)
+
+def tokenize(text):
+    return [word.lower() for word in _word_re.findall(text or "")]
+
+class MailOopoAttachmentText(models.Model):
+    """Chunked text of an attachment file, keyed by the checksum of the file so that identical files
+    attached to several records are extracted once. Extraction runs in the background from a cron."""
+    _name = "mail.oopo.attachment.text"
+    _description = "Oopo Attachment Text"
+
+    checksum = fields.Char(string="Checksum", required=True, index=True)
+    state = fields.Selection([("pending", "Pending"), ("done", "Done"), ("failed", "Failed")], string="State", default="pending", required=True, index=True)
+    # Only read once the chunks to send are known, ranking them only needs their terms and token counts.
+    chunks = fields.Json(string="Chunks", prefetch=False, help="Text of the file split in chunks of about %s words" % chunk_words)
+    chunk_terms = fields.Json(string="Chunk Terms", help="Term frequencies of every chunk, used to rank the chunks against a question")
+    chunk_tokens = fields.Json(string="Chunk Tokens", help="Token count of every chunk, so that selecting chunks does not tokenize them")
+    error = fields.Char(string="Error")
+
+    _sql_constraints = [
+        ("checksum_uniq", "unique(checksum)", "The text of a file can only be extracted once."),
+    ]
+
+    @api.model
+    def _get_texts(self, attachments):
+        """Return the extracted texts of ``attachments`` keyed by checksum. Files never seen before are queued
+        for extraction, they are not part of the result until the cron has processed them."""
+        checksums = set(attachments.filtered("checksum").mapped("checksum"))
+        texts = self.search([("checksum", "in", list(checksums))])
+        missing_checksums = checksums - set(texts.mapped("checksum"))
+        if missing_checksums:
+            # Queue them on a separate cursor, the summary request must not fail on concurrent inserts.
+            with self.env.registry.cursor() as cr:
+                cr.execute("""
+                    INSERT INTO mail_oopo_attachment_text (checksum, state, create_uid, write_uid, create_date, write_date)
+                    SELECT checksum, 'pending', %s, %s, now() at time zone 'UTC', now() at time zone 'UTC'
+                    FROM unnest(%s) AS checksum
+                    ON CONFLICT (checksum) DO NOTHING
+                """, (self.env.uid, self.env.uid, list(missing_checksums)))
+            self.env.ref("mail_oopo.ir_cron_extract_attachment_text")._trigger()
+            _logger.info("Queued %s attachments for text extraction", len(missing_checksums))
+        return {text.checksum: text for text in texts if text.state == "done"}
+
+    @api.model
+    def _cron_extract_pending(self):
+        pending = self.search([("state", "=", "pending")], limit=extraction_batch_size + 1)
+        for text in pending[:extraction_batch_size]:
+            attachment = self.env["ir.attachment"].sudo().search([("checksum", "=", text.checksum)], limit=1)
+            try:
+                # A database error must not leave the transaction aborted for the failed state below.
+                with self.env.cr.savepoint():
+                    if not attachment:
+                        raise ValueError("No attachment has this checksum anymore")
+                    text._store_text(text._extract_text(attachment))
+            except Exception as e:
+                _logger.warning("Text extraction of attachment %s failed: %s", attachment.id, e)
+                text.write({"state": "failed", "error": str(e)[:255]})
+            self.env.cr.commit()
+        if len(pending) > extraction_batch_size:
+            self.env.ref("mail_oopo.ir_cron_extract_attachment_text")._trigger()
+
+    def _extract_text(self, attachment):
+        """Plain text of ``attachment``, through the indexation of ``ir.attachment`` (extended by
+        ``attachment_indexation`` for office documents), with fallbacks for emails and PDFs."""
+        raw = attachment.raw or b""
+        mimetype = attachment.mimetype or ""
+        if mimetype == "message/rfc822" or (attachment.name or "").lower().endswith(".eml"):
+            return self._extract_email_text(raw)
+        text = attachment._index(raw, mimetype, checksum=attachment.checksum)
+        if not text and mimetype == "application/pdf":
+            from odoo.tools.pdf import PdfFileReader
+            reader = PdfFileReader(io.BytesIO(raw), strict=False)
+            text = "\n".join(page.extractText() for page in reader.pages)
+        if not text and mimetype.startswith("text/html"):
+            text = html2plaintext(raw.decode("utf-8", errors="replace"))
+        return text or ""
+
+    def _extract_email_text(self, raw):
+        message = email.message_from_bytes(raw)
+        parts = [f"{header}: {message[header]}" for header in ("From", "To", "Date", "Subject") if message[header]]
+        for part in message.walk():
+            content_type = part.get_content_type()
+            if content_type not in ("text/plain", "text/html") or part.get_filename():
+                continue
+            payload = part.get_payload(decode=True) or b""
+            content = payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+            parts.append(html2plaintext(content) if content_type == "text/html" else content)
+        return "\n".join(parts)
+
+    def _store_text(self, text):
+        self.ensure_one()
+        chunks = self._split_chunks(text)
+        encoding = self.env["mail.bot"]._get_encoding()
+        self.write({
+            "state": "done",
+            "chunks": chunks,
+            "chunk_terms": [dict(Counter(tokenize(chunk))) for chunk in chunks],
+            "chunk_tokens": [len(encoding.encode(chunk)) for chunk in chunks],
+            "error": False,
+        })
+
+    @api.model
+    def _split_chunks(self, text):
+        """Split on paragraphs, then pack them in chunks of at most ``chunk_words`` words."""
+        chunks, current = [], []
+        for paragraph in re.split(r"\n\s*\n", text):
+            words = paragraph.split()
+            while words:
+                room = chunk_words - len(current)
+                if not room:
+                    chunks.append(" ".join(current))
+                    current = []
+                    continue
+                current += words[:room]
+                words = words[room:]
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+    @api.model
+    def _select_chunks(self, attachments, texts, query, token_budget, count_tokens):
+        """Rank every chunk of the texts of ``attachments`` against ``query`` with BM25, statistics being
+        computed over the chunks of these attachments only, and keep the best ones within ``token_budget``.
+        Without query terms, the first chunks of every attachment are taken first. Chunks are sized with
+        their stored token counts, ``count_tokens`` is only called for texts extracted without them.
+        Returns ``[(attachment, [chunk_index, ...])]`` with chunks in document order."""
+        candidates = []
+        seen_checksums = set()
+        for attachment in attachments:
+            text = texts.get(attachment.checksum)
+            if not text or attachment.checksum in seen_checksums:
+                continue
+            seen_checksums.add(attachment.checksum)
+            chunk_tokens = text.chunk_tokens or [count_tokens(chunk) for chunk in text.chunks or []]
+            for index, (terms, tokens) in enumerate(zip(text.chunk_terms or [], chunk_tokens)):
+                candidates.append((attachment, index, terms, tokens))
+        if not candidates:
+            return []
+
+        query_terms = set(tokenize(query))
+        document_frequency = Counter(term for _attachment, _index, terms, _tokens in candidates for term in query_terms if term in terms)
+        average_length = sum(sum(terms.values()) for _attachment, _index, terms, _tokens in candidates) / len(candidates) or 1
+
+        def score(candidate):
+            terms = candidate[2]
+            length = sum(terms.values())
+            result = 0.0
+            for term in query_terms:
+                frequency = terms.get(term)
+                if not frequency:
+                    continue
+                idf = math.log(1 + (len(candidates) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                result += idf * frequency * (bm25_k1 + 1) / (frequency + bm25_k1 * (1 - bm25_b + bm25_b * length / average_length))
+            return result
+
+        ranked = sorted(candidates, key=lambda candidate: (-score(candidate), candidate[1]))
+        selected, used_tokens = [], 0
+        for candidate in ranked:
+            tokens = candidate[3]
+            if used_tokens + tokens > token_budget:
+                continue
+            selected.append(candidate)
+            used_tokens += tokens
+
+        result = []
+        for attachment in attachments:
+            indexes = sorted(index for candidate_attachment, index, _terms, _tokens in selected if candidate_attachment == attachment)
+            if indexes:
+                result.append((attachment, indexes))
+        return result
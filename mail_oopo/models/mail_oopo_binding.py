@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+
+class MailOopoBinding(models.Model):
+    """For the summary command in the chatter, bindings provide the 'important' information about a related model,
+    so we aren't prompting every field of every relational field. Paths may be dotted, e.g. ``user_id.name``.
+    Relational fields towards a model without binding fall back to ``display_name``."""
+    _name = "mail.oopo.binding"
+    _description = "Oopo Relational Binding"
+    _order = "model, sequence, id"
+
+    sequence = fields.Integer(string="Sequence", default=10)
+    model = fields.Char(string="Model", required=True, index=True, help="Technical name of the related model, e.g. res.partner")
+    field_path = fields.Char(string="Field Path", required=True, help="Field of the related model to include, dotted paths such as user_id.name are allowed")
+    active = fields.Boolean(string="Active", default=True)
+
+    _sql_constraints = [
+        ("model_field_path_uniq", "unique(model, field_path)", "A field path can only be bound once per model."),
+    ]
+
+    @api.constrains("model", "field_path")
+    def _check_field_path(self):
+        for binding in self:
+            # Bindings may be defined for models of modules that are not installed yet.
+            if binding.model not in self.env:
+                continue
+            model = self.env[binding.model]
+            for field_name in binding.field_path.split("."):
+                field = model._fields.get(field_name)
+                if field is None:
+                    raise ValidationError(_("The field path %s does not exist on %s.", binding.field_path, binding.model))
+                if field.relational:
+                    model = self.env[field.comodel_name]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.clear_caches()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self.clear_caches()
+        return super().write(vals)
+
+    def unlink(self):
+        self.clear_caches()
+        return super().unlink()
+
+    def _register_hook(self):
+        super()._register_hook()
+        self._get_relational_bindings()
+
+    @api.model
+    @tools.ormcache()
+    def _get_relational_bindings(self):
+        """Read plans per related model, compiled once per registry: ``{model: (field_path, ...)}``."""
+        relational_bindings = defaultdict(list)
+        for binding in self.sudo().search_read([], ["model", "field_path"]):
+            relational_bindings[binding["model"]].append(binding["field_path"])
+        return {model: tuple(field_paths) for model, field_paths in relational_bindings.items()}
+
+    @api.model
+    def _get_path_label(self, model_name, field_path):
+        labels, model = [], self.env[model_name]
+        for field_name in field_path.split("."):
+            field = model._fields[field_name]
+            labels.append(field._description_string(self.env))
+            if field.relational:
+                model = self.env[field.comodel_name]
+        return " / ".join(labels)
+
+    @api.model
+    def _read_paths(self, records, field_paths):
+        """Resolve dotted ``field_paths`` for all ``records`` with one ``read`` per model and depth,
+        instead of one attribute access per record. Returns ``{record_id: {field_path: value}}``.
+        Records the user cannot read only reveal their display name, like ``Many2one.convert_to_read``,
+        their other paths are left empty."""
+        values = {record_id: {} for record_id in records.ids}
+        if not records or not field_paths:
+            return values
+
+        readable = self._filter_readable(records)
+        hidden = records - readable
+        if hidden:
+            for row in hidden.sudo().exists().read(["display_name"]):
+                values[row["id"]] = {field_path: row["display_name"] if field_path == "display_name" else False for field_path in field_paths}
+        if not readable:
+            return values
+
+        nested_paths = defaultdict(list)
+        for field_path in field_paths:
+            field_name, _dot, sub_path = field_path.partition(".")
+            if sub_path:
+                nested_paths[field_name].append(sub_path)
+        direct_fields = {field_path.partition(".")[0] for field_path in field_paths}
+        rows = readable.read(list(direct_fields), load=None)
+
+        for field_name in direct_fields & set(field_paths):
+            display_names = self._read_display_names(readable, field_name, rows)
+            for row in rows:
+                value = row[field_name]
+                if display_names is not None:
+                    value = ", ".join(display_names[related_id] for related_id in self._get_ids(value) if related_id in display_names)
+                values[row["id"]][field_name] = value
+
+        for field_name, sub_paths in nested_paths.items():
+            field = readable._fields[field_name]
+            related_ids = {related_id for row in rows for related_id in self._get_ids(row[field_name])}
+            related_values = self._read_paths(readable.env[field.comodel_name].browse(related_ids), sub_paths)
+            for row in rows:
+                related_rows = [related_values[related_id] for related_id in self._get_ids(row[field_name]) if related_id in related_values]
+                for sub_path in sub_paths:
+                    values[row["id"]][f"{field_name}.{sub_path}"] = ", ".join(str(related_row[sub_path]) for related_row in related_rows)
+        return values
+
+    @api.model
+    def _filter_readable(self, records):
+        """The part of ``records`` the user may read, through the access rights and the record rules."""
+        if not records.check_access_rights("read", raise_exception=False):
+            return records.browse()
+        return records._filter_access_rules("read")
+
+    def _get_ids(self, value):
+        if not value:
+            return []
+        return value if isinstance(value, list) else [value]
+
+    def _read_display_names(self, records, field_name, rows):
+        """Relational leaves are read without ``load`` and only hold ids, so fetch all their display names at once,
+        with ``sudo`` like ``Many2one.convert_to_read``: a comodel the user cannot read must not fail the whole read."""
+        field = records._fields[field_name]
+        if not field.relational:
+            return None
+        related_ids = {related_id for row in rows for related_id in self._get_ids(row[field_name])}
+        related_records = records.env[field.comodel_name].sudo().browse(related_ids)
+        return {row["id"]: row["display_name"] for row in related_records.read(["display_name"])}
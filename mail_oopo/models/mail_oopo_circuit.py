@@ -0,0 +1,179 @@
+import threading
+import time
+
+from collections import Counter
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+
+# Consecutive upstream failures opening the circuit, seconds before a half-open probe is allowed,
+# seconds after which a probe that never reported back is considered lost, and length of the error rate window.
+failure_threshold = 3
+open_cooldown = 30
+probe_timeout = 90
+error_window = 300
+# Successes of a closed circuit are buffered per process and added to the error rate window every
+# ``success_flush_size`` successes or with the next failure, so that a healthy upstream does not lock
+# and write the circuit row on every request.
+success_flush_size = 50
+_pending_successes = Counter()
+_pending_successes_lock = threading.Lock()
+# A circuit this process saw closed, without failures, is trusted for ``closed_state_ttl`` seconds before the row is
+# read again: the healthy path takes no cursor, and a circuit opened by another worker is seen within that delay.
+closed_state_ttl = 10
+_closed_circuits = {}
+_closed_circuits_lock = threading.Lock()
+
+class MailOopoCircuit(models.Model):
+    """Circuit breaker shared by all workers for an LLM upstream. Its state is read and written on a separate,
+    immediately committed cursor, so that every worker sees a trip within ``closed_state_ttl`` seconds."""
+    _name = "mail.oopo.circuit"
+    _description = "Oopo Upstream Circuit Breaker"
+
+    name = fields.Char(string="Upstream", required=True, readonly=True)
+    state = fields.Selection([
+        ("closed", "Closed"),
+        ("open", "Open"),
+        ("half_open", "Half-Open"),
+    ], string="State", required=True, default="closed", readonly=True)
+    consecutive_failures = fields.Integer(string="Consecutive Failures", readonly=True)
+    opened_at = fields.Datetime(string="Opened At", readonly=True)
+    probe_started_at = fields.Datetime(string="Probe Started At", readonly=True)
+    last_error = fields.Text(string="Last Error", readonly=True)
+    last_error_at = fields.Datetime(string="Last Error At", readonly=True)
+    window_start = fields.Datetime(string="Window Start", readonly=True)
+    window_requests = fields.Integer(string="Recent Requests", readonly=True)
+    window_errors = fields.Integer(string="Recent Errors", readonly=True)
+    error_rate = fields.Float(string="Recent Error Rate (%)", compute="_compute_error_rate")
+
+    _sql_constraints = [
+        ("name_uniq", "unique(name)", "There is only one circuit per upstream."),
+    ]
+
+    @api.depends("window_requests", "window_errors")
+    def _compute_error_rate(self):
+        for circuit in self:
+            circuit.error_rate = 100.0 * circuit.window_errors / circuit.window_requests if circuit.window_requests else 0.0
+
+    @api.model
+    def _acquire(self, name="openai"):
+        """Return None when a request may be sent upstream, or the status message to fail fast with.
+        Once the cooldown is over, a single request is let through as half-open probe."""
+        if self._is_known_closed(name):
+            return None
+        with self.env.registry.cursor() as cr:
+            if self._find_circuit(cr, name)._remember_state().state == "closed":
+                return None
+            circuit = self._lock_circuit(cr, name)
+            if circuit.state == "closed":
+                return None
+            now = fields.Datetime.now()
+            if (circuit.state == "open" and circuit.opened_at + timedelta(seconds=open_cooldown) <= now) or \
+                    (circuit.state == "half_open" and circuit.probe_started_at + timedelta(seconds=probe_timeout) <= now):
+                circuit.write({"state": "half_open", "probe_started_at": now})
+                circuit._remember_state()._notify_state()
+                return None
+            return _("[OpenAI Server Error] OpenAI has been failing repeatedly, Oopo paused its requests for a moment. "
+                     "Please retry your query after a brief wait. Last error: %s", circuit.last_error)
+
+    @api.model
+    def _record_success(self, name="openai"):
+        with _pending_successes_lock:
+            _pending_successes[name] += 1
+            flush = _pending_successes[name] >= success_flush_size
+        if self._is_known_closed(name) and not flush:
+            return
+        with self.env.registry.cursor() as cr:
+            circuit = self._find_circuit(cr, name)._remember_state()
+            if circuit.state == "closed" and not circuit.consecutive_failures and not flush:
+                return
+            circuit = self._lock_circuit(cr, name)
+            values = circuit._get_window_values(self._pop_pending_successes(name), errors=0)
+            if circuit.state != "closed" or circuit.consecutive_failures:
+                values.update({"state": "closed", "consecutive_failures": 0, "opened_at": False, "probe_started_at": False})
+            state = circuit.state
+            circuit.write(values)
+            circuit._remember_state()
+            if state != circuit.state:
+                circuit._notify_state()
+
+    @api.model
+    def _record_failure(self, error, name="openai"):
+        """Count a timeout, 5xx or connection error, opening the circuit after ``failure_threshold`` in a row
+        or when the half-open probe fails."""
+        with self.env.registry.cursor() as cr:
+            circuit = self._lock_circuit(cr, name)
+            now = fields.Datetime.now()
+            values = circuit._get_window_values(self._pop_pending_successes(name) + 1, errors=1)
+            values.update({
+                "consecutive_failures": circuit.consecutive_failures + 1,
+                "last_error": str(error),
+                "last_error_at": now,
+            })
+            state = circuit.state
+            if state == "half_open" or values["consecutive_failures"] >= failure_threshold:
+                values.update({"state": "open", "opened_at": now, "probe_started_at": False})
+            circuit.write(values)
+            circuit._remember_state()
+            if state != circuit.state:
+                circuit._notify_state()
+
+    @api.model
+    def _pop_pending_successes(self, name):
+        with _pending_successes_lock:
+            return _pending_successes.pop(name, 0)
+
+    @api.model
+    def _is_known_closed(self, name):
+        with _closed_circuits_lock:
+            return _closed_circuits.get((self.env.cr.dbname, name), 0) > time.monotonic()
+
+    def _remember_state(self):
+        """Record in this process whether the circuit is closed without failures, see ``closed_state_ttl``."""
+        key = (self.env.cr.dbname, self.name)
+        with _closed_circuits_lock:
+            if self.state == "closed" and not self.consecutive_failures:
+                _closed_circuits[key] = time.monotonic() + closed_state_ttl
+            else:
+                _closed_circuits.pop(key, None)
+        return self
+
+    @api.model
+    def _find_circuit(self, cr, name):
+        """Read the circuit without locking it, for the checks of the healthy path."""
+        env = self.env(cr=cr, su=True)
+        return env[self._name].search([("name", "=", name)], limit=1) or self._lock_circuit(cr, name)
+
+    @api.model
+    def _lock_circuit(self, cr, name):
+        """Lock the circuit row of ``name``, inserting it first for an upstream without a seeded circuit.
+        Concurrent first calls both insert with ON CONFLICT DO NOTHING and lock the same row."""
+        env = self.env(cr=cr, su=True)
+        cr.execute("SELECT id FROM mail_oopo_circuit WHERE name = %s FOR UPDATE", (name,))
+        row = cr.fetchone()
+        if not row:
+            cr.execute("""
+                INSERT INTO mail_oopo_circuit (name, state, consecutive_failures, window_requests, window_errors,
+                                               create_uid, write_uid, create_date, write_date)
+                VALUES (%s, 'closed', 0, 0, 0, %s, %s, now() at time zone 'UTC', now() at time zone 'UTC')
+                ON CONFLICT (name) DO NOTHING
+            """, (name, self.env.uid, self.env.uid))
+            cr.execute("SELECT id FROM mail_oopo_circuit WHERE name = %s FOR UPDATE", (name,))
+            row = cr.fetchone()
+        circuit = env[self._name].browse(row[0])
+        circuit.invalidate_recordset()
+        return circuit
+
+    def _get_window_values(self, requests, errors):
+        now = fields.Datetime.now()
+        if not self.window_start or self.window_start + timedelta(seconds=error_window) <= now:
+            return {"window_start": now, "window_requests": requests, "window_errors": errors}
+        return {"window_requests": self.window_requests + requests, "window_errors": self.window_errors + errors}
+
+    def _notify_state(self):
+        admins = self.env.ref("base.group_system").users.partner_id
+        self.env["bus.bus"]._sendmany([(admin, "mail_oopo/circuit_state", {
+            "name": self.name,
+            "state": self.state,
+            "last_error": self.last_error,
+        }) for admin in admins])
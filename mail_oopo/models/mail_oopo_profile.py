@@ -0,0 +1,80 @@
+import base64
+import io
+import pstats
+
+from odoo import models, fields, api
+
+# Rows of the Python profiler output kept in the report, by cumulative time.
+profile_stats_limit = 80
+
+class MailOopoProfile(models.Model):
+    """Breakdown of the time spent answering one question, captured for the users an administrator profiles."""
+    _name = "mail.oopo.profile"
+    _description = "Oopo Question Profile"
+    _order = "id desc"
+
+    user_id = fields.Many2one("res.users", string="User", required=True, ondelete="cascade", index=True)
+    message_id = fields.Many2one("mail.message", string="Question", ondelete="set null")
+    reply_message_id = fields.Many2one("mail.message", string="Reply", ondelete="set null")
+    question = fields.Text(string="Question Text")
+    duration = fields.Float(string="Duration (s)", digits=(16, 3))
+    sql_count = fields.Integer(string="SQL Queries")
+    sql_time = fields.Float(string="SQL Time (s)", digits=(16, 3))
+    llm_count = fields.Integer(string="LLM Calls")
+    llm_time = fields.Float(string="LLM Time (s)", digits=(16, 3))
+    prompt_tokens = fields.Integer(string="Prompt Tokens")
+    completion_tokens = fields.Integer(string="Completion Tokens")
+    function_count = fields.Integer(string="Function Calls")
+    function_time = fields.Float(string="Function Time (s)", digits=(16, 3))
+    spans = fields.Json(string="Spans", help="Timed steps of the answer: LLM calls, function calls, history formatting, ...")
+    report = fields.Binary(string="Report", attachment=True)
+    report_filename = fields.Char(string="Report Filename")
+
+    @api.model
+    def _store(self, profile, profiler, question, reply, duration, sql_count, sql_time):
+        spans = profile["spans"]
+        llm_spans = [span for span in spans if span["kind"] == "llm"]
+        function_spans = [span for span in spans if span["kind"] == "function"]
+        profile_record = self.create({
+            "user_id": self.env.uid,
+            "message_id": question.id,
+            "reply_message_id": reply.id if reply else False,
+            "question": profile.get("question"),
+            "duration": duration,
+            "sql_count": sql_count,
+            "sql_time": sql_time,
+            "llm_count": len(llm_spans),
+            "llm_time": sum(span["duration"] for span in llm_spans),
+            "prompt_tokens": sum(span.get("prompt_tokens", 0) for span in llm_spans),
+            "completion_tokens": sum(span.get("completion_tokens", 0) for span in llm_spans),
+            "function_count": len(function_spans),
+            "function_time": sum(span["duration"] for span in function_spans),
+            "spans": spans,
+        })
+        profile_record.write({
+            "report": base64.b64encode(profile_record._build_report(profiler).encode()),
+            "report_filename": f"oopo_profile_{profile_record.id}.txt",
+        })
+        return profile_record
+
+    def _build_report(self, profiler):
+        self.ensure_one()
+        lines = [
+            f"Question: {self.question or ''}",
+            f"User: {self.user_id.name} - Date: {self.create_date}",
+            "",
+            f"Total: {self.duration:.3f}s",
+            f"SQL: {self.sql_count} queries in {self.sql_time:.3f}s",
+            f"LLM: {self.llm_count} calls in {self.llm_time:.3f}s - {self.prompt_tokens} prompt / {self.completion_tokens} completion tokens",
+            f"Functions: {self.function_count} calls in {self.function_time:.3f}s",
+            "",
+            "Step | Name | Duration (s) | SQL queries | SQL time (s) | Details",
+        ]
+        for span in self.spans or []:
+            details = ", ".join(f"{key}={value}" for key, value in span.items() if key not in ("kind", "name", "duration", "queries", "query_time"))
+            lines.append(f"{span['kind']} | {span['name']} | {span['duration']:.3f} | {span['queries']} | {span['query_time']:.3f} | {details}")
+
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(profile_stats_limit)
+        lines += ["", "Python profile", stream.getvalue()]
+        return "\n".join(lines)
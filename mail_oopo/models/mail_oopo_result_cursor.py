@@ -0,0 +1,50 @@
+import secrets
+
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+# Minutes during which the bot can page through the results of a read_record call.
+cursor_ttl = 30
+
+class MailOopoResultCursor(models.TransientModel):
+    """Ids found by a paginated ``read_record`` call, so that the next pages are a plain ``read`` of the next ids.
+    Cursors are stored and fetched on a separate committed cursor, as reads may run on a read-only cursor or replica."""
+    _name = "mail.oopo.result.cursor"
+    _description = "Oopo Result Cursor"
+    _transient_max_hours = 1.0
+
+    token = fields.Char(string="Token", required=True, index=True)
+    res_model = fields.Char(string="Model", required=True)
+    field_names = fields.Json(string="Fields")
+    record_ids = fields.Json(string="Record IDs")
+    page_size = fields.Integer(string="Page Size", required=True)
+    channel_id = fields.Many2one("mail.channel", string="Channel", ondelete="cascade")
+
+    @api.model
+    def _open(self, res_model, field_names, record_ids, page_size):
+        token = secrets.token_urlsafe(16)
+        with self.env.registry.cursor() as cr:
+            self.env(cr=cr)[self._name].create({
+                "token": token,
+                "res_model": res_model,
+                "field_names": field_names,
+                "record_ids": record_ids,
+                "page_size": page_size,
+                "channel_id": self.env.context.get("oopo_channel_id"),
+            })
+        return token
+
+    @api.model
+    def _fetch(self, token):
+        """Values of the cursor ``token`` of the current user and channel, or None when it does not exist or expired."""
+        with self.env.registry.cursor() as cr:
+            result_cursor = self.env(cr=cr)[self._name].search([
+                ("token", "=", token),
+                ("create_uid", "=", self.env.uid),
+                ("channel_id", "=", self.env.context.get("oopo_channel_id", False)),
+                ("create_date", ">=", fields.Datetime.now() - timedelta(minutes=cursor_ttl)),
+            ], limit=1)
+            if not result_cursor:
+                return None
+            return result_cursor.read(["res_model", "field_names", "record_ids", "page_size"])[0]
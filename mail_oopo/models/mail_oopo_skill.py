@@ -0,0 +1,247 @@
+import ast
+import json
+import re
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+# JSON schema types of the slot types.
+slot_json_types = {
+    "char": "string",
+    "integer": "integer",
+    "float": "number",
+    "boolean": "boolean",
+}
+
+def parse_boolean(value):
+    """Boolean of a slot value, the LLM may send it as a string."""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("true", "1"):
+        return True
+    if text in ("false", "0"):
+        return False
+    raise ValueError(f"{value!r} is not a boolean, use true or false")
+
+# Casts of the slot values by slot type.
+slot_casts = {
+    "char": str,
+    "integer": int,
+    "float": float,
+    "boolean": parse_boolean,
+}
+
+# ``{{slot}}`` is replaced by the value of a slot, ``{{step1.0.id}}`` by a value of the result of a previous step.
+_placeholder_re = re.compile(r"\{\{\s*([\w.]+)\s*\}\}")
+_recordset_re = re.compile(r"^[\w.]+\(([\d, ]*)\)$")
+
+class MailOopoSkill(models.Model):
+    """A function-call plan recorded from a conversation, exposed to the LLM as one callable function.
+    Its steps are run server-side in one savepoint, instead of one LLM round per function call."""
+    _name = "mail.oopo.skill"
+    _description = "Oopo Skill"
+    _order = "name"
+
+    name = fields.Char(string="Name", required=True)
+    function_name = fields.Char(string="Function Name", compute="_compute_function_name", store=True, readonly=False, required=True,
+        help="Name of the function the LLM calls to run the skill")
+    description = fields.Text(string="Description", required=True, help="What the skill does and when to use it, sent to the LLM")
+    active = fields.Boolean(string="Active", default=True)
+    slot_ids = fields.One2many("mail.oopo.skill.slot", "skill_id", string="Slots", copy=True)
+    steps = fields.Text(string="Steps", required=True, default="[]",
+        help="""JSON list of {"function": ..., "arguments": {...}}. In arguments, {{slot}} is replaced by a slot value """
+             """and {{stepN.path}} by a value of the result of step N, e.g. {{step1.0.id}}.""")
+    message_id = fields.Many2one("mail.message", string="Recorded From", ondelete="set null", readonly=True)
+
+    _sql_constraints = [
+        ("function_name_uniq", "unique(function_name)", "The function name of a skill must be unique."),
+    ]
+
+    @api.depends("name")
+    def _compute_function_name(self):
+        for skill in self:
+            if not skill.function_name:
+                skill.function_name = "skill_" + re.sub(r"[^a-z0-9]+", "_", (skill.name or "").lower()).strip("_")
+
+    @api.constrains("function_name", "steps")
+    def _check_steps(self):
+        from .mail_bot import functions
+        function_names = {function["name"] for function in functions}
+        for skill in self:
+            if not re.fullmatch(r"skill_[a-z0-9_]+", skill.function_name or ""):
+                raise ValidationError(_("The function name of a skill must start with skill_ and only contain lowercase letters, digits and underscores."))
+            try:
+                steps = json.loads(skill.steps)
+            except ValueError as e:
+                raise ValidationError(_("The steps of the skill %s are not valid JSON: %s", skill.name, e))
+            if not isinstance(steps, list) or not all(isinstance(step, dict) and step.get("function") in function_names for step in steps):
+                raise ValidationError(_("Every step of a skill must call one of the functions %s.", ", ".join(sorted(function_names))))
+
+    @api.model
+    def _get_function_definitions(self):
+        return [skill._get_function_definition() for skill in self.search([])]
+
+    def _get_function_definition(self):
+        self.ensure_one()
+        return {
+            "name": self.function_name,
+            "description": f"{self.description} Runs the whole plan at once, prefer it over calling the functions one by one.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    slot.name: {"type": slot_json_types[slot.slot_type], "description": slot.description or slot.name}
+                    for slot in self.slot_ids
+                },
+                "required": self.slot_ids.filtered("required").mapped("name"),
+            },
+        }
+
+    def _get_slot_values(self, kwargs):
+        """Check and cast the arguments the LLM called the skill with."""
+        self.ensure_one()
+        values = {}
+        for slot in self.slot_ids:
+            value = kwargs.get(slot.name)
+            if value is None:
+                if slot.required:
+                    raise ValueError(f"The argument {slot.name} of {self.function_name} is required")
+                continue
+            values[slot.name] = slot_casts[slot.slot_type](value)
+        return values
+
+    def _render_arguments(self, arguments, slot_values, step_results):
+        """Replace the placeholders of ``arguments``. A string made of a single placeholder takes the value as is,
+        so that ids and numbers keep their type."""
+        if isinstance(arguments, dict):
+            return {key: self._render_arguments(value, slot_values, step_results) for key, value in arguments.items()}
+        if isinstance(arguments, list):
+            return [self._render_arguments(value, slot_values, step_results) for value in arguments]
+        if not isinstance(arguments, str):
+            return arguments
+
+        def resolve(path):
+            if path in slot_values:
+                return slot_values[path]
+            head, *keys = path.split(".")
+            if not re.fullmatch(r"step\d+", head) or not 0 < int(head[4:]) <= len(step_results):
+                raise ValueError(f"Unknown placeholder {{{{{path}}}}} in the skill {self.function_name}")
+            value = step_results[int(head[4:]) - 1]
+            for key in keys:
+                if isinstance(value, dict) and key.isdigit():
+                    # paginated read_record results
+                    value = value["records"]
+                if isinstance(value, models.BaseModel):
+                    value = value[int(key)] if key.isdigit() else value[key]
+                elif isinstance(value, (list, tuple)):
+                    value = value[int(key)]
+                else:
+                    value = value[key]
+            return value.id if isinstance(value, models.BaseModel) and len(value) == 1 else value
+
+        match = _placeholder_re.fullmatch(arguments.strip())
+        if match:
+            return resolve(match.group(1))
+        return _placeholder_re.sub(lambda match: str(resolve(match.group(1))), arguments)
+
+    @api.model
+    def _create_from_message(self, message):
+        """Record the successful function calls made before the bot reply ``message`` as a new skill.
+        String values searched by read_record, update_record and resolve_names become char slots, and ids
+        returned by a step and reused by a later one become references to that step."""
+        trace = message.oopo_get_function_trace()
+        requests = [item["function_content"]["function_call"] for item in trace if item["message_type"] == "bot_function_request"]
+        results = [item["function_content"].get("content") for item in trace if item["message_type"] == "bot_function"]
+        if not requests:
+            raise ValidationError(_("There is no function call to record for this reply."))
+
+        slots, steps, known_ids = {}, [], {}
+        for index, function_call in enumerate(requests):
+            arguments = json.loads(function_call["arguments"])
+            arguments = self._parameterize_arguments(function_call["name"], arguments, slots, known_ids)
+            steps.append({"function": function_call["name"], "arguments": arguments})
+            result = self._parse_recorded_result(results[index] if index < len(results) else None)
+            for position, record_id in enumerate(result):
+                known_ids.setdefault(record_id, f"{{{{step{index + 1}.{position}.id}}}}")
+
+        return self.create({
+            "name": _("Skill recorded from %s", message.record_name or message.date),
+            "description": _("Replays the plan: %s", ", ".join(step["function"] for step in steps)),
+            "steps": json.dumps(steps, indent=2),
+            "slot_ids": [
+                (0, 0, {"name": slot_name, "slot_type": "char", "description": _("Was %r in the recorded conversation", value)})
+                for value, slot_name in slots.items()
+            ],
+            "message_id": message.id,
+        })
+
+    @api.model
+    def _parameterize_arguments(self, function_name, arguments, slots, known_ids):
+        def slot_placeholder(model, field, value):
+            if value not in slots:
+                base_name = f"{(model or 'record').split('.')[-1]}_{field}".replace(".", "_")
+                slot_name, suffix = base_name, 2
+                while slot_name in slots.values():
+                    slot_name, suffix = f"{base_name}_{suffix}", suffix + 1
+                slots[value] = slot_name
+            return f"{{{{{slots[value]}}}}}"
+
+        def replace_ids(value, key=""):
+            # Only values of id fields are replaced, a quantity may well be equal to some id.
+            if isinstance(value, dict):
+                return {item_key: replace_ids(item, item_key) for item_key, item in value.items()}
+            if isinstance(value, list):
+                if len(value) == 3 and all(isinstance(item, str) for item in value[:2]):
+                    return [value[0], value[1], replace_ids(value[2], value[0])]
+                if value and isinstance(value[0], int) and key.endswith("_ids"):
+                    # x2many command, e.g. (4, id) or (6, 0, ids)
+                    return [value[0]] + [replace_ids(item, key) for item in value[1:]]
+                return [replace_ids(item, key) for item in value]
+            if isinstance(value, int) and not isinstance(value, bool) and (key == "id" or key.endswith(("_id", "_ids"))):
+                return known_ids.get(value, value)
+            return value
+
+        if function_name == "resolve_names":
+            arguments["names"] = [
+                dict(name, name=slot_placeholder(name.get("model"), "name", name["name"])) if isinstance(name.get("name"), str) else name
+                for name in arguments.get("names", [])
+            ]
+        for domain in arguments.get("search_domains") or []:
+            if isinstance(domain, list) and len(domain) == 3 and isinstance(domain[2], str):
+                domain[2] = slot_placeholder(arguments.get("model"), domain[0], domain[2])
+        return replace_ids(arguments)
+
+    @api.model
+    def _parse_recorded_result(self, content):
+        """Ids returned by a recorded step, from the JSON of its result. Results recorded before they were
+        stored as JSON hold the ``str`` of the result instead."""
+        if not content:
+            return []
+        try:
+            result = json.loads(content)
+        except ValueError:
+            try:
+                result = ast.literal_eval(content)
+            except (ValueError, SyntaxError):
+                result = content
+        if isinstance(result, str):
+            # recordset returned by create_record
+            match = _recordset_re.match(result.strip())
+            return [int(record_id) for record_id in match.group(1).replace(" ", "").split(",") if record_id] if match else []
+        if isinstance(result, dict):
+            result = result.get("records", [])
+        if isinstance(result, list):
+            return [row["id"] for row in result if isinstance(row, dict) and isinstance(row.get("id"), int)]
+        return []
+
+class MailOopoSkillSlot(models.Model):
+    _name = "mail.oopo.skill.slot"
+    _description = "Oopo Skill Slot"
+    _order = "sequence, id"
+
+    skill_id = fields.Many2one("mail.oopo.skill", string="Skill", required=True, ondelete="cascade", index=True)
+    sequence = fields.Integer(string="Sequence", default=10)
+    name = fields.Char(string="Name", required=True, help="Argument name, used as {{name}} in the steps")
+    slot_type = fields.Selection(list(zip(slot_json_types, ("Text", "Integer", "Decimal", "Boolean"))), string="Type", default="char", required=True)
+    description = fields.Char(string="Description", help="Description of the argument sent to the LLM")
+    required = fields.Boolean(string="Required", default=True)
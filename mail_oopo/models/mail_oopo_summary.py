@@ -0,0 +1,77 @@
+from odoo import models, fields, api
+
+# Bump whenever ``summary_prompt`` or the field formatting changes, so that stale summaries are not reused.
+summary_prompt_version = 3
+
+class MailOopoSummary(models.Model):
+    _name = "mail.oopo.summary"
+    _description = "Oopo Chatter Summary Cache"
+
+    res_model = fields.Char(string="Related Document Model", required=True, index=True)
+    res_id = fields.Many2oneReference(string="Related Document ID", model_field="res_model", required=True, index=True)
+    lang = fields.Char(string="Language", required=True)
+    # Summaries are built with the access rights of the requesting user, so they are only served to that user.
+    user_id = fields.Many2one("res.users", string="User", required=True, ondelete="cascade", index=True, default=lambda self: self.env.uid)
+    prompt_version = fields.Integer(string="Prompt Version", required=True)
+    fingerprint = fields.Char(string="Fingerprint", required=True, help="Write dates of the record and its related lines when the summary was generated")
+    field_infos = fields.Json(string="Field Information", help="Formatted field values the summary was generated from")
+    summary = fields.Text(string="Summary")
+
+    _sql_constraints = [
+        ("record_lang_version_uniq", "unique(res_model, res_id, lang, prompt_version, user_id)", "Only one summary can be cached per record, language, prompt version and user."),
+    ]
+
+    @api.model
+    def _get_cache(self, record):
+        return self.search([
+            ("res_model", "=", record._name),
+            ("res_id", "=", record.id),
+            ("lang", "=", self.env.lang or "en_US"),
+            ("prompt_version", "=", summary_prompt_version),
+            ("user_id", "=", self.env.uid),
+        ], limit=1)
+
+    @api.model
+    def _compute_fingerprint(self, record, relational_bindings, selected_chunks=None):
+        """Build a cheap key out of the write dates of the record and of its related lines,
+        so that an unchanged record can be detected without formatting any field."""
+        write_dates = [str(record.write_date)]
+        for field_name, field in record._fields.items():
+            if field.type in ("one2many", "many2many") and field.comodel_name in relational_bindings:
+                lines = record[field_name]
+                write_dates.append(f"{field_name}:{len(lines)}:{max(lines.mapped('write_date'), default='')}")
+        # Attachment excerpts depend on the extracted texts and on the question they were selected for,
+        # the checksum of a file identifies its text.
+        if selected_chunks:
+            write_dates.append("attachments:" + ",".join(
+                f"{attachment.id}:{text.checksum}:{'-'.join(map(str, indexes))}" for attachment, text, indexes in selected_chunks
+            ))
+        return "|".join(write_dates)
+
+    def _get_changed_field_infos(self, field_infos):
+        """Compare freshly formatted field values against the cached ones and return only the differences."""
+        self.ensure_one()
+        cached_field_infos = self.field_infos or {}
+        changed_field_infos = {field: info for field, info in field_infos.items() if cached_field_infos.get(field) != info}
+        for field in set(cached_field_infos) - set(field_infos):
+            changed_field_infos[field] = f"[{field}] no longer has a value\n"
+        return changed_field_infos
+
+    @api.model
+    def _store(self, record, fingerprint, field_infos, summary):
+        values = {
+            "fingerprint": fingerprint,
+            "field_infos": field_infos,
+            "summary": summary,
+        }
+        cache = self._get_cache(record)
+        if cache:
+            cache.write(values)
+            return cache
+        return self.create(dict(values,
+            res_model=record._name,
+            res_id=record.id,
+            lang=self.env.lang or "en_US",
+            prompt_version=summary_prompt_version,
+            user_id=self.env.uid,
+        ))
@@ -3,4 +3,53 @@ from odoo import fields, models
 class ResConfigSettings(models.TransientModel):
     _inherit = "res.config.settings"
 
-    openai_api_key = fields.Char(string="OpenAI API Key", config_parameter="mail_oopo.openapi_api_key")
\ No newline at end of file
+    openai_api_key = fields.Char(string="OpenAI API Key", config_parameter="mail_oopo.openapi_api_key")
+    oopo_llm_provider = fields.Selection([
+        ("openai", "OpenAI"),
+        ("openai_compatible", "OpenAI-Compatible Server"),
+        ("fake", "Fake (Tests)"),
+    ], string="LLM Provider", default="openai", config_parameter="mail_oopo.llm_provider")
+    oopo_openai_api_base = fields.Char(string="Server Base URL", config_parameter="mail_oopo.openai_api_base",
+        help="Base URL of the OpenAI-compatible server, e.g. http://llm.lan:8000/v1")
+    oopo_llm_models = fields.Char(string="Models", config_parameter="mail_oopo.llm_models",
+        help="Comma-separated models with their context size, e.g. llama3:8b:8192, mistral:32768. Defaults to the OpenAI GPT models.")
+    oopo_moderation = fields.Selection([
+        ("openai", "OpenAI Moderation"),
+        ("local", "Local Classifier"),
+        ("none", "None"),
+    ], string="Moderation", config_parameter="mail_oopo.moderation",
+        help="Defaults to OpenAI moderation with the OpenAI provider, and to the local classifier otherwise")
+    oopo_moderation_blocklist = fields.Char(string="Blocked Terms", config_parameter="mail_oopo.moderation_blocklist",
+        help="Comma-separated terms flagged by the local moderation classifier")
+    oopo_summary_model_ids = fields.Many2many("ir.model", string="Bulk Summary Models", domain=[("transient", "=", False)],
+        help="Models whose list views offer the 'Summarize with Oopo' action")
+    oopo_summary_concurrency = fields.Integer(string="Bulk Summary Concurrency", default=4, config_parameter="mail_oopo.summary_concurrency",
+        help="Maximum number of summaries requested from OpenAI at the same time")
+    oopo_trigram_models = fields.Char(string="Name Matching Models", config_parameter="mail_oopo.trigram_models",
+        help="Comma-separated models whose names are matched with trigram indexes, e.g. res.partner,product.template")
+    oopo_replica_uri = fields.Char(string="Read Replica URI", config_parameter="mail_oopo.replica_uri",
+        help="PostgreSQL URI of a streaming replica for Oopo read queries, e.g. postgresql://odoo@replica:5432/mydb")
+    oopo_tiktoken_cache_dir = fields.Char(string="Tokenizer Cache Directory", config_parameter="mail_oopo.tiktoken_cache_dir",
+        help="Directory holding the tiktoken BPE files, pre-seed it for workers without internet access. Defaults to the tiktoken folder of the data directory.")
+    oopo_prewarm = fields.Boolean(string="Pre-warm OdooBot Chat", config_parameter="mail_oopo.prewarm",
+        help="Load what the first answer needs when a user opens the OdooBot chat, so that it is as fast as the next ones.")
+    oopo_prompt_module_report = fields.Text(string="Prompt Modules", compute="_compute_oopo_prompt_module_report",
+        help="Token cost of each prompt module, and of the system message variants assembled by this worker")
+
+    def _compute_oopo_prompt_module_report(self):
+        report = self.env["mail.bot"]._get_prompt_module_report()
+        for settings in self:
+            settings.oopo_prompt_module_report = report
+
+    def action_oopo_create_trigram_indexes(self):
+        self.env["mail.bot"]._create_trigram_indexes()
+
+    def get_values(self):
+        res = super().get_values()
+        actions = self.env["ir.actions.act_window"].sudo().search([("res_model", "=", "mail.oopo.summary.wizard"), ("binding_model_id", "!=", False)])
+        res["oopo_summary_model_ids"] = [(6, 0, actions.binding_model_id.ids)]
+        return res
+
+    def set_values(self):
+        super().set_values()
+        self.env["mail.oopo.summary.wizard"]._update_bindings(self.oopo_summary_model_ids)
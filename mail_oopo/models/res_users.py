@@ -12,7 +12,12 @@ class Users(models.Model):
             ("disabled", "Disabled"),
         ], string="Oopo AI Status", required=False, default="not_initialized")
     
-    openai_model = fields.Selection([("gpt-3.5-turbo-0613", "4k Context Model"),("gpt-3.5-turbo-16k", "16k Context Model"), ("gpt-4", "GPT4 8k")], string="OpenAI Model", default="gpt-3.5-turbo-0613")
+    openai_model = fields.Selection(selection="_get_openai_model_selection", string="OpenAI Model", default="auto")
+    oopo_profile_all = fields.Boolean(string="Profile Oopo Questions", help="Capture a profile report of every question of this user to OdooBot")
+    oopo_profile_remaining = fields.Integer(string="Profile Next Oopo Questions", help="Capture a profile report of the next questions of this user to OdooBot")
+
+    def _get_openai_model_selection(self):
+        return self.env["mail.bot"]._get_model_selection()
 
     @property
     def SELF_READABLE_FIELDS(self):
@@ -21,7 +26,25 @@ class Users(models.Model):
     def _init_messaging(self):
         if self.oopo_state in [False, "not_initialized"] and self._is_internal():
             self._init_odoobot()
-        return super()._init_messaging()
+        values = super()._init_messaging()
+        # Delivered once with the messaging payload so that the client does not fetch it per thread.
+        values["oopo"] = {
+            "selected_model": self.env["mail.bot"].with_user(self).get_model(),
+            "models": self.env["mail.bot"]._get_model_selection(),
+            "state": self.oopo_state,
+            "prewarm": bool(self.env["ir.config_parameter"].sudo().get_param("mail_oopo.prewarm")),
+        }
+        return values
+
+    def _oopo_consume_profiling(self):
+        """Whether the question being answered is profiled, counting down the questions left to profile."""
+        self.ensure_one()
+        if self.oopo_profile_all:
+            return True
+        if self.oopo_profile_remaining > 0:
+            self.sudo().oopo_profile_remaining -= 1
+            return True
+        return False
 
     def _init_odoobot(self):
         self.ensure_one()
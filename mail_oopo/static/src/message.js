@@ -0,0 +1,59 @@
+/** @odoo-module **/
+
+import { registerPatch } from '@mail/model/model_core';
+import { attr } from '@mail/model/model_field';
+
+registerPatch({
+    name: "Message",
+    recordMethods: {
+        async onClickToggleOopoFunctionTrace(ev) {
+            ev.stopPropagation();
+            if (!this.oopoFunctionTrace) {
+                const trace = await this.messaging.rpc({
+                    model: 'mail.message',
+                    method: 'oopo_get_function_trace',
+                    args: [[this.id]],
+                });
+                if (!this.exists()) {
+                    return;
+                }
+                this.update({
+                    oopoFunctionTrace: trace.map(message => JSON.stringify(message.function_content, null, 2)),
+                });
+            }
+            this.update({ isOopoFunctionTraceOpen: !this.isOopoFunctionTraceOpen });
+        },
+        async onClickOopoSaveSkill(ev) {
+            ev.stopPropagation();
+            const action = await this.messaging.rpc({
+                model: 'mail.message',
+                method: 'oopo_save_skill',
+                args: [[this.id]],
+            });
+            this.env.services.action.doAction(action);
+        },
+    },
+    fields: {
+        canOopoSaveSkill: attr({
+            compute() {
+                // Skills are managed by administrators, see the access rights of mail.oopo.skill.
+                return Boolean(this.env.services.user.isAdmin);
+            },
+            default: false,
+        }),
+        hasOopoFunctionTrace: attr({
+            compute() {
+                return Boolean(
+                    this.originThread && this.originThread.isOdooBotThread &&
+                    this.author && this.author === this.messaging.partnerRoot &&
+                    this.message_type === 'comment'
+                );
+            },
+            default: false,
+        }),
+        isOopoFunctionTraceOpen: attr({
+            default: false,
+        }),
+        oopoFunctionTrace: attr(),
+    },
+});
@@ -0,0 +1,39 @@
+/** @odoo-module **/
+
+import { registerPatch } from '@mail/model/model_core';
+import { attr } from '@mail/model/model_field';
+
+registerPatch({
+    name: "Messaging",
+    recordMethods: {
+        async fetchOopoSelectedGPTModel() {
+            const res = await this.rpc({
+                model: 'mail.bot',
+                method: 'get_model',
+                args: [0],
+            });
+            this.update({ oopoSelectedGPTModel: res });
+        },
+        async changeOopoSelectedGPTModel(gptmodel) {
+            if (gptmodel === this.oopoSelectedGPTModel) {
+                return;
+            }
+            this.update({ oopoSelectedGPTModel: gptmodel });
+            await this.rpc({
+                model: 'mail.bot',
+                method: 'change_model',
+                args: [0, gptmodel],
+            });
+        },
+    },
+    fields: {
+        oopoGPTModels: attr({
+            default: [],
+        }),
+        oopoPrewarm: attr({
+            default: false,
+        }),
+        oopoSelectedGPTModel: attr(),
+        oopoState: attr(),
+    },
+});
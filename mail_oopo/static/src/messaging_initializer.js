@@ -0,0 +1,20 @@
+/** @odoo-module **/
+
+import { registerPatch } from '@mail/model/model_core';
+
+registerPatch({
+    name: "MessagingInitializer",
+    recordMethods: {
+        async _init(data) {
+            await this._super(data);
+            if (data.oopo) {
+                this.messaging.update({
+                    oopoGPTModels: data.oopo.models,
+                    oopoSelectedGPTModel: data.oopo.selected_model,
+                    oopoState: data.oopo.state,
+                    oopoPrewarm: data.oopo.prewarm,
+                });
+            }
+        },
+    },
+});
@@ -0,0 +1,37 @@
+/** @odoo-module **/
+
+import { registry } from '@web/core/registry';
+
+/**
+ * Tell the user when the bulk summaries they queued are done, and open the report when one was requested.
+ */
+export const oopoSummaryService = {
+    dependencies: ['action', 'bus_service', 'notification'],
+    start(env, { action, bus_service, notification }) {
+        bus_service.addEventListener('notification', ({ detail: notifications }) => {
+            for (const { type, payload } of notifications) {
+                if (type !== 'mail_oopo/summary_progress' || payload.state === 'queued') {
+                    continue;
+                }
+                if (payload.state === 'failed') {
+                    notification.add(env._t("Oopo could not summarize the records."), { type: 'danger' });
+                    continue;
+                }
+                const openReport = () => action.doAction({
+                    type: 'ir.actions.act_window',
+                    res_model: 'mail.oopo.summary.wizard',
+                    res_id: payload.id,
+                    views: [[false, 'form']],
+                    target: 'new',
+                });
+                notification.add(env._t("Oopo summarized %s records.").replace('%s', payload.total), {
+                    type: 'success',
+                    sticky: payload.output === 'report',
+                    buttons: payload.output === 'report' ? [{ name: env._t("Open Report"), primary: true, onClick: openReport }] : [],
+                });
+            }
+        });
+    },
+};
+
+registry.category('services').add('mail_oopo.summary', oopoSummaryService);
@@ -3,31 +3,27 @@
 import { registerPatch } from '@mail/model/model_core';
 import { attr } from '@mail/model/model_field';
 import { clear } from '@mail/model/model_field_command';
-import { browser } from "@web/core/browser/browser";
 
 registerPatch({
     name: "Thread",
-    lifecycleHooks: {
-        _created() {
-            this.messaging.rpc({
-                model: 'mail.bot',
-                method: 'get_model',
-                args: [0],
-            }).then((res) => {
-                this.update({selectedGPTModel: res});
-            });
+    onChanges: [
+        {
+            dependencies: ['isOdooBotThread'],
+            methodName: '_onChangeIsOdooBotThread',
         },
-    },
+    ],
     recordMethods: {
         onClickChangeModel(ev) {
             ev.stopPropagation();
-            this.messaging.rpc({
-                model: 'mail.bot',
-                method: 'change_model',
-                args: [0,ev.target.value],
-            });
-            this.update({ selectedGPTModel: ev.target.value });
-        }
+            this.messaging.changeOopoSelectedGPTModel(ev.target.value);
+        },
+        _onChangeIsOdooBotThread() {
+            // The selected model is delivered with the messaging init payload, only fetch it
+            // as a fallback for the OdooBot thread when that payload did not include it.
+            if (this.isOdooBotThread && this.messaging.oopoSelectedGPTModel === undefined) {
+                this.messaging.fetchOopoSelectedGPTModel();
+            }
+        },
     },
     fields: {
         isChannelRenamable: {
@@ -38,8 +34,17 @@ registerPatch({
                 return this.channel.displayName !== "OdooBot" && this._super();
             }
         },
+        isOdooBotThread: attr({
+            compute() {
+                return Boolean(this.channel && this.channel.displayName === "OdooBot");
+            },
+            default: false,
+        }),
         selectedGPTModel: attr({
-            default: ''
+            compute() {
+                return this.messaging.oopoSelectedGPTModel || '';
+            },
+            default: '',
         }),
     },
-})
\ No newline at end of file
+})
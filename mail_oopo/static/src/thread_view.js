@@ -0,0 +1,25 @@
+/** @odoo-module **/
+
+import { registerPatch } from '@mail/model/model_core';
+
+registerPatch({
+    name: "ThreadView",
+    onChanges: [
+        {
+            dependencies: ['thread'],
+            methodName: '_onChangeThreadOopoPrewarm',
+        },
+    ],
+    recordMethods: {
+        _onChangeThreadOopoPrewarm() {
+            // Let the server prepare the first answer while the user is typing the question.
+            if (this.thread && this.thread.isOdooBotThread && this.messaging.oopoPrewarm) {
+                this.messaging.rpc({
+                    model: 'mail.channel',
+                    method: 'oopo_prewarm',
+                    args: [[this.thread.id]],
+                }, { shadow: true });
+            }
+        },
+    },
+});
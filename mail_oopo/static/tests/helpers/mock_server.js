@@ -0,0 +1,20 @@
+/** @odoo-module **/
+
+import { patch } from '@web/core/utils/patch';
+import { MockServer } from '@web/../tests/helpers/mock_server';
+
+patch(MockServer.prototype, 'mail_oopo', {
+    /**
+     * Simulates the Oopo values added to the messaging payload by `res.users._init_messaging`.
+     */
+    _mockResUsers_InitMessaging(ids) {
+        const values = this._super(ids);
+        values.oopo = {
+            selected_model: 'auto',
+            models: [['auto', 'Auto'], ['gpt-3.5-turbo', 'gpt-3.5-turbo']],
+            state: 'idle',
+            prewarm: false,
+        };
+        return values;
+    },
+});
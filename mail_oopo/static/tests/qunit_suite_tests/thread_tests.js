@@ -0,0 +1,83 @@
+/** @odoo-module **/
+
+import { start, startServer } from '@mail/../tests/helpers/test_utils';
+
+QUnit.module('mail_oopo', {}, function () {
+QUnit.module('thread_tests.js');
+
+// Enough channels for a per-channel RPC to show up as a repeated route.
+const CHANNEL_COUNT = 30;
+
+/**
+ * Opens Discuss on the OdooBot chat of a user member of many other channels,
+ * and returns every RPC made from the page load, `model/method` for ORM calls.
+ */
+async function openOdooBotChat({ prewarm = false } = {}) {
+    const pyEnv = await startServer();
+    for (let index = 0; index < CHANNEL_COUNT; index++) {
+        const partnerId = pyEnv['res.partner'].create({ name: `Oopo Colleague ${index}` });
+        pyEnv['mail.channel'].create({
+            channel_member_ids: [
+                [0, 0, { partner_id: pyEnv.currentPartnerId }],
+                [0, 0, { partner_id: partnerId }],
+            ],
+            channel_type: index % 2 ? 'chat' : 'channel',
+            name: `Oopo Channel ${index}`,
+        });
+    }
+    const mailChannelId = pyEnv['mail.channel'].create({
+        channel_member_ids: [
+            [0, 0, { partner_id: pyEnv.currentPartnerId }],
+            [0, 0, { partner_id: pyEnv.odoobotId }],
+        ],
+        channel_type: 'chat',
+        name: 'OdooBot',
+    });
+    const rpcs = [];
+    const { openDiscuss } = await start({
+        discuss: {
+            params: {
+                default_active_id: `mail.channel_${mailChannelId}`,
+            },
+        },
+        async mockRPC(route, args, performRPC) {
+            rpcs.push(args && args.model ? `${args.model}/${args.method}` : route);
+            if (route === '/mail/init_messaging') {
+                const values = await performRPC(route, args);
+                values.oopo.prewarm = prewarm;
+                return values;
+            }
+            if (args && (args.model === 'mail.bot' || args.method === 'oopo_prewarm')) {
+                return true;
+            }
+        },
+    });
+    await openDiscuss();
+    return rpcs;
+}
+
+function assertNoRpcPerChannel(assert, rpcs) {
+    assert.strictEqual(rpcs.length, new Set(rpcs).size, `no RPC should be repeated per channel, got: ${rpcs.join(', ')}`);
+    assert.ok(rpcs.length < CHANNEL_COUNT, `the number of RPCs should not grow with the channels, got ${rpcs.length}`);
+    assert.strictEqual(rpcs.filter(rpc => rpc === '/mail/init_messaging').length, 1);
+    assert.strictEqual(rpcs.filter(rpc => rpc === '/mail/channel/messages').length, 1, "only the open channel loads its messages");
+}
+
+function oopoRpcs(rpcs) {
+    return rpcs.filter(rpc => rpc.startsWith('mail.bot/') || rpc.endsWith('/oopo_prewarm'));
+}
+
+QUnit.test('opening the OdooBot chat does not fetch the selected model', async function (assert) {
+    const rpcs = await openOdooBotChat();
+    assert.containsOnce(document.body, '.o_ThreadView', "the OdooBot chat should be open");
+    assertNoRpcPerChannel(assert, rpcs);
+    assert.deepEqual(oopoRpcs(rpcs), [], "the selected model comes with the messaging payload");
+});
+
+QUnit.test('opening the OdooBot chat pre-warms it with a single RPC', async function (assert) {
+    const rpcs = await openOdooBotChat({ prewarm: true });
+    assertNoRpcPerChannel(assert, rpcs);
+    assert.deepEqual(oopoRpcs(rpcs), ['mail.channel/oopo_prewarm'], "only the pre-warm call should be made");
+});
+
+});
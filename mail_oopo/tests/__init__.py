@@ -0,0 +1,9 @@
+from . import test_mail_bot_fake
+from . import test_mail_channel
+from . import test_mail_oopo_binding
+from . import test_mail_oopo_summary
+from . import test_mail_message
+from . import test_mail_oopo_summary_wizard
+from . import test_mail_oopo_circuit
+from . import test_mail_oopo_attachment_text
+from . import test_mail_oopo_skill
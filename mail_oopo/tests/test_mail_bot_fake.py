@@ -0,0 +1,221 @@
+import json
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase, new_test_user
+from odoo.tools import mute_logger
+
+from odoo.addons.mail_oopo.models.mail_bot import system_prompt_modules
+
+@tagged("post_install", "-at_install")
+class TestMailBotFake(TransactionCase):
+    """Run the bot end to end on the fake LLM backend, the replies being given by the ``oopo_fake_responses`` context key."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env["ir.config_parameter"].sudo().set_param("mail_oopo.llm_provider", "fake")
+        cls.user = new_test_user(cls.env, login="oopo_fake_user", groups="base.group_user")
+        cls.odoobot = cls.env.ref("base.partner_root")
+        cls.partner = cls.env["res.partner"].create({"name": "Oopo Fake Customer", "phone": "+32 470 12 34 56"})
+
+    def setUp(self):
+        super().setUp()
+        # Reads run on a separate cursor, which has to see the records of the test transaction.
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        self.channel = self.user.with_user(self.user)._init_odoobot()
+
+    def _ask(self, body, fake_responses):
+        self.channel.with_user(self.user).with_context(oopo_fake_responses=fake_responses).message_post(
+            body=body, message_type="comment", subtype_xmlid="mail.mt_comment",
+        )
+        return self.env["mail.message"].search([("model", "=", "mail.channel"), ("res_id", "=", self.channel.id)], order="id asc")
+
+    def _ask_recording_requests(self, body, fake_responses):
+        """Like ``_ask``, also returning the messages of every request sent to the fake backend."""
+        requests = []
+        bot_class = type(self.env["mail.bot"])
+        fake_chat_completion = bot_class._fake_chat_completion
+
+        def record_request(bot, params):
+            requests.append([dict(message) for message in params["messages"]])
+            return fake_chat_completion(bot, params)
+
+        with patch.object(bot_class, "_fake_chat_completion", autospec=True, side_effect=record_request):
+            messages = self._ask(body, fake_responses)
+        return messages, requests
+
+    def test_read_question(self):
+        arguments = {"model": "res.partner", "field": ["name", "phone"], "search_domains": [["name", "=", "Oopo Fake Customer"]], "limit": 1}
+        fake_responses = [
+            {"content": "read res.partner\nOPERATIONS: read"},
+            {"function_call": {"name": "read_record", "arguments": json.dumps(arguments)}},
+            {"content": "The phone number of Oopo Fake Customer is +32 470 12 34 56."},
+        ]
+        messages = self._ask("phone number of Oopo Fake Customer", fake_responses)
+
+        self.assertFalse(fake_responses, "Every fake response should have been used")
+        function_messages = messages.filtered(lambda message: message.message_type == "bot_function")
+        self.assertEqual(len(function_messages), 1)
+        self.assertIn("+32 470 12 34 56", function_messages.function_content["content"])
+        reply = messages[-1]
+        self.assertEqual(reply.author_id, self.odoobot)
+        self.assertIn("+32 470 12 34 56", reply.body)
+
+    def test_create_question(self):
+        arguments = {"model": "res.partner", "values": {"name": "Oopo Fake Prospect"}}
+        fake_responses = [
+            {"content": "create res.partner\nOPERATIONS: create"},
+            {"function_call": {"name": "create_record", "arguments": json.dumps(arguments)}},
+            {"content": "Oopo Fake Prospect was created."},
+        ]
+        messages = self._ask("create a customer named oopo fake prospect", fake_responses)
+
+        self.assertEqual(self.env["res.partner"].search_count([("name", "=", "Oopo Fake Prospect")]), 1)
+        self.assertIn("Oopo Fake Prospect was created.", messages[-1].body)
+
+    def test_failing_function_replies_with_hint(self):
+        arguments = {"names": [{"model": "res.no_such_model", "name": "Oopo Fake Customer"}]}
+        fake_responses = [
+            {"content": "read res.partner\nOPERATIONS: read"},
+            {"function_call": {"name": "resolve_names", "arguments": json.dumps(arguments)}},
+            {"content": "I could not find this customer."},
+        ]
+        messages, requests = self._ask_recording_requests("who is oopo fake customer", fake_responses)
+        self.assertEqual(messages[-1].author_id, self.odoobot)
+        self.assertIn("I could not find this customer.", messages[-1].body)
+        # The request following the failure carries the hint about the unknown model.
+        hint = self.env["mail.bot"]._get_user_prompt_helper(("model", "res.no_such_model"))
+        self.assertEqual(requests[-1][-1]["role"], "user")
+        self.assertTrue(requests[-1][-1]["content"].startswith(hint))
+        self.assertIn("who is oopo fake customer", requests[-1][-1]["content"])
+
+    def test_repeated_read_is_memoized(self):
+        arguments = {"model": "res.partner", "field": ["name", "phone"], "search_domains": [["name", "=", "Oopo Fake Customer"]], "limit": 1}
+        fake_responses = [
+            {"content": "read res.partner\nOPERATIONS: read"},
+            {"function_call": {"name": "read_record", "arguments": json.dumps(arguments)}},
+            # Same call, with another key order.
+            {"function_call": {"name": "read_record", "arguments": json.dumps(dict(reversed(list(arguments.items()))))}},
+            {"content": "The phone number of Oopo Fake Customer is +32 470 12 34 56."},
+        ]
+        bot_class = type(self.env["mail.bot"])
+        with patch.object(bot_class, "_run_function_call", autospec=True, side_effect=bot_class._run_function_call) as run_function_call:
+            messages, requests = self._ask_recording_requests("phone number of Oopo Fake Customer", fake_responses)
+        self.assertEqual(run_function_call.call_count, 1, "The repeated call should be served from the memo")
+        function_results = [message for message in requests[-1] if message["role"] == "function"]
+        self.assertEqual(len(function_results), 2)
+        self.assertEqual(function_results[0]["content"], function_results[1]["content"])
+        self.assertIn("+32 470 12 34 56", messages[-1].body)
+
+    def test_repeated_failure_gives_up_with_hint(self):
+        arguments = {"names": [{"model": "res.no_such_model", "name": "Oopo Fake Customer"}]}
+        function_call = {"function_call": {"name": "resolve_names", "arguments": json.dumps(arguments)}}
+        fake_responses = [
+            {"content": "read res.partner\nOPERATIONS: read"},
+            function_call, function_call, function_call, function_call,
+            {"content": "I could not find this customer."},
+        ]
+        messages, requests = self._ask_recording_requests("who is oopo fake customer", fake_responses)
+
+        self.assertEqual(len(fake_responses), 2, "The loop should stop after the third identical failure")
+        hints = [message["content"] for message in requests[-1] if message["role"] == "user" and "exactly the same arguments" in message["content"]]
+        self.assertEqual(len(hints), 1, "The second identical failure is answered with the targeted hint")
+        self.assertTrue(hints[0].startswith("You already called resolve_names"))
+        self.assertIn("the function resolve_names kept failing with", messages[-1].body)
+        self.assertIn("res.no_such_model", messages[-1].body)
+        self.assertFalse(messages.filtered(lambda message: message.message_type in ("bot_function", "bot_function_request")))
+
+    def test_reads_share_one_read_only_cursor(self):
+        arguments = {"model": "res.partner", "field": ["name", "phone"], "search_domains": [["name", "=", "Oopo Fake Customer"]], "limit": 1}
+        fake_responses = [
+            {"content": "read res.partner\nOPERATIONS: read"},
+            {"function_call": {"name": "read_record", "arguments": json.dumps(arguments)}},
+            {"function_call": {"name": "read_record", "arguments": json.dumps(dict(arguments, field=["email"]))}},
+            {"content": "The phone number of Oopo Fake Customer is +32 470 12 34 56."},
+        ]
+        bot_class = type(self.env["mail.bot"])
+        with patch.object(bot_class, "_open_read_only_cursor", autospec=True, side_effect=bot_class._open_read_only_cursor) as open_cursor:
+            messages = self._ask("phone and email of Oopo Fake Customer", fake_responses)
+        self.assertEqual(open_cursor.call_count, 1)
+        self.assertEqual(len(messages.filtered(lambda message: message.message_type == "bot_function")), 2)
+
+    def test_write_in_read_only_function_fails(self):
+        def read_record(bot, **kwargs):
+            bot.env["res.partner"].create({"name": "Oopo Sneaky Write"})
+            bot.env.flush_all()
+
+        bot = self.env["mail.bot"].with_user(self.user)
+        message = {"function_call": {"name": "read_record", "arguments": json.dumps({"model": "res.partner", "field": ["name"]})}}
+        with patch.object(type(bot), "_read_record", autospec=True, side_effect=read_record), mute_logger("odoo.sql_db"):
+            _function_response, function_call_fail, error_message, _model_name = bot._run_function_call(message)
+        self.assertTrue(function_call_fail)
+        self.assertIn("read-only transaction", str(error_message))
+        self.assertFalse(self.env["res.partner"].search_count([("name", "=", "Oopo Sneaky Write")]))
+
+    def test_detect_intents(self):
+        bot = self.env["mail.bot"]
+        for body in ("how many new leads do we have", "which orders are set to done", "what did we add last week", "who can make decisions"):
+            self.assertEqual(bot._detect_intents(body), {"read"}, body)
+        for body in ("create a customer named oopo", "please set the phone of deco addict", "<p>update the price</p>",
+                     "deco addict moved. can you change its address", "@odoobot confirm the order s00042"):
+            self.assertEqual(bot._detect_intents(body), {"read", "write"}, body)
+
+    def test_prompt_modules_per_question(self):
+        write_prompt = system_prompt_modules["write_fields_prompt"]
+        read_prompt = system_prompt_modules["read_fields_prompt"]
+        fake_responses = [
+            {"content": "read crm.lead\nOPERATIONS: read"},
+            {"content": "There are 3 new leads."},
+        ]
+        _messages, requests = self._ask_recording_requests("how many new leads do we have", fake_responses)
+        system_messages = [request[0]["content"] for request in requests]
+        self.assertTrue(all(read_prompt in message and write_prompt not in message for message in system_messages))
+
+        fake_responses = [
+            {"content": "create res.partner\nOPERATIONS: create"},
+            {"content": "Oopo Fake Prospect was created."},
+        ]
+        _messages, requests = self._ask_recording_requests("please create a customer named oopo fake prospect", fake_responses)
+        system_messages = [request[0]["content"] for request in requests]
+        self.assertTrue(all(read_prompt in message and write_prompt in message for message in system_messages))
+
+    def test_write_plan_from_operations(self):
+        def plan(**message):
+            return {"choices": [{"message": message}]}
+
+        bot = self.env["mail.bot"]
+        self.assertFalse(bot._is_write_plan(plan(content="No create or update operations are needed.\nOPERATIONS: read")))
+        self.assertFalse(bot._is_write_plan(plan(content="Create nothing, just read res.partner.")))
+        self.assertTrue(bot._is_write_plan(plan(content="read res.partner, then create sale.order\nOPERATIONS: read, create")))
+        self.assertTrue(bot._is_write_plan(plan(content=None, function_call={"name": "update_record", "arguments": "{}"})))
+        self.assertFalse(bot._is_write_plan(plan(content=None, function_call={"name": "read_record", "arguments": "{}"})))
+
+    def test_credentials_are_sent_per_request(self):
+        config_parameters = self.env["ir.config_parameter"].sudo()
+        config_parameters.set_param("mail_oopo.openapi_api_key", "sk-oopo")
+        config_parameters.set_param("mail_oopo.openai_api_base", "http://llm.lan:8000/v1")
+        bot = self.env["mail.bot"]
+
+        config_parameters.set_param("mail_oopo.llm_provider", "openai_compatible")
+        params = bot._get_chat_completion_params("llama3:8b", [])
+        self.assertEqual((params["api_key"], params["api_base"]), ("sk-oopo", "http://llm.lan:8000/v1"))
+
+        config_parameters.set_param("mail_oopo.llm_provider", "openai")
+        params = bot._get_chat_completion_params("gpt-3.5-turbo", [])
+        self.assertEqual(params["api_base"], "https://api.openai.com/v1")
+
+    def test_resolve_names_rejects_unknown_model(self):
+        with self.assertRaisesRegex(ValueError, "res.no_such_model"):
+            self.env["mail.bot"]._resolve_names([{"model": "res.no_such_model", "name": "x"}])
+
+    def test_stale_selected_model_falls_back_to_auto(self):
+        self.env["ir.config_parameter"].sudo().set_param("mail_oopo.llm_models", "llama3:8b:8192")
+        self.cr.execute("UPDATE res_users SET openai_model = 'gpt-4' WHERE id = %s", (self.user.id,))
+        self.user.invalidate_recordset(["openai_model"])
+        self.assertEqual(self.env["mail.bot"].with_user(self.user).get_model(), "auto")
+        # The default is valid whatever the configured models.
+        user = new_test_user(self.env, login="oopo_fake_user_2", groups="base.group_user")
+        self.assertEqual(user.openai_model, "auto")
@@ -0,0 +1,47 @@
+import json
+
+from odoo.tests import tagged
+from odoo.tests.common import HttpCase, new_test_user
+
+@tagged("post_install", "-at_install")
+class TestMailChannelHistory(HttpCase):
+
+    def test_function_messages_hidden_from_discuss(self):
+        user = new_test_user(self.env, login="oopo_history_user", password="oopo_history_user", groups="base.group_user")
+        channel = user.with_user(user)._init_odoobot()
+        bot = self.env["mail.bot"]
+        for index in range(3):
+            function_call = {"name": "read_record", "arguments": json.dumps({"model": "res.partner", "field": ["name"]})}
+            bot._create_functional_message(channel, {"role": "assistant", "content": None, "function_call": function_call}, "bot_function_request")
+            bot._create_functional_message(channel, {"role": "function", "name": "read_record", "content": "[]"}, "bot_function")
+        channel.message_post(body="Here you go", author_id=self.env.ref("base.partner_root").id, message_type="comment", subtype_xmlid="mail.mt_comment")
+
+        self.authenticate("oopo_history_user", "oopo_history_user")
+        response = self.url_open(
+            "/mail/channel/messages",
+            data=json.dumps({"jsonrpc": "2.0", "method": "call", "id": 1, "params": {"channel_id": channel.id, "limit": 2}}),
+            headers={"Content-Type": "application/json"},
+        )
+        messages = response.json()["result"]
+        # The page is filled with the two visible messages, function calls are not sent to the client.
+        self.assertEqual(len(messages), 2)
+        self.assertFalse({"bot_function", "bot_function_request"} & {message["message_type"] for message in messages})
+        # They are still part of the history sent to the LLM.
+        history = bot.with_user(user)._get_relevant_chat_history(channel)
+        self.assertEqual(sum(message["message_type"] == "bot_function" for message in history), 3)
+
+    def test_prewarmed_history_dropped_after_deletion(self):
+        user = new_test_user(self.env, login="oopo_prewarm_user", groups="base.group_user")
+        channel = user.with_user(user)._init_odoobot()
+        bot = self.env["mail.bot"].with_user(user)
+        reply = channel.message_post(body="Deco Addict has 3 open orders.", author_id=self.env.ref("base.partner_root").id, message_type="comment", subtype_xmlid="mail.mt_comment")
+        self.addCleanup(bot._drop_prewarmed_history, channel)
+
+        bot._prewarm(channel)
+        self.assertTrue(bot._pop_prewarmed_history(channel), "An untouched pre-warmed history is served")
+
+        bot._prewarm(channel)
+        reply.unlink()
+        self.assertFalse(bot._pop_prewarmed_history(channel), "A history with a deleted message is not served")
+        history = bot._get_relevant_chat_history(channel)
+        self.assertNotIn(reply.id, [message["id"] for message in history])
@@ -0,0 +1,69 @@
+import json
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase, new_test_user
+
+@tagged("post_install", "-at_install")
+class TestMailMessageTokens(TransactionCase):
+    """Token counts stored on the messages and the history window they select."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = new_test_user(cls.env, login="oopo_tokens_user", groups="base.group_user")
+        cls.odoobot = cls.env.ref("base.partner_root")
+        cls.channel = cls.user.with_user(cls.user)._init_odoobot()
+        cls.bot = cls.env["mail.bot"]
+        cls.encoding_name = cls.bot._get_encoding().name
+
+    def _post(self, body, author):
+        return self.channel.sudo().message_post(body=body, author_id=author.id, message_type="comment", subtype_xmlid="mail.mt_comment")
+
+    def _function_messages(self):
+        function_call = {"name": "read_record", "arguments": json.dumps({"model": "res.partner", "field": ["name"]})}
+        request = self.bot._create_functional_message(self.channel, {"role": "assistant", "content": None, "function_call": function_call}, "bot_function_request")
+        result = self.bot._create_functional_message(self.channel, {"role": "function", "name": "read_record", "content": "[]"}, "bot_function")
+        return request, result
+
+    def test_count_on_create(self):
+        reply = self._post("Deco Addict has 3 open orders.", self.odoobot)
+        self.assertEqual(reply.oopo_tokenizer, self.encoding_name)
+        self.assertGreater(reply.oopo_token_count, 4)
+        request, result = self._function_messages()
+        self.assertTrue(request.oopo_token_count and result.oopo_token_count)
+
+        other_channel = self.env["mail.channel"].create({"name": "Oopo General", "channel_type": "channel"})
+        message = other_channel.message_post(body="Hello there", author_id=self.odoobot.id, message_type="comment", subtype_xmlid="mail.mt_comment")
+        self.assertFalse(message.oopo_tokenizer, "Messages outside of the OdooBot chats are not counted when posted")
+
+    def test_history_within_budget(self):
+        greeting = self.env["mail.message"].search([("model", "=", "mail.channel"), ("res_id", "=", self.channel.id)])
+        question = self._post("How many orders does Deco Addict have?", self.user.partner_id)
+        request, result = self._function_messages()
+        reply = self._post("Deco Addict has 3 open orders.", self.odoobot)
+        for message, token_count in ((greeting, 100), (question, 10), (request, 50), (result, 10), (reply, 10)):
+            message.write({"oopo_token_count": token_count, "oopo_tokenizer": self.encoding_name})
+
+        self.assertEqual(self.channel._oopo_get_message_ids_within_budget(80), [question.id, request.id, result.id, reply.id])
+        # The cut falls between the function request and its result.
+        self.assertEqual(self.channel._oopo_get_message_ids_within_budget(30), [result.id, reply.id])
+
+    def test_orphan_function_result_is_dropped(self):
+        self._post("How many orders does Deco Addict have?", self.user.partner_id)
+        request, result = self._function_messages()
+        reply = self._post("Deco Addict has 3 open orders.", self.odoobot)
+        request.write({"oopo_token_count": 10000, "oopo_tokenizer": self.encoding_name})
+
+        history = self.bot.with_user(self.user)._get_relevant_chat_history(self.channel, use_prewarmed=False)
+        history_ids = [message["id"] for message in history]
+        self.assertNotIn(request.id, history_ids)
+        self.assertNotIn(result.id, history_ids, "A function result without its request must not be sent")
+        self.assertEqual(history_ids[-1], reply.id)
+
+    def test_request_reuses_stored_counts(self):
+        reply = self._post("Deco Addict has 3 open orders.", self.odoobot)
+        reply.write({"oopo_token_count": 1234})
+        history = self.bot._get_relevant_chat_history(self.channel, use_prewarmed=False)
+        messages = self.bot._build_chatgpt_request(history, {"read"})
+        self.assertEqual(messages[-1].token_count, 1234)
+        self.assertEqual(self.bot._estimate_tokens(messages[-1:]), 1234)
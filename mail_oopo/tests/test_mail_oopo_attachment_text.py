@@ -0,0 +1,39 @@
+import base64
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+from odoo.tools import mute_logger
+
+
+@tagged("post_install", "-at_install")
+class TestMailOopoAttachmentText(TransactionCase):
+
+    def test_failed_extraction_keeps_the_others(self):
+        partner = self.env["res.partner"].create({"name": "Oopo Attachment Customer"})
+        attachments = self.env["ir.attachment"].create([{
+            "name": f"oopo_contract_{index}.txt",
+            "datas": base64.b64encode(f"Oopo contract number {index} renews every year.".encode()),
+            "mimetype": "text/plain",
+            "res_model": "res.partner",
+            "res_id": partner.id,
+        } for index in range(3)])
+        text_model = self.env["mail.oopo.attachment.text"]
+        texts = text_model.create([{"checksum": attachment.checksum} for attachment in attachments])
+        broken = attachments[1]
+        extract_text = type(text_model)._extract_text
+
+        def _extract_text(text, attachment):
+            if attachment == broken:
+                raise ValueError("Corrupted file")
+            return extract_text(text, attachment)
+
+        with patch.object(type(text_model), "_extract_text", autospec=True, side_effect=_extract_text), \
+                patch.object(type(self.env.cr), "commit"), mute_logger("odoo.addons.mail_oopo.models.mail_oopo_attachment_text"):
+            text_model._cron_extract_pending()
+
+        self.assertEqual(texts.mapped("state"), ["done", "failed", "done"])
+        self.assertEqual(texts[1].error, "Corrupted file")
+        self.assertIn("Oopo contract number 2", texts[2].chunks[0])
+        self.assertEqual(set(text_model._get_texts(attachments)), {attachments[0].checksum, attachments[2].checksum})
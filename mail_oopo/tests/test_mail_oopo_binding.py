@@ -0,0 +1,35 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase, new_test_user
+
+@tagged("post_install", "-at_install")
+class TestMailOopoBinding(TransactionCase):
+    """Bound paths reaching a record of another company must not fail, nor reveal more than its display name."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        company_a = cls.env.company
+        company_b = cls.env["res.company"].create({"name": "Oopo Other Company"})
+        cls.user = new_test_user(cls.env, login="oopo_binding_user", groups="base.group_user",
+                                 company_id=company_a.id, company_ids=[(6, 0, company_a.ids)])
+        cls.other_partner = cls.env["res.partner"].create({"name": "Oopo Other Partner", "phone": "222", "company_id": company_b.id})
+        cls.own_partner = cls.env["res.partner"].create({
+            "name": "Oopo Own Partner", "phone": "111", "company_id": company_a.id, "parent_id": cls.other_partner.id,
+        })
+
+    def test_read_paths_of_another_company(self):
+        binding = self.env["mail.oopo.binding"].with_user(self.user)
+        partners = (self.own_partner | self.other_partner).with_user(self.user)
+        values = binding._read_paths(partners, ("display_name", "phone"))
+
+        self.assertEqual(values[self.own_partner.id]["phone"], "111")
+        self.assertEqual(values[self.other_partner.id]["display_name"], self.other_partner.display_name)
+        self.assertFalse(values[self.other_partner.id]["phone"])
+
+    def test_nested_path_to_another_company(self):
+        bot = self.env["mail.bot"].with_user(self.user)
+        lines = bot._format_binding_values(self.own_partner.with_user(self.user), {"res.partner": ("phone", "parent_id", "parent_id.phone")})
+        self.assertEqual(len(lines), 1)
+        self.assertIn("111", lines[0])
+        self.assertIn(self.other_partner.display_name, lines[0])
+        self.assertNotIn("222", lines[0])
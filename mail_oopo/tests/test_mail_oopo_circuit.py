@@ -0,0 +1,82 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import openai
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.mail_oopo.models import mail_oopo_circuit
+
+
+@tagged("post_install", "-at_install")
+class TestMailOopoCircuit(TransactionCase):
+    """Circuit breaker of the fake LLM backend, tripped by upstream timeouts."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env["ir.config_parameter"].sudo().set_param("mail_oopo.llm_provider", "fake")
+        cls.messages = [{"role": "user", "content": "phone number of Oopo Fake Customer"}]
+
+    def setUp(self):
+        super().setUp()
+        # The circuit is read and written on a separate cursor, which has to see the test transaction.
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        mail_oopo_circuit._closed_circuits.clear()
+        mail_oopo_circuit._pending_successes.clear()
+        self.bot = self.env["mail.bot"]
+        self.circuit_model = self.env["mail.oopo.circuit"]
+
+    def _ask(self):
+        return self.bot._get_chat_completion(self.messages, model="gpt-3.5-turbo")
+
+    def _circuit(self):
+        circuit = self.circuit_model.search([("name", "=", "fake")])
+        circuit.invalidate_recordset()
+        return circuit
+
+    def test_open_probe_and_close(self):
+        timeout = openai.error.Timeout("Request timed out")
+        with patch.object(type(self.bot), "_fake_chat_completion", side_effect=timeout) as fake_chat_completion:
+            for _attempt in range(mail_oopo_circuit.failure_threshold):
+                self.assertIn("[OpenAI Request Timeout]", self._ask())
+            self.assertEqual(self._circuit().state, "open")
+            self.assertEqual(self._circuit().consecutive_failures, mail_oopo_circuit.failure_threshold)
+
+            # While open, requests fail fast without reaching the upstream.
+            self.assertIn("paused its requests", self._ask())
+            self.assertEqual(fake_chat_completion.call_count, mail_oopo_circuit.failure_threshold)
+
+        # After the cooldown, a single request is let through as probe.
+        opened_at = fields.Datetime.now() - timedelta(seconds=mail_oopo_circuit.open_cooldown + 1)
+        self._circuit().write({"opened_at": opened_at})
+        self.assertIsNone(self.circuit_model._acquire("fake"))
+        self.assertEqual(self._circuit().state, "half_open")
+        self.assertIn("paused its requests", self._ask(), "Only one probe is in flight at a time")
+
+        # The probe succeeds and closes the circuit.
+        self.circuit_model._record_success("fake")
+        self.assertEqual(self._circuit().state, "closed")
+        self.assertFalse(self._circuit().consecutive_failures)
+        self.assertIn("This is a fake reply.", self._ask()["choices"][0]["message"]["content"])
+
+    def test_failed_probe_reopens(self):
+        self.circuit_model._lock_circuit(self.cr, "fake").write({
+            "state": "half_open",
+            "consecutive_failures": mail_oopo_circuit.failure_threshold,
+            "probe_started_at": fields.Datetime.now(),
+        })
+        self.circuit_model._record_failure("Request timed out", "fake")
+        self.assertEqual(self._circuit().state, "open")
+
+    def test_healthy_path_takes_no_cursor(self):
+        self.assertIsNone(self.circuit_model._acquire("fake"))
+        self.circuit_model._record_success("fake")
+        with patch.object(type(self.registry), "cursor", side_effect=AssertionError("a side cursor was opened")):
+            for _question in range(3):
+                self.assertIsNone(self.circuit_model._acquire("fake"))
+                self.circuit_model._record_success("fake")
+        self.assertEqual(mail_oopo_circuit._pending_successes["fake"], 4)
@@ -0,0 +1,65 @@
+import json
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase, new_test_user
+
+
+@tagged("post_install", "-at_install")
+class TestMailOopoSkill(TransactionCase):
+    """Skills recorded from a conversation on the fake LLM backend, then replayed."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env["ir.config_parameter"].sudo().set_param("mail_oopo.llm_provider", "fake")
+        cls.user = new_test_user(cls.env, login="oopo_skill_user", groups="base.group_user")
+        cls.partner = cls.env["res.partner"].create({"name": "Oopo Skill Customer"})
+        cls.other_partner = cls.env["res.partner"].create({"name": "Oopo Skill Prospect"})
+
+    def setUp(self):
+        super().setUp()
+        # Reads run on a separate cursor, which has to see the records of the test transaction.
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        self.channel = self.user.with_user(self.user)._init_odoobot()
+
+    def test_boolean_slot_values(self):
+        skill = self.env["mail.oopo.skill"].create({
+            "name": "Archive Customer",
+            "description": "Archive a customer",
+            "slot_ids": [(0, 0, {"name": "archive", "slot_type": "boolean"})],
+        })
+        for value, expected in (("false", False), ("False", False), ("0", False), (0, False), ("true", True), ("1", True), (True, True)):
+            self.assertIs(skill._get_slot_values({"archive": value})["archive"], expected, f"{value!r} should be {expected}")
+        with self.assertRaises(ValueError):
+            skill._get_slot_values({"archive": "maybe"})
+
+    def test_record_and_replay(self):
+        read_arguments = {"model": "res.partner", "field": ["name", "write_date"], "search_domains": [["name", "=", "Oopo Skill Customer"]], "limit": 1}
+        update_arguments = {"model": "res.partner", "field": ["name"], "field_to_update": [{"phone": "+32 2 555 00 00"}], "search_domains": [["id", "=", self.partner.id]]}
+        fake_responses = [
+            {"content": "read res.partner, then update it\nOPERATIONS: read, update"},
+            {"function_call": {"name": "read_record", "arguments": json.dumps(read_arguments)}},
+            {"function_call": {"name": "update_record", "arguments": json.dumps(update_arguments)}},
+            {"content": "The phone number of Oopo Skill Customer was updated."},
+        ]
+        self.channel.with_user(self.user).with_context(oopo_fake_responses=fake_responses).message_post(
+            body="set the phone of Oopo Skill Customer to +32 2 555 00 00", message_type="comment", subtype_xmlid="mail.mt_comment",
+        )
+        self.partner.invalidate_recordset(["phone"])
+        self.assertEqual(self.partner.phone, "+32 2 555 00 00")
+        reply = self.env["mail.message"].search([("model", "=", "mail.channel"), ("res_id", "=", self.channel.id)], order="id desc", limit=1)
+
+        # The read result holds a datetime, its id is still found to link the update to the read.
+        skill = self.env["mail.oopo.skill"]._create_from_message(reply)
+        self.assertEqual(skill.slot_ids.mapped("name"), ["partner_name"])
+        steps = json.loads(skill.steps)
+        self.assertEqual([step["function"] for step in steps], ["read_record", "update_record"])
+        self.assertEqual(steps[0]["arguments"]["search_domains"], [["name", "=", "{{partner_name}}"]])
+        self.assertEqual(steps[1]["arguments"]["search_domains"], [["id", "=", "{{step1.0.id}}"]])
+
+        result = self.env["mail.bot"].with_user(self.user)._run_skill(skill, partner_name="Oopo Skill Prospect")
+        self.other_partner.invalidate_recordset(["phone"])
+        self.assertEqual(self.other_partner.phone, "+32 2 555 00 00")
+        self.assertEqual(result[0]["result"][0]["id"], self.other_partner.id)
+        self.assertTrue(json.loads(self.env["mail.bot"]._serialize_function_result(result)))
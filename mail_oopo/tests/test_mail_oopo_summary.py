@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+@tagged("post_install", "-at_install")
+class TestMailOopoSummary(TransactionCase):
+    """Chatter summaries on the fake LLM backend, with an attachment whose text is already extracted."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env["ir.config_parameter"].sudo().set_param("mail_oopo.llm_provider", "fake")
+        cls.partner = cls.env["res.partner"].create({"name": "Oopo Summary Customer"})
+        attachment = cls.env["ir.attachment"].create({
+            "name": "contract.txt",
+            "raw": b"The contract renews every year in March.\n\nPayment terms are 30 days.",
+            "mimetype": "text/plain",
+            "res_model": "res.partner",
+            "res_id": cls.partner.id,
+        })
+        text = cls.env["mail.oopo.attachment.text"].create({"checksum": attachment.checksum})
+        text._store_text(attachment.raw.decode())
+
+    def setUp(self):
+        super().setUp()
+        # The circuit breaker runs on a separate cursor, which has to see the records of the test transaction.
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+
+    def test_unchanged_record_is_served_from_cache(self):
+        bot = self.env["mail.bot"].with_context(oopo_fake_responses=[{"content": "Oopo summary"}])
+        summary, _message_type = bot._process_query_in_chatter(self.partner, "<p>when does the contract renew?</p>")
+        self.assertEqual(summary, "Oopo summary")
+
+        bot_class = type(self.env["mail.bot"])
+        with patch.object(bot_class, "_llm_chat_completion", side_effect=AssertionError("No LLM call expected on a cache hit")), \
+                patch.object(bot_class, "_get_encoding", side_effect=AssertionError("No tokenization expected on a cache hit")):
+            summary, _message_type = bot._process_query_in_chatter(self.partner, "<p>when does the contract renew?</p>")
+        self.assertEqual(summary, "Oopo summary")
@@ -0,0 +1,41 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase, new_test_user
+
+from odoo.addons.mail_oopo.wizard.mail_oopo_summary_wizard import summary_batch_size
+
+@tagged("post_install", "-at_install")
+class TestMailOopoSummaryWizard(TransactionCase):
+    """Bulk summaries on the fake LLM backend, one batch at a time as the cron runs them."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env["ir.config_parameter"].sudo().set_param("mail_oopo.llm_provider", "fake")
+        cls.user = new_test_user(cls.env, login="oopo_bulk_user", groups="base.group_user,base.group_partner_manager")
+        cls.partners = cls.env["res.partner"].with_context(mail_create_nolog=True).create([{"name": f"Oopo Bulk Customer {index}"} for index in range(summary_batch_size + 5)])
+
+    def setUp(self):
+        super().setUp()
+        # The circuit breaker runs on a separate cursor, which has to see the records of the test transaction.
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+
+    def test_summaries_posted_in_batches(self):
+        wizard = self.env["mail.oopo.summary.wizard"].with_user(self.user).with_context(
+            active_model="res.partner", active_ids=self.partners.ids,
+        ).create({"output": "chatter"})
+        wizard.action_summarize()
+        self.assertEqual(wizard.state, "queued")
+
+        wizard._summarize_next_batch()
+        self.assertEqual(wizard.state, "queued")
+        self.assertEqual(len(wizard.summaries), summary_batch_size)
+
+        wizard._summarize_next_batch()
+        self.assertEqual(wizard.state, "done")
+        self.assertEqual(set(wizard.summaries), {str(partner_id) for partner_id in self.partners.ids})
+
+        odoobot = self.env.ref("base.partner_root")
+        for partner in self.partners:
+            notes = partner.message_ids.filtered(lambda message: message.author_id == odoobot and "This is a fake reply." in message.body)
+            self.assertEqual(len(notes), 1, "Every record gets exactly one summary note")
@@ -0,0 +1 @@
+from . import mail_oopo_summary_wizard
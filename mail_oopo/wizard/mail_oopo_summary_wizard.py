@@ -0,0 +1,187 @@
+import functools
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from markupsafe import Markup, escape
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+from ..models.mail_bot import send_chat_completion
+
+_logger = logging.getLogger(__name__)
+
+# Records summarized, and committed, per cron run.
+summary_batch_size = 20
+
+class MailOopoSummaryWizard(models.TransientModel):
+    _name = "mail.oopo.summary.wizard"
+    _description = "Oopo Bulk Summary"
+    # Queued wizards are processed by a cron, and their report opened afterwards.
+    _transient_max_hours = 24.0
+
+    res_model = fields.Char(string="Related Document Model", required=True, readonly=True)
+    res_ids = fields.Json(string="Related Document IDs", readonly=True)
+    record_count = fields.Integer(string="Records", compute="_compute_record_count")
+    output = fields.Selection([
+        ("chatter", "Post as Chatter Notes"),
+        ("report", "Show as Report"),
+    ], string="Output", required=True, default="chatter")
+    report = fields.Html(string="Report", readonly=True, sanitize=False)
+    summaries = fields.Json(string="Summaries", readonly=True, help="Summaries done so far, keyed by record id")
+    state = fields.Selection([("draft", "Draft"), ("queued", "Queued"), ("done", "Done"), ("failed", "Failed")], default="draft")
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        res_model = self.env.context.get("active_model")
+        res_ids = self.env.context.get("active_ids")
+        if res_model and res_ids:
+            res.update({"res_model": res_model, "res_ids": res_ids})
+        return res
+
+    @api.depends("res_ids")
+    def _compute_record_count(self):
+        for wizard in self:
+            wizard.record_count = len(wizard.res_ids or [])
+
+    def action_summarize(self):
+        """Queue the summaries, they are requested by a cron in batches committed one after the other."""
+        self.ensure_one()
+        api_key = self.env["ir.config_parameter"].sudo().get_param("mail_oopo.openapi_api_key")
+        if not api_key and self.env["mail.bot"]._get_llm_provider() == "openai":
+            raise UserError(_("Please set the OpenAI API key in the settings under integrations"))
+        if self.output == "chatter" and "message_post" not in self.env[self.res_model]:
+            raise UserError(_("The model %s has no chatter, please choose the report output instead.", self.res_model))
+
+        records = self.env[self.res_model].browse(self.res_ids or []).exists()
+        records.check_access_rights("read")
+        records.check_access_rule("read")
+        self.write({"res_ids": records.ids, "summaries": {}, "state": "queued"})
+        self.env.ref("mail_oopo.ir_cron_summary_wizard")._trigger()
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "type": "info",
+                "message": _("Oopo is summarizing %s records, you will be notified when it is done.", len(records)),
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
+
+    @api.model
+    def _cron_summarize(self):
+        """Summarize the next batch of every queued wizard, as the user who queued it."""
+        for wizard in self.search([("state", "=", "queued")], order="id"):
+            user = wizard.create_uid
+            wizard = wizard.with_user(user).with_context(lang=user.lang)
+            try:
+                with self.env.cr.savepoint():
+                    wizard._summarize_next_batch()
+            except Exception as e:
+                _logger.exception("Bulk summary %s failed", wizard.id)
+                wizard.write({"state": "failed", "report": escape(str(e))})
+                wizard._notify_progress()
+            self.env.cr.commit()
+        if self.search_count([("state", "=", "queued")]):
+            self.env.ref("mail_oopo.ir_cron_summary_wizard")._trigger()
+
+    def _summarize_next_batch(self):
+        self.ensure_one()
+        summaries = dict(self.summaries or {})
+        remaining_ids = [res_id for res_id in self.res_ids or [] if str(res_id) not in summaries]
+        batch_ids = remaining_ids[:summary_batch_size]
+        records = self.env[self.res_model].browse(batch_ids).exists()
+        batch_summaries = self._summarize_records(records)
+        if self.output == "chatter":
+            self._post_summaries(records, batch_summaries)
+        # Deleted records are marked as done too, with no summary.
+        summaries.update({str(res_id): batch_summaries.get(res_id) for res_id in batch_ids})
+
+        values = {"summaries": summaries}
+        if len(remaining_ids) <= summary_batch_size:
+            values["state"] = "done"
+            if self.output == "report":
+                all_records = self.env[self.res_model].browse([int(res_id) for res_id, summary in summaries.items() if summary is not None]).exists()
+                values["report"] = self._render_report(all_records, {record.id: summaries[str(record.id)] for record in all_records})
+        self.write(values)
+        self._notify_progress()
+
+    def _summarize_records(self, records):
+        """Build and route every request in this thread with batched prefetching, then send them to the LLM
+        ``mail_oopo.summary_concurrency`` at a time. Worker threads only run the plain HTTP calls of
+        ``send_chat_completion``, the environment and its cursor never leave this thread."""
+        bot = self.env["mail.bot"].with_context(oopo_task="read")
+        summary_cache = self.env["mail.oopo.summary"].sudo()
+        fields_metadata = records.fields_get()
+        relational_bindings = self.env["mail.oopo.binding"]._get_relational_bindings()
+        binding_values = bot._read_summary_bindings(records, fields_metadata, relational_bindings)
+
+        summaries, requests = {}, []
+        for record in records:
+            summary, msgs, cache_values = bot._prepare_summary_request(record, fields_metadata, binding_values)
+            if summary is not None:
+                summaries[record.id] = summary
+                continue
+            circuit_message = bot._acquire_circuit()
+            if circuit_message:
+                summaries[record.id] = circuit_message
+                continue
+            candidate_params = [bot._get_chat_completion_params(model, msgs) for model in bot._route_model(msgs)]
+            requests.append((record, cache_values, candidate_params))
+
+        concurrency = max(int(self.env["ir.config_parameter"].sudo().get_param("mail_oopo.summary_concurrency", 4) or 1), 1)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            if bot._get_llm_provider() == "fake":
+                # The offline backend reads the environment, it runs in this thread.
+                sends = [functools.partial(send_chat_completion, candidate_params, bot._llm_chat_completion) for _record, _cache_values, candidate_params in requests]
+            else:
+                sends = [executor.submit(send_chat_completion, candidate_params).result for _record, _cache_values, candidate_params in requests]
+            for (record, cache_values, _candidate_params), send in zip(requests, sends):
+                response = bot._finish_chat_completion(send)
+                if isinstance(response, str):
+                    summaries[record.id] = response
+                    continue
+                summary = response["choices"][0]["message"]["content"]
+                summary_cache._store(record, *cache_values, summary)
+                summaries[record.id] = summary
+        return summaries
+
+    def _notify_progress(self):
+        self.ensure_one()
+        self.env["bus.bus"]._sendone(self.env.user.partner_id, "mail_oopo/summary_progress", {
+            "id": self.id,
+            "res_model": self.res_model,
+            "output": self.output,
+            "state": self.state,
+            "done": len(self.summaries or {}),
+            "total": len(self.res_ids or []),
+        })
+
+    def _post_summaries(self, records, summaries):
+        odoobot_id = self.env["ir.model.data"]._xmlid_to_res_id("base.partner_root")
+        for record in records:
+            record.with_context(mail_create_nosubscribe=True).sudo().message_post(
+                body=summaries[record.id], author_id=odoobot_id, message_type="comment", subtype_xmlid="mail.mt_note")
+
+    def _render_report(self, records, summaries):
+        sections = [
+            Markup("<h3>%s</h3><p>%s</p>") % (record.display_name, summaries[record.id])
+            for record in records
+        ]
+        return Markup("").join(sections) or escape(_("No record to summarize."))
+
+    @api.model
+    def _update_bindings(self, models_to_bind):
+        """Add the "Summarize with Oopo" action to the action menu of the given ``ir.model`` records only."""
+        actions = self.env["ir.actions.act_window"].sudo().search([("res_model", "=", self._name), ("binding_model_id", "!=", False)])
+        actions.filtered(lambda action: action.binding_model_id not in models_to_bind).unlink()
+        for model in models_to_bind - actions.binding_model_id:
+            actions.create({
+                "name": _("Summarize with Oopo"),
+                "res_model": self._name,
+                "view_mode": "form",
+                "target": "new",
+                "binding_model_id": model.id,
+                "binding_view_types": "list",
+            })
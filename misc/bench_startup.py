@@ -0,0 +1,57 @@
+"""Measure the registry load time of an Odoo database with and without mail_oopo installed.
+
+Each measurement runs in a fresh Python process, as a recycled worker would:
+
+    python bench_startup.py --odoo-path ~/odoo --addons-path ~/odoo/addons,~/custom \
+        --db-with ogpt --db-without ogpt_no_oopo --repeat 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+measure_script = """
+import sys, time, json
+sys.path.insert(0, {odoo_path!r})
+start = time.perf_counter()
+import odoo
+from odoo.modules.registry import Registry
+odoo.tools.config.parse_config(["--addons-path", {addons_path!r}] + {extra_args!r})
+imported = time.perf_counter()
+Registry.new({db!r})
+loaded = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "registry": loaded - imported,
+    "modules": sorted(name for name in sys.modules if name.split(".")[0] in ("openai", "tiktoken")),
+}}))
+"""
+
+
+def measure(args, db):
+    script = measure_script.format(odoo_path=args.odoo_path, addons_path=args.addons_path, extra_args=args.odoo_args, db=db)
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--odoo-path", required=True, help="Directory containing the odoo package")
+    parser.add_argument("--addons-path", required=True)
+    parser.add_argument("--db-with", required=True, help="Database with mail_oopo installed")
+    parser.add_argument("--db-without", required=True, help="Same database without mail_oopo")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("odoo_args", nargs="*", help="Extra Odoo options, e.g. --db_host=localhost")
+    args = parser.parse_args()
+
+    for label, db in (("with mail_oopo", args.db_with), ("without mail_oopo", args.db_without)):
+        results = [measure(args, db) for _ in range(args.repeat)]
+        registry_times = [result["registry"] for result in results]
+        print("\033[92m" + f"{label} ({db}): registry load median {statistics.median(registry_times):.3f}s, "
+              f"min {min(registry_times):.3f}s, max {max(registry_times):.3f}s" + "\033[0m")
+        print(f"    heavy modules imported at boot: {results[-1]['modules'] or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
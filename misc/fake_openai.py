@@ -0,0 +1,121 @@
+"""Local fake of the OpenAI ChatCompletion and Moderation endpoints, for load tests of the bot pipeline.
+
+Point the add-on to it with the ``mail_oopo.openai_api_base`` system parameter, e.g. http://localhost:8765/v1.
+
+A function-call script is a JSON file listing the replies of one question, in order:
+
+    {"steps": [
+        {"function_call": {"name": "read_record", "arguments": {"model": "res.partner", "field": ["name"], "limit": 3}}},
+        {"content": "Here are your three partners."}
+    ]}
+
+The step replied is the number of function results since the last user message, so each question replays the script.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+default_script = {
+    "steps": [
+        {"function_call": {"name": "read_record", "arguments": {"model": "res.partner", "field": ["name"], "limit": 3}}},
+        {"content": "Here are your three partners."},
+    ]
+}
+# The chain-of-thought request of ``_pre_prompt`` is answered with a plain plan instead of a script step.
+pre_prompt_marker = "Instructions while running a query"
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.server.latency()
+        if self.path.endswith("/moderations"):
+            response = {"id": f"modr-{uuid.uuid4().hex}", "results": [{"flagged": False}]}
+        elif self.path.endswith("/chat/completions"):
+            response = self.server.chat_completion(payload)
+        else:
+            self.send_error(404)
+            return
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, script, latency, jitter, verbose=False):
+        super().__init__(address, FakeOpenAIHandler)
+        self.script = script
+        self.mean_latency = latency
+        self.jitter = jitter
+        self.verbose = verbose
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    def latency(self):
+        with self.lock:
+            self.request_count += 1
+        time.sleep(max(0.0, random.gauss(self.mean_latency, self.jitter)))
+
+    def chat_completion(self, payload):
+        messages = payload.get("messages", [])
+        last_user_index = max((index for index, message in enumerate(messages) if message.get("role") == "user"), default=-1)
+        if last_user_index >= 0 and pre_prompt_marker in (messages[last_user_index].get("content") or ""):
+            message = {"role": "assistant", "content": "Read operation on res.partner.\nOPERATIONS: read"}
+        else:
+            step_index = sum(1 for message in messages[last_user_index + 1:] if message.get("role") == "function")
+            steps = self.script["steps"]
+            step = steps[min(step_index, len(steps) - 1)]
+            message = {"role": "assistant", "content": step.get("content")}
+            if "function_call" in step:
+                message["function_call"] = {
+                    "name": step["function_call"]["name"],
+                    "arguments": json.dumps(step["function_call"]["arguments"]),
+                }
+        prompt_tokens = len(json.dumps(messages)) // 4
+        completion_tokens = len(json.dumps(message)) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "function_call" if "function_call" in message else "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="Mean latency of each reply, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Standard deviation of the latency, in seconds")
+    parser.add_argument("--script", help="JSON function-call script, defaults to one read_record then an answer")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    script = default_script
+    if args.script:
+        with open(args.script) as script_file:
+            script = json.load(script_file)
+    server = FakeOpenAIServer((args.host, args.port), script, args.latency, args.jitter, args.verbose)
+    print("\033[92m" + f"Fake OpenAI server listening on http://{args.host}:{args.port}/v1" + "\033[0m")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Concurrent multi-user load test of the bot pipeline.
+
+N simulated users each post questions to their OdooBot chat through ``mail.channel.message_post`` over XML-RPC.
+The bot replies within the same request, so the RPC duration is the reply latency. Run it against a local instance
+whose ``mail_oopo.openai_api_base`` points to ``fake_openai.py``, which this script sets up:
+
+    python fake_openai.py --latency 1.5 &
+    python load_test.py --url http://localhost:8069 --db ogpt --users 20 --questions 5 \
+        --fake-openai http://localhost:8765/v1 --pg-dsn "dbname=ogpt user=odoo" --workers 8
+"""
+import argparse
+import statistics
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+default_questions = [
+    "What are my top 3 sales orders?",
+    "What is the address of Marc Demo",
+    "Who are my three latest customers?",
+]
+
+
+class OdooClient:
+    """XML-RPC client of one user. ServerProxy objects are not thread-safe, so each simulated user owns one."""
+
+    def __init__(self, url, db, login, password):
+        self.db, self.password = db, password
+        common = xmlrpc.client.ServerProxy(f"{url}/xmlrpc/2/common")
+        self.uid = common.authenticate(db, login, password, {})
+        if not self.uid:
+            raise RuntimeError(f"Authentication failed for {login}")
+        self.models = xmlrpc.client.ServerProxy(f"{url}/xmlrpc/2/object", allow_none=True)
+
+    def execute(self, model, method, *args, **kwargs):
+        return self.models.execute_kw(self.db, self.uid, self.password, model, method, list(args), kwargs)
+
+
+def setup(args):
+    """Create the simulated users and their OdooBot chats, and point the bot to the fake OpenAI server."""
+    admin = OdooClient(args.url, args.db, args.admin_login, args.admin_password)
+    if args.fake_openai:
+        admin.execute("ir.config_parameter", "set_param", "mail_oopo.openai_api_base", args.fake_openai)
+        admin.execute("ir.config_parameter", "set_param", "mail_oopo.llm_provider", "openai_compatible")
+        admin.execute("ir.config_parameter", "set_param", "mail_oopo.openapi_api_key", "sk-load-test")
+    odoobot_partner_id = admin.execute("ir.model.data", "search_read", [("module", "=", "base"), ("name", "=", "partner_root")], fields=["res_id"])[0]["res_id"]
+    group_user_id = admin.execute("ir.model.data", "search_read", [("module", "=", "base"), ("name", "=", "group_user")], fields=["res_id"])[0]["res_id"]
+
+    users = []
+    for index in range(args.users):
+        login = f"{args.login_prefix}{index}"
+        if not admin.execute("res.users", "search", [("login", "=", login)]):
+            admin.execute("res.users", "create", {
+                "name": f"Load Test {index}",
+                "login": login,
+                "password": args.user_password,
+                "groups_id": [(6, 0, [group_user_id])],
+                "oopo_state": "idle",
+            })
+        client = OdooClient(args.url, args.db, login, args.user_password)
+        partner_id = client.execute("res.users", "read", [client.uid], fields=["partner_id"])[0]["partner_id"][0]
+        channel = client.execute("mail.channel", "channel_get", partners_to=[odoobot_partner_id, partner_id])
+        users.append((client, channel["id"]))
+    return users
+
+
+class DatabaseMonitor(threading.Thread):
+    """Sample pg_stat_activity while the test runs: busy Odoo backends, connections and lock waits."""
+
+    def __init__(self, dsn, interval=0.5):
+        super().__init__(daemon=True)
+        self.dsn, self.interval = dsn, interval
+        self.samples = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            while not self.stop_event.is_set():
+                cursor.execute("""
+                    SELECT count(*),
+                           count(*) FILTER (WHERE state = 'active'),
+                           count(DISTINCT application_name) FILTER (WHERE state = 'active' AND application_name LIKE 'odoo-%%'),
+                           count(*) FILTER (WHERE wait_event_type = 'Lock')
+                      FROM pg_stat_activity
+                     WHERE datname = current_database() AND pid != pg_backend_pid()
+                """)
+                self.samples.append(cursor.fetchone())
+                self.stop_event.wait(self.interval)
+        conn.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+def run_user(client, channel_id, questions, count):
+    latencies, errors = [], 0
+    for index in range(count):
+        start = time.perf_counter()
+        try:
+            client.execute("mail.channel", "message_post", [channel_id],
+                           body=questions[index % len(questions)], message_type="comment", subtype_xmlid="mail.mt_comment")
+        except (xmlrpc.client.Fault, OSError):
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+def report(args, latencies, errors, duration, monitor):
+    print("\033[92m" + f"{args.users} users x {args.questions} questions in {duration:.1f}s" + "\033[0m")
+    print(f"    throughput: {len(latencies) / duration:.2f} replies/s, errors: {errors}")
+    if latencies:
+        print(f"    reply latency: mean {statistics.mean(latencies):.2f}s, p50 {percentile(latencies, 50):.2f}s, "
+              f"p90 {percentile(latencies, 90):.2f}s, p99 {percentile(latencies, 99):.2f}s, max {max(latencies):.2f}s")
+    if monitor and monitor.samples:
+        connections, active, busy_workers, lock_waits = zip(*monitor.samples)
+        print(f"    db connections: mean {statistics.mean(connections):.1f}, max {max(connections)}; "
+              f"active queries: mean {statistics.mean(active):.1f}, max {max(active)}")
+        occupancy = f" ({statistics.mean(busy_workers) / args.workers:.0%} of {args.workers})" if args.workers else ""
+        print(f"    busy workers: mean {statistics.mean(busy_workers):.1f}{occupancy}, max {max(busy_workers)}")
+        print(f"    lock waits: max {max(lock_waits)}, sampled in {sum(1 for waits in lock_waits if waits) / len(lock_waits):.0%} of samples")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8069")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--admin-login", default="admin")
+    parser.add_argument("--admin-password", default="admin")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--questions", type=int, default=5, help="Questions asked by each user")
+    parser.add_argument("--login-prefix", default="oopo_load_")
+    parser.add_argument("--user-password", default="oopo_load")
+    parser.add_argument("--fake-openai", help="Base URL of fake_openai.py, e.g. http://localhost:8765/v1")
+    parser.add_argument("--pg-dsn", help="DSN of the Odoo database, to sample connections and lock waits")
+    parser.add_argument("--workers", type=int, default=0, help="Number of Odoo HTTP workers, to report their occupancy")
+    args = parser.parse_args()
+
+    users = setup(args)
+    monitor = None
+    if args.pg_dsn:
+        if psycopg2 is None:
+            parser.error("--pg-dsn requires psycopg2")
+        monitor = DatabaseMonitor(args.pg_dsn)
+        monitor.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(users)) as executor:
+        results = list(executor.map(lambda user: run_user(user[0], user[1], default_questions, args.questions), users))
+    duration = time.perf_counter() - start
+    if monitor:
+        monitor.stop()
+
+    latencies = [latency for user_latencies, _errors in results for latency in user_latencies]
+    errors = sum(user_errors for _latencies, user_errors in results)
+    report(args, latencies, errors, duration, monitor)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class OdooRPCError(Exception):
+    pass
+
+
+class OdooClient:
+    """JSON-RPC client of an Odoo instance for running the bot outside of the Odoo workers.
+
+    It authenticates once and then only sends the session cookie, over a keep-alive connection pool.
+    ``fields_get`` results are cached per model, and ``execute_concurrently`` runs several calls in parallel threads.
+    """
+
+    def __init__(self, url, db, login, password, pool_size=8):
+        self.url = url.rstrip("/")
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._request_ids = itertools.count()
+        self._fields_cache = {}
+        self._fields_lock = threading.Lock()
+        self.uid = self._call("/web/session/authenticate", {"db": db, "login": login, "password": password})["uid"]
+
+    def _call(self, path, params):
+        payload = {"jsonrpc": "2.0", "method": "call", "params": params, "id": next(self._request_ids)}
+        response = self.session.post(self.url + path, json=payload, timeout=120)
+        response.raise_for_status()
+        result = response.json()
+        if "error" in result:
+            error = result["error"]
+            raise OdooRPCError(error.get("data", {}).get("message") or error.get("message"))
+        return result["result"]
+
+    def execute(self, model, method, *args, **kwargs):
+        return self._call("/web/dataset/call_kw", {"model": model, "method": method, "args": list(args), "kwargs": kwargs})
+
+    def execute_concurrently(self, calls):
+        """Run ``[(model, method, args, kwargs), ...]`` concurrently over the pooled connections, one RPC per call.
+        Each result is either the returned value or the raised exception."""
+        def run(call):
+            model, method, args, kwargs = call
+            try:
+                return self.execute(model, method, *args, **kwargs)
+            except (OdooRPCError, requests.RequestException) as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, max(len(calls), 1))) as executor:
+            return list(executor.map(run, calls))
+
+    def fields_get(self, model):
+        with self._fields_lock:
+            if model not in self._fields_cache:
+                self._fields_cache[model] = self.execute(model, "fields_get", attributes=["string", "type", "relation"])
+            return self._fields_cache[model]
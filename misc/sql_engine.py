@@ -0,0 +1,184 @@
+import json
+import re
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool, sql
+
+
+class QueryRejected(Exception):
+    """Raised when a generated query is refused before running, e.g. because its planned cost is too high."""
+
+
+class SQLEngine:
+    """Read-only query engine for the text-to-SQL bot.
+
+    Every query runs on a pooled connection, inside a read-only transaction bounded by ``statement_timeout``.
+    Generated queries are first checked with ``EXPLAIN`` and rejected when their planned cost exceeds ``max_cost``,
+    then streamed through a server-side cursor so that at most ``max_rows`` rows are ever fetched.
+    """
+
+    def __init__(self, minconn=1, maxconn=5, statement_timeout=5000, max_rows=200, max_cost=1000000, **connect_kwargs):
+        # Every transaction of the session is read-only, including one started after a COMMIT smuggled into a query.
+        connect_kwargs["options"] = " ".join(filter(None, [connect_kwargs.get("options"), "-c default_transaction_read_only=on"]))
+        self.pool = pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self.statement_timeout = statement_timeout
+        self.max_rows = max_rows
+        self.max_cost = max_cost
+        self._model_fields_cache = {}
+
+    def close(self):
+        self.pool.closeall()
+
+    @contextmanager
+    def connection(self):
+        conn = self.pool.getconn()
+        try:
+            conn.set_session(readonly=True, autocommit=False)
+            with conn.cursor() as cursor:
+                # SET LOCAL only lasts for the current transaction, which is always rolled back below.
+                cursor.execute("SET LOCAL statement_timeout = %s", (self.statement_timeout,))
+            yield conn
+        finally:
+            conn.rollback()
+            self.pool.putconn(conn)
+
+    def execute(self, query, params=None):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def explain_cost(self, conn, query):
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("EXPLAIN (FORMAT JSON) ") + sql.SQL(query))
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return plan[0]["Plan"]["Total Cost"]
+
+    @staticmethod
+    def check_single_statement(query):
+        """Raise ``QueryRejected`` unless ``query`` is a single statement, a trailing semicolon aside.
+        Semicolons inside string literals, quoted identifiers, dollar-quoted strings and comments are ignored."""
+        index, length = 0, len(query)
+        statement_end = None
+        while index < length:
+            char = query[index]
+            if char in ("'", '"'):
+                index = query.find(char, index + 1)
+                while index != -1 and query[index + 1:index + 2] == char:
+                    # doubled quote inside the literal
+                    index = query.find(char, index + 2)
+                if index == -1:
+                    break
+            elif query.startswith("--", index):
+                index = query.find("\n", index)
+                if index == -1:
+                    break
+            elif query.startswith("/*", index):
+                index = query.find("*/", index + 2)
+                if index == -1:
+                    break
+                index += 1
+            elif char == "$":
+                match = re.match(r"\$([A-Za-z_][A-Za-z0-9_]*)?\$", query[index:])
+                if match:
+                    index = query.find(match.group(0), index + len(match.group(0)))
+                    if index == -1:
+                        break
+                    index += len(match.group(0)) - 1
+            elif char == ";":
+                statement_end = index
+            elif statement_end is not None and not char.isspace():
+                raise QueryRejected("Query rejected: only a single SQL statement is allowed.")
+            index += 1
+
+    def ask_database(self, query):
+        """Run a model-generated query, returning at most ``max_rows`` rows or the error message as a string."""
+        try:
+            self.check_single_statement(query)
+            with self.connection() as conn:
+                cost = self.explain_cost(conn, query)
+                if cost > self.max_cost:
+                    raise QueryRejected(f"Query rejected: estimated cost {cost} exceeds {self.max_cost}. "
+                                        "Add filters or a LIMIT to the query.")
+                with conn.cursor(name="oopo_ask_database") as cursor:
+                    cursor.itersize = self.max_rows
+                    cursor.execute(query)
+                    rows = cursor.fetchmany(self.max_rows + 1)
+        except (psycopg2.Error, QueryRejected) as e:
+            return str(e)
+
+        if len(rows) > self.max_rows:
+            return rows[:self.max_rows] + [f"... truncated after {self.max_rows} rows"]
+        return rows
+
+    def read_id(self, model, id, fields):
+        query = sql.SQL("SELECT {fields} FROM {table} WHERE id = %s").format(
+            fields=sql.SQL(",").join(map(sql.Identifier, fields)),
+            table=sql.Identifier(model.replace(".", "_")),
+        )
+        return self.execute(query, (id,))
+
+    def get_table_names(self):
+        rows = self.execute("SELECT table_name FROM information_schema.tables WHERE table_schema='public' AND table_type='BASE TABLE';")
+        return [row[0] for row in rows]
+
+    def get_column_names(self, table_name):
+        rows = self.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s", (table_name,))
+        return [row[0] for row in rows]
+
+    def get_foreign_key_relations(self, table_name):
+        return self.execute("""
+            SELECT
+                conname AS constraint_name,
+                att2.attname AS column_name,
+                cl.relname AS referenced_table,
+                att.attname AS referenced_column
+            FROM
+                pg_constraint AS con
+                JOIN pg_class AS cl ON con.confrelid = cl.oid
+                JOIN pg_attribute AS att ON con.confrelid = att.attrelid AND con.confkey[1] = att.attnum
+                JOIN pg_attribute AS att2 ON con.conrelid = att2.attrelid AND con.conkey[1] = att2.attnum
+            WHERE
+                con.conrelid = (SELECT oid FROM pg_class WHERE relname = %s)
+                AND contype = 'f'
+        """, (table_name,))
+
+    def get_model_cols(self, list_of_models):
+        """Fetch the fields of all uncached models with a single query, returning ``{model: csv}``."""
+        missing_models = [model for model in list_of_models if model not in self._model_fields_cache]
+        if missing_models:
+            rows = self.execute("""
+                SELECT
+                    model.model AS model_name,
+                    field_description.name AS field_name,
+                    field_description.field_description AS field_description,
+                    field_description.ttype AS field_type,
+                    field_description.relation AS relation
+                FROM
+                    ir_model AS model
+                JOIN
+                    ir_model_fields AS field_description
+                    ON model.id = field_description.model_id
+                WHERE
+                    model.model = ANY(%s)
+                ORDER BY
+                    model.model, field_description.name
+            """, (missing_models,))
+
+            lines = {model: ["column_name,description,type,related_model"] for model in missing_models}
+            for model_name, field_name, description, field_type, relation in rows:
+                lines[model_name].append(",".join([field_name, description["en_US"], field_type, str(relation)]))
+            for model, model_lines in lines.items():
+                self._model_fields_cache[model] = "\n".join(model_lines) + "\n"
+
+        return {model: self._model_fields_cache[model] for model in list_of_models}
+
+    def get_model_fields(self, list_of_models):
+        model_cols = self.get_model_cols(list_of_models)
+        database_info = [
+            {"table_name": model.replace(".", "_"), "column_names": column_names}
+            for model, column_names in model_cols.items()
+        ]
+        return json.dumps(database_info)
@@ -0,0 +1,81 @@
+"""Checks of the read-only guarantees of ``SQLEngine`` against a local PostgreSQL.
+
+    cd misc && OOPO_TEST_DSN="dbname=postgres user=postgres" python -m pytest test_sql_engine.py
+"""
+import os
+import unittest
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from sql_engine import QueryRejected, SQLEngine  # noqa: E402
+
+dsn = os.environ.get("OOPO_TEST_DSN", "dbname=postgres")
+
+
+def setUpModule():
+    try:
+        psycopg2.connect(dsn).close()
+    except psycopg2.OperationalError as e:
+        raise unittest.SkipTest(f"No PostgreSQL reachable with {dsn!r}: {e}")
+
+
+class TestSQLEngine(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.admin = psycopg2.connect(dsn)
+        cls.admin.autocommit = True
+        with cls.admin.cursor() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS oopo_sql_engine_test (id serial PRIMARY KEY, name varchar)")
+            cursor.execute("TRUNCATE oopo_sql_engine_test")
+            cursor.execute("INSERT INTO oopo_sql_engine_test (name) VALUES ('kept')")
+        cls.engine = SQLEngine(dsn=dsn, maxconn=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.close()
+        with cls.admin.cursor() as cursor:
+            cursor.execute("DROP TABLE oopo_sql_engine_test")
+        cls.admin.close()
+
+    def count_rows(self):
+        with self.admin.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM oopo_sql_engine_test")
+            return cursor.fetchone()[0]
+
+    def test_select(self):
+        self.assertEqual(self.engine.ask_database("SELECT name FROM oopo_sql_engine_test;"), [("kept",)])
+
+    def test_write_is_refused(self):
+        result = self.engine.ask_database("DELETE FROM oopo_sql_engine_test")
+        self.assertIsInstance(result, str)
+        self.assertEqual(self.count_rows(), 1)
+
+    def test_multiple_statements_are_refused(self):
+        result = self.engine.ask_database("SELECT 1; COMMIT; DELETE FROM oopo_sql_engine_test")
+        self.assertIn("single SQL statement", result)
+        self.assertEqual(self.count_rows(), 1)
+
+    def test_semicolon_in_literal_is_allowed(self):
+        self.assertEqual(self.engine.ask_database("SELECT ';' AS separator"), [(";",)])
+
+    def test_session_is_read_only_after_commit(self):
+        # Even if a COMMIT went through, the next transaction of the pooled connection is read-only.
+        with self.engine.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("COMMIT")
+            with self.assertRaises(psycopg2.Error):
+                cursor.execute("DELETE FROM oopo_sql_engine_test")
+        self.assertEqual(self.count_rows(), 1)
+
+    def test_check_single_statement(self):
+        for query in ("SELECT 1", "SELECT 1;", "SELECT $$;$$", "SELECT 1 /* ; */", "SELECT 1; -- done"):
+            SQLEngine.check_single_statement(query)
+        for query in ("SELECT 1; SELECT 2", "SELECT 'a'';'; DROP TABLE oopo_sql_engine_test"):
+            with self.assertRaises(QueryRejected):
+                SQLEngine.check_single_statement(query)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Checks of the external ORM runner against the function definitions of the add-on.
+
+    cd misc && python -m unittest test_xml_ORM
+"""
+import copy
+import json
+import unittest
+
+import xml_ORM
+
+
+class RecordingClient:
+    """Stands in for ``OdooClient``, recording the calls and returning canned results."""
+
+    def __init__(self, results=None):
+        self.calls = []
+        self.results = results or {}
+
+    def execute(self, model, method, *args, **kwargs):
+        self.calls.append((model, method, args, kwargs))
+        return self.results.get(method)
+
+    def execute_concurrently(self, calls):
+        return [self.execute(model, method, *args, **kwargs) for model, method, args, kwargs in calls]
+
+
+class TestXmlORM(unittest.TestCase):
+
+    def setUp(self):
+        with open(xml_ORM.shared_functions_path) as functions_file:
+            self.addon_functions = {function["name"]: function for function in json.load(functions_file)}
+        self.external_functions = {function["name"]: function for function in xml_ORM.functions}
+
+    def test_only_documented_differences(self):
+        self.assertEqual(
+            set(self.external_functions),
+            set(self.addon_functions) - set(xml_ORM.addon_only_functions) | {"read_records"},
+        )
+        for name, function in self.external_functions.items():
+            if name == "read_records":
+                continue
+            expected = copy.deepcopy(self.addon_functions[name])
+            for argument in xml_ORM.addon_only_arguments.get(name, ()):
+                del expected["parameters"]["properties"][argument]
+            self.assertEqual(function, expected, f"{name} drifted from the add-on definition")
+        self.assertEqual(self.external_functions["read_records"]["parameters"]["properties"]["reads"]["items"],
+                         self.external_functions["read_record"]["parameters"])
+
+    def test_every_function_is_implemented(self):
+        self.assertEqual(set(self.external_functions), set(xml_ORM.available_functions))
+
+    def test_update_record_updates_one_record(self):
+        xml_ORM.client = RecordingClient({"search": [7]})
+        self.addCleanup(setattr, xml_ORM, "client", None)
+        result = xml_ORM.update_record("res.partner", ["name"], [{"phone": "123"}], [["name", "=", "Diego"]], limit=10)
+        self.assertEqual(result, [7])
+        self.assertEqual(xml_ORM.client.calls, [
+            ("res.partner", "search", ([["name", "=", "Diego"]],), {"limit": 1}),
+            ("res.partner", "write", ([7], {"phone": "123"}), {}),
+        ])
+
+    def test_update_record_rejects_empty_domain(self):
+        xml_ORM.client = RecordingClient({"search": [7]})
+        self.addCleanup(setattr, xml_ORM, "client", None)
+        for search_domains in (None, []):
+            with self.assertRaises(ValueError):
+                xml_ORM.update_record("res.partner", ["name"], [{"phone": "123"}], search_domains)
+        self.assertEqual(xml_ORM.client.calls, [])
+
+    def test_resolve_names(self):
+        xml_ORM.client = RecordingClient({"name_search": [[3, "Deco Addict"]]})
+        self.addCleanup(setattr, xml_ORM, "client", None)
+        result = xml_ORM.resolve_names([{"model": "res.partner", "name": "deco"}])
+        self.assertEqual(result, [{"model": "res.partner", "name": "deco", "matches": [{"id": 3, "name": "Deco Addict"}]}])
+        with self.assertRaises(ValueError):
+            xml_ORM.resolve_names([{"name": "deco"}])
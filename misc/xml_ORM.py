@@ -1,6 +1,10 @@
-import xmlrpc.client
-import openai
+import copy
 import json
+import os
+
+import openai
+
+from odoo_client import OdooClient, OdooRPCError
 
 
 url = 'http://localhost:8069/'
@@ -8,131 +12,170 @@ db = 'ogpt'
 username = 'admin'
 password = 'admin'
 
-common = xmlrpc.client.ServerProxy('{}/xmlrpc/2/common'.format(url))
-models = xmlrpc.client.ServerProxy('{}/xmlrpc/2/object'.format(url))
+openai.api_key = ""
+
+# Maximum number of function-calling rounds per question, as in the add-on.
+timeout = 20
+
+client = None
+
+# Function definitions of the add-on, so that both runners offer the same tools.
+shared_functions_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mail_oopo", "data", "oopo_functions.json")
+# Intentional differences with the add-on: read_more pages through a server-side cursor of the add-on, so
+# paged reads are not offered, and skills are add-on records run server-side. read_records is external only,
+# it runs several reads concurrently over the connection pool of the client.
+addon_only_functions = ("read_more",)
+addon_only_arguments = {"read_record": ("page_size",)}
+
+
+def load_functions():
+    with open(shared_functions_path) as functions_file:
+        shared_functions = json.load(functions_file)
+    external_functions = []
+    for function in shared_functions:
+        if function["name"] in addon_only_functions:
+            continue
+        function = copy.deepcopy(function)
+        for argument in addon_only_arguments.get(function["name"], ()):
+            function["parameters"]["properties"].pop(argument)
+        external_functions.append(function)
+    read_record_parameters = next(function for function in external_functions if function["name"] == "read_record")["parameters"]
+    external_functions.append({
+        "name": "read_records",
+        "description": "Perform several independent read_record calls at once, e.g. to read the orders of a customer and its invoices",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "reads": {
+                    "type": "array",
+                    "items": read_record_parameters,
+                    "description": "Array of read_record arguments"
+                }
+            },
+            "required": ["reads"]
+        }
+    })
+    return external_functions
+
 
-uid = common.authenticate(db, username, password, {})
+functions = load_functions()
+
+system_prompt = """
+    You are Oopo, a friendly AI assistant with full access to the current Odoo environment.
+    Use the functions to read, create and update records. When several reads do not depend on each other,
+    perform them in one read_records call, and find the ids of records by their names with one resolve_names call.
+    IDs returned by previous calls can be used in later calls.
+"""
 
-def read_model(model, fields, search_domains=None, limit=None, order=None):
-    search_param = {'fields': fields}
-    if limit:
-        search_param['limit'] = limit
 
+def _search_read_kwargs(model, field, search_domains=None, limit=None, order=None):
+    available_fields = client.fields_get(model)
+    field = [name for name in field if name in available_fields] or ["display_name"]
+    if "name" not in field:
+        field.append("name" if "name" in available_fields else "display_name")
+    kwargs = {"fields": field}
+    if limit:
+        kwargs["limit"] = limit
     if order:
-        search_param['order'] = order
+        kwargs["order"] = order
+    return [search_domains or []], kwargs
 
 
+def read_record(model, field, search_domains=None, limit=None, order=None):
+    args, kwargs = _search_read_kwargs(model, field, search_domains, limit, order)
+    return client.execute(model, "search_read", *args, **kwargs)
 
-    if search_domains:
-        return models.execute_kw(db, uid, password, model, 'search_read', [search_domains], search_param)
-    else:
-        return models.execute_kw(db, uid, password, model, 'search_read', [[]], search_param)
 
-partners = read_model('res.partner', ['name'])
+def read_records(reads):
+    calls = [(read["model"], "search_read", *_search_read_kwargs(**read)) for read in reads]
+    return [str(result) if isinstance(result, Exception) else result for result in client.execute_concurrently(calls)]
 
-openai.api_key = ""
 
-functions = [{
-        "name": "read_model",
-        "description": "Read a model based on the given fields and search domains",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "model": {
-                    "type": "string",
-                    "description": "The name of the model to be read"
-                },
-                "fields": {
-                    "type": "array",
-                    "items": {
-                        "type": "string"
-                    },
-                    "description": "Array of field names to be read from the model"
-                },
-                "search_domains": {
-                    "type": "array",
-                    "items": {
-                        "type": "array",
-                        "items": {
-                            "type": "string"
-                        }
-                    },
-                    "description": "Odoo search domains to filter the data. Each domain should be an array of strings",
-                    "default": []
-                },
-                "limit": {
-                    "type": "integer",
-                    "description": "Limit the number of records to be read",
-                },
-                "order": {
-                    "type": "string",
-                    "description": "Order the records by the given field - example 'name asc'",
-                }
-            },
-            "required": ["model", "fields"]
+def create_record(model, values):
+    return client.execute(model, "create", values)
+
+
+def update_record(model, field, field_to_update, search_domains=None, limit=None):
+    """Update the first record matching ``search_domains``, as the add-on does. ``field`` and ``limit``
+    are part of the shared definition but a single record is updated whatever their value."""
+    if not search_domains:
+        raise ValueError("update_record needs search_domains identifying the record to update")
+    record_ids = client.execute(model, "search", search_domains, limit=1)
+    if not record_ids:
+        return "No record matches the search domains"
+    values = field_to_update[0] if isinstance(field_to_update, list) else field_to_update
+    client.execute(model, "write", record_ids, values)
+    return record_ids
+
+
+def resolve_names(names, limit=3):
+    """Find the ids of several records by their names with one ``name_search`` per name, run concurrently.
+    Unlike the add-on, the matches have no similarity score."""
+    for item in names:
+        if not isinstance(item, dict) or not item.get("model") or not isinstance(item.get("name"), str):
+            raise ValueError(f"Every item of names must be an object with a model and a name, got {item}")
+    calls = [(item["model"], "name_search", [], {"name": item["name"], "limit": limit}) for item in names]
+    return [
+        {
+            "model": item["model"],
+            "name": item["name"],
+            "matches": str(result) if isinstance(result, Exception) else [{"id": record_id, "name": name} for record_id, name in result],
         }
-    }
-]
+        for item, result in zip(names, client.execute_concurrently(calls))
+    ]
 
-def run_conversation():
-    # Step 1: send the conversation and available functions to GPT
-
-    # prompt terminal for str
-    prompt = input("Ask Odoo GPT a question: ")
-
-    messages = [{"role": "user", "content": prompt}]
-    
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo-0613",
-        messages=messages,
-        functions=functions,
-        function_call="auto",  # auto is default, but we'll be explicit
-    )
-    response_message = response["choices"][0]["message"]
-
-    # Step 2: check if GPT wanted to call a function
-    if response_message.get("function_call"):
-        # Step 3: call the function
-        # Note: the JSON response may not always be valid; be sure to handle errors
-        available_functions = {
-            "read_model": read_model,
-        }  # only one function in this example, but you can have multiple
-
-        # print("ODOOGPT FUNCTION CALL: ", response_message["function_call"])
-        # pretty print in pink in terminal
-        print("\033[95m" + "ODOOGPT FUNCTION CALL: " + response_message["function_call"]["name"] + "\033[0m")
-        args = json.loads(response_message["function_call"]["arguments"])
+
+available_functions = {
+    "read_record": read_record,
+    "read_records": read_records,
+    "create_record": create_record,
+    "update_record": update_record,
+    "resolve_names": resolve_names,
+}
+
+
+def execute_function_call(message):
+    function_name = message["function_call"]["name"]
+    print("\033[95m" + "ODOOGPT FUNCTION CALL: " + function_name + "\033[0m")
+    try:
+        args = json.loads(message["function_call"]["arguments"])
         print("\033[95m" + "ODOOGPT FUNCTION ARGUMENTS: " + str(args) + "\033[0m")
-        # print(json.dumps(response_message["function_call"]))
-        # parse all arguments and pretty print
-        # print("\033[95m" + "ODOOGPT FUNCTION RESPONSE: " + "\033[0m")
-        
-
-        function_name = response_message["function_call"]["name"]
-        fuction_to_call = available_functions[function_name]
-        function_args = json.loads(response_message["function_call"]["arguments"])
-        function_response = str(fuction_to_call(
-            model=function_args["model"],
-            fields=function_args["fields"],
-            search_domains=function_args.get("search_domains", None),
-            limit=function_args.get("limit", None),
-            order=function_args.get("order", None),
-        ))
-
-        # Step 4: send the info on the function call and function response to GPT
-        messages.append(response_message)  # extend conversation with assistant's reply
-        messages.append(
-            {
-                "role": "function",
-                "name": function_name,
-                "content": function_response,
-            }
-        )  # extend conversation with function response
-        second_response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo-0613",
-            messages=messages,
-        )  # get a new response from GPT where it can see the function response
-        return second_response['choices'][0]['message']['content']
-
-
-print(run_conversation())
+        result = available_functions[function_name](**args)
+    except (ValueError, KeyError, TypeError, OdooRPCError) as e:
+        result = f"Error: {e}"
+        print("\033[91m" + "ODOOGPT FUNCTION ERROR: " + str(e) + "\033[0m")
+    return {"role": "function", "name": function_name, "content": str(result)}
+
+
+def run_conversation():
+    messages = [{"role": "system", "content": system_prompt}]
+
+    while True:
+        prompt = input("Ask Odoo GPT a question (type 'exit' to end the conversation): ")
+        if prompt.lower() == "exit":
+            break
+        messages.append({"role": "user", "content": prompt})
+
+        for loop_count in range(timeout):
+            response = openai.ChatCompletion.create(
+                model="gpt-3.5-turbo-0613",
+                messages=messages,
+                functions=functions,
+                function_call="auto",
+            )
+            response_message = response["choices"][0]["message"]
+            messages.append(response_message)
+            if not response_message.get("function_call"):
+                print("\033[1m" + (response_message["content"] or "") + "\033[0m")
+                break
+            print("\033[96m" + "CALL #: " + str(loop_count + 1) + "\033[0m")
+            messages.append(execute_function_call(response_message))
+        else:
+            print("\033[91m" + "I am sorry that I failed to process your query, please provide more details/instructions and retry!" + "\033[0m")
+
+    return "Conversation ended."
+
+
+if __name__ == "__main__":
+    client = OdooClient(url, db, username, password)
+    print(run_conversation())
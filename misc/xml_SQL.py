@@ -1,8 +1,9 @@
 import openai
 import json
-import psycopg2
 import tiktoken
 
+from sql_engine import SQLEngine
+
 db = 'ogpt2'
 port = '5432'
 username = 'postgres'
@@ -10,125 +11,9 @@ password = 'admin' # ALTER USER postgres WITH PASSWORD 'admin';
 
 openai.api_key = ""
 
-conn = psycopg2.connect(database=db,
-                        host='localhost',
-                        user=username,
-                        password=password,
-                        port=port)
-
-
-def get_foreign_key_relations(conn, table_name):
-    cursor = conn.cursor()
-    query = """
-        SELECT
-            conname AS constraint_name,
-            att2.attname AS column_name,
-            cl.relname AS referenced_table,
-            att.attname AS referenced_column
-        FROM
-            pg_constraint AS con
-            JOIN pg_class AS cl ON con.confrelid = cl.oid
-            JOIN pg_attribute AS att ON con.confrelid = att.attrelid AND con.confkey[1] = att.attnum
-            JOIN pg_attribute AS att2 ON con.conrelid = att2.attrelid AND con.conkey[1] = att2.attnum
-        WHERE
-            con.conrelid = (SELECT oid FROM pg_class WHERE relname = %s)
-            AND contype = 'f'
-    """
-    cursor.execute(query, (table_name,))
-    relations = cursor.fetchall()
-    cursor.close()
-    return relations
-
-
-def ask_database(conn, query):
-    try:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        query_results = cursor.fetchall()
-        return query_results
-    except Exception as e:
-        error_message = str(e)  # Get the error message as a string
-        return error_message
-
-def get_table_names(conn):
-    cursor = conn.cursor()
-    cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema='public' AND table_type='BASE TABLE';")
-    table_names = cursor.fetchall()
-    table_names = [table_name[0] for table_name in table_names]
-    return table_names
-
-def get_column_names(conn, table_name):
-    cursor = conn.cursor()
-    cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s", (table_name,))
-    column_names = cursor.fetchall()
-    column_names = [column_name[0] for column_name in column_names]
-    return column_names
-
-# SELECT
-#     field_description.name AS field_name,
-#     field_description.field_description AS field_description,
-#     field_description.ttype AS field_type,
-#     field_description.relation AS relation,
-#     model.model AS model_name
-# FROM
-#     ir_model AS model
-# JOIN
-#     ir_model_fields AS field_description
-#     ON model.id = field_description.model_id
-# WHERE
-#     model.model = 'sale.order';
-def get_model_cols(conn, model):
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT
-            field_description.name AS field_name,
-            field_description.field_description AS field_description,
-            field_description.ttype AS field_type,
-            field_description.relation AS relation,
-            model.model AS model_name
-        FROM
-            ir_model AS model
-        JOIN
-            ir_model_fields AS field_description
-            ON model.id = field_description.model_id
-        WHERE
-            model.model = %s
-    """, (model,))
-    model_fields = cursor.fetchall()
-    cursor.close()
-
-    # turn into csv format
-    first_line = "column_name,description,type,related_model\n"
+# Connected when the script runs, importing the module opens no connection.
+engine = None
 
-    # field[3] may be none turn into str
-    for field in model_fields:
-        first_line += field[0] + "," + field[1]["en_US"] + "," + field[2] + "," + str(field[3]) + "\n"
-
-    return first_line
-
-
-def get_model_fields(conn, list_of_models):
-    database_info = []
-    for model in list_of_models:
-        table_name = model.replace(".", "_")
-        # column_names = get_column_names(conn, table_name)
-        column_names = get_model_cols(conn, model)
-        database_info.append({"table_name": table_name, "column_names": column_names})
-    database_info_schema_str = json.dumps(database_info) 
-    return database_info_schema_str
-
-models = get_table_names(conn)
-models_str = ",".join(models)
-
-encoding = tiktoken.encoding_for_model("gpt-3.5-turbo-0613")
-num_tokens = len(encoding.encode(models_str))
-
-def read_id(conn, model, id, fields):
-    cursor = conn.cursor()
-    table_name = model.replace(".", "_")
-    fields_str = ",".join(fields)
-    cursor.execute(f"SELECT {fields_str} FROM {table_name} WHERE id = {id}")
-    return cursor.fetchall()
 
 functions = [
     {
@@ -196,10 +81,10 @@ def execute_function_call(message):
     print("\033[95m" + "ODOOGPT FUNCTION ARGUMENTS: " + str(args) + "\033[0m")
     if function_name == "ask_database":
             query = json.loads(message["function_call"]["arguments"])["query"]
-            results = ask_database(conn, query)
+            results = engine.ask_database(query)
     elif function_name == "get_model_fields":
         models = json.loads(message["function_call"]["arguments"])["list_of_models"]
-        results = get_model_fields(conn, models)
+        results = engine.get_model_fields(models)
     else:
         results = f"Error: function {message['function_call']['name']} does not exist"
 
@@ -264,4 +149,17 @@ def run_conversation():
 
     return "Conversation ended."
 
-print(run_conversation())
+if __name__ == "__main__":
+    engine = SQLEngine(database=db,
+                       host='localhost',
+                       user=username,
+                       password=password,
+                       port=port)
+    models = engine.get_table_names()
+    models_str = ",".join(models)
+
+    encoding = tiktoken.encoding_for_model("gpt-3.5-turbo-0613")
+    num_tokens = len(encoding.encode(models_str))
+
+    print(run_conversation())
+    engine.close()